@@ -9,4 +9,9 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Run migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Simplify the warmup corpus once per deploy; workers load the stored results at boot
+if [ -n "$CACHE_WARMUP_CORPUS_DIR" ]; then
+    python manage.py warm_cache
+fi
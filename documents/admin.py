@@ -2,22 +2,82 @@
 Admin configuration for system monitoring.
 """
 
+from django.conf import settings
 from django.contrib import admin
-from .models import SystemMetrics
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+
+from .models import SystemMetrics, MetricsRollup
+from .services.metrics_rollup import sketch_quantile
+from .services.request_profiler import list_profiles, get_profile_path
 
 
 @admin.register(SystemMetrics)
 class SystemMetricsAdmin(admin.ModelAdmin):
-    """Admin interface for system performance metrics."""
+    """Admin interface for raw system performance metrics (short retention)."""
     
     list_display = ['timestamp', 'endpoint', 'status_code', 'response_time_ms']
-    list_filter = ['endpoint', 'status_code', 'timestamp']
+    list_filter = ['endpoint', 'status_code']
     readonly_fields = ['timestamp', 'endpoint', 'response_time_ms', 'status_code']
     ordering = ['-timestamp']
     list_per_page = 50
+    show_full_result_count = False  # Avoid COUNT(*) over the raw table
     
     def has_add_permission(self, request):
         return False  # Metrics are auto-generated
     
     def has_change_permission(self, request, obj=None):
-        return False  # Read-only metrics
\ No newline at end of file
+        return False  # Read-only metrics
+
+
+@admin.register(MetricsRollup)
+class MetricsRollupAdmin(admin.ModelAdmin):
+    """Dashboard of aggregated request metrics."""
+    
+    list_display = [
+        'bucket_start', 'resolution', 'endpoint', 'count', 'error_count',
+        'latency_p50', 'latency_p95', 'latency_p99', 'latency_max_ms'
+    ]
+    list_filter = ['resolution', 'endpoint']
+    date_hierarchy = 'bucket_start'
+    ordering = ['-bucket_start']
+    list_per_page = 100
+    
+    @admin.display(description='p50 (ms)')
+    def latency_p50(self, obj):
+        return sketch_quantile(obj.latency_sketch, 0.5)
+    
+    @admin.display(description='p95 (ms)')
+    def latency_p95(self, obj):
+        return sketch_quantile(obj.latency_sketch, 0.95)
+    
+    @admin.display(description='p99 (ms)')
+    def latency_p99(self, obj):
+        return sketch_quantile(obj.latency_sketch, 0.99)
+    
+    def has_add_permission(self, request):
+        return False  # Rollups are generated by rollup_metrics
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+
+def profile_list_view(request):
+    """Admin page listing stored request profiles."""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'max_profiles': settings.PROFILING_MAX_PROFILES,
+        'profiled_paths': settings.PROFILING_PATHS,
+    }
+    return TemplateResponse(request, 'admin/documents/profiles.html', context)
+
+
+def profile_download_view(request, filename):
+    """Download one stored profile file."""
+    path = get_profile_path(filename)
+    if path is None:
+        raise Http404("Profile not found")
+    return FileResponse(path.open('rb'), as_attachment=True, filename=filename)
@@ -0,0 +1,31 @@
+"""
+App configuration for the documents app.
+"""
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Enable WAL journaling on SQLite so metric writes don't block readers.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_WAL_MODE:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL;')
+        # WAL is durable across crashes with NORMAL; only a power loss can drop the last commits
+        cursor.execute('PRAGMA synchronous=NORMAL;')
+
+
+class DocumentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'documents'
+
+    def ready(self):
+        connection_created.connect(configure_sqlite_connection)
+        if settings.GLOSSARY_ENABLED:
+            # Compile the term automaton at startup, not on the first request
+            from .services.glossary import get_glossary
+            get_glossary()
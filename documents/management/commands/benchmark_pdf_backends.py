@@ -0,0 +1,78 @@
+"""
+Measure every installed PDF backend on a corpus, per document class.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.services.pdf_backends import (
+    classify_pdf,
+    installed_backends,
+    pdf_features,
+    run_backend,
+    unacceptable_reason,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run each installed PDF backend over a directory of PDFs and report pages per "
+        "second and the share of acceptable output per document class, with suggested "
+        "PDF_BACKENDS_<CLASS> settings. Runs inline, outside the extraction sandbox."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus_dir', help="Directory searched recursively for .pdf files")
+        parser.add_argument(
+            '--min-acceptable',
+            type=float,
+            default=0.95,
+            help="Share of documents a backend must read acceptably to be suggested first",
+        )
+
+    def handle(self, *args, **options):
+        paths = sorted(Path(options['corpus_dir']).rglob('*.pdf'))
+        if not paths:
+            raise CommandError(f"No PDF files found in {options['corpus_dir']}")
+        backends = installed_backends()
+        if not backends:
+            raise CommandError("No PDF backend is installed.")
+
+        # (class, backend) -> [documents, acceptable, pages, seconds]
+        totals = defaultdict(lambda: [0, 0, 0, 0.0])
+        for path in paths:
+            file_content = path.read_bytes()
+            features = pdf_features(file_content)
+            document_class = classify_pdf(features)
+            for name in backends:
+                row = totals[(document_class, name)]
+                row[0] += 1
+                try:
+                    pages, seconds = run_backend(name, file_content)
+                except Exception as e:
+                    self.stdout.write(f"{name:<10} failed on {path}: {str(e)}")
+                    continue
+                row[1] += unacceptable_reason(pages, features) is None
+                row[2] += len(pages)
+                row[3] += seconds
+            self.stdout.write(f"{document_class:<9} {path}")
+
+        self.stdout.write('')
+        self.stdout.write(f"{'class':<9} {'backend':<10} {'docs':>5} {'acceptable':>10} {'pages/s':>9}")
+        suggestions = defaultdict(list)
+        for (document_class, name), (documents, acceptable, pages, seconds) in sorted(totals.items()):
+            pages_per_second = pages / seconds if seconds else 0
+            share = acceptable / documents
+            self.stdout.write(
+                f"{document_class:<9} {name:<10} {documents:>5} {share:>10.0%} {pages_per_second:>9.1f}"
+            )
+            suggestions[document_class].append(
+                (share < options['min_acceptable'], -pages_per_second, name)
+            )
+
+        self.stdout.write('')
+        for document_class, ranked in sorted(suggestions.items()):
+            order = ','.join(name for _, _, name in sorted(ranked))
+            self.stdout.write(self.style.SUCCESS(f"PDF_BACKENDS_{document_class.upper()}={order}"))
@@ -0,0 +1,103 @@
+"""
+Report where worker boot time goes, using ``python -X importtime``.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# What a gunicorn worker does on boot: load settings, apps and the WSGI app,
+# then resolve URLs (which imports the views and their services).
+BOOT_SCRIPT = """
+import django
+django.setup()
+import legalease.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(output):
+    """
+    Parse ``-X importtime`` output.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) tuples
+    """
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+class Command(BaseCommand):
+    help = "Profile worker boot imports (-X importtime breakdown by package)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help="Number of rows per table")
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help="Profile with PRELOAD_HEAVY_MODULES enabled",
+        )
+
+    def handle(self, *args, **options):
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'legalease.settings')
+        env['PRELOAD_HEAVY_MODULES'] = 'True' if options['preload'] else 'False'
+        # Startup hooks would start network threads and skew the profile
+        env['CACHE_WARMUP_ON_STARTUP'] = 'False'
+        env['LLM_PREWARM_ON_STARTUP'] = 'False'
+
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if process.returncode != 0:
+            raise CommandError(f"Boot script failed:\n{process.stderr[-2000:]}")
+
+        entries = parse_importtime(process.stderr)
+        if not entries:
+            raise CommandError("No -X importtime output captured.")
+
+        by_package = defaultdict(int)
+        for module, self_us, _, _ in entries:
+            by_package[module.split('.')[0]] += self_us
+        total_us = sum(by_package.values())
+
+        top = options['top']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Boot: {wall_ms:.0f} ms wall, {total_us / 1000:.0f} ms importing "
+            f"{len(entries)} modules (preload={'on' if options['preload'] else 'off'})"
+        ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSelf time by top-level package"))
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+            share = 100 * self_us / total_us if total_us else 0
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {share:5.1f}%  {package}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSlowest top-level imports (cumulative)"))
+        roots = [entry for entry in entries if entry[3] == 0]
+        for module, _, cumulative_us, _ in sorted(roots, key=lambda entry: -entry[2])[:top]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+        try:
+            import resource
+            max_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            self.stdout.write(f"\nPeak RSS of boot process: {max_rss_kb / 1024:.1f} MB")
+        except ImportError:
+            pass
@@ -0,0 +1,19 @@
+"""
+Delete stored extracted texts, results and translations past RESULT_RETENTION_DAYS.
+Run periodically (e.g. daily from cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from documents.services.results import purge_expired_results
+
+
+class Command(BaseCommand):
+    help = "Delete stored extracted texts, simplification results and translations past their retention."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_results()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted['original_texts']} original texts, {deleted['results']} results, "
+            f"{deleted['translations']} translations and {deleted['index_entries']} index entries"
+        ))
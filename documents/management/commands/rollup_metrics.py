@@ -0,0 +1,19 @@
+"""
+Downsample SystemMetrics into minute/hour rollups and enforce retention.
+Run periodically (e.g. every 5 minutes from cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from documents.services.metrics_rollup import rollup_metrics
+
+
+class Command(BaseCommand):
+    help = "Roll raw request metrics up into per-minute and per-hour aggregates."
+
+    def handle(self, *args, **options):
+        summary = rollup_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {summary['hours_rebuilt']} hours ({summary['hour_buckets']} hour buckets); "
+            f"deleted {summary['deleted']}"
+        ))
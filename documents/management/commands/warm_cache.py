@@ -0,0 +1,67 @@
+"""
+Pre-populate the extraction, simplification and translation caches.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.services.cache_warmup import warm_cache
+from documents.services.translation_service import LANGUAGE_NAMES
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a corpus of template documents through the pipeline and store the results, "
+        "so workers can warm their caches at boot without calling the LLM. "
+        "Run once per deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus_dir',
+            nargs='?',
+            default=None,
+            help="Directory of template documents (defaults to CACHE_WARMUP_CORPUS_DIR)",
+        )
+        parser.add_argument(
+            '--languages',
+            default=None,
+            help="Comma-separated target languages (defaults to CACHE_WARMUP_LANGUAGES)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Number of documents processed in parallel",
+        )
+
+    def handle(self, *args, **options):
+        corpus_dir = options['corpus_dir'] or settings.CACHE_WARMUP_CORPUS_DIR
+        if not corpus_dir:
+            raise CommandError("No corpus directory given and CACHE_WARMUP_CORPUS_DIR is not set.")
+
+        languages = None
+        if options['languages']:
+            languages = [code.strip() for code in options['languages'].split(',') if code.strip()]
+            unknown = [code for code in languages if code not in LANGUAGE_NAMES]
+            if unknown:
+                raise CommandError(f"Unsupported languages: {', '.join(unknown)}")
+
+        def progress(done, total, path, status):
+            self.stdout.write(f"[{done}/{total}] {status:<7} {path}")
+
+        try:
+            summary = warm_cache(
+                corpus_dir,
+                languages=languages,
+                workers=options['workers'],
+                progress=progress,
+            )
+        except Exception as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {summary['warmed']}, loaded {summary['loaded']} from stored results, "
+            f"already cached {summary['cached']}, failed {summary['failed']} "
+            f"of {summary['total']} documents"
+        ))
@@ -0,0 +1,226 @@
+"""
+HTTP middleware for the document API.
+"""
+
+import hmac
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .services.admission import admission_controller, estimate_cost_mb
+from .services.lazy_imports import optional_import
+from .services.request_metrics import record_request
+from .services.request_profiler import StackSampler, save_profile
+
+logger = logging.getLogger(__name__)
+
+# Encodings we can produce, in order of preference on equal quality
+SUPPORTED_ENCODINGS = ('br', 'gzip')
+
+
+def negotiate_encoding(accept_encoding, available=SUPPORTED_ENCODINGS):
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. "br;q=1.0, gzip;q=0.8"
+        available: Codings the server can produce, most preferred first
+
+    Returns:
+        str: Chosen coding, or None for identity
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with Brotli or gzip based on Accept-Encoding.
+
+    Brotli is used when the ``brotli`` package is installed and the client
+    prefers it; everything else falls back to Django's gzip handling.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code == 304:
+            # Caches pick the stored encoding to revalidate by Accept-Encoding
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        available = SUPPORTED_ENCODINGS
+        if optional_import('brotli') is None:
+            available = ('gzip',)
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = negotiate_encoding(accept_encoding, available)
+        if encoding == 'br' and response.streaming:
+            # Streaming bodies are only compressed incrementally with gzip
+            encoding = negotiate_encoding(accept_encoding, ('gzip',))
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding != 'br':
+            return response
+
+        brotli = optional_import('brotli')
+        compressed_content = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        # Compressed representations only carry weak validators
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record one SystemMetrics row (endpoint, latency, status) per API request.
+    No request content or user data is stored. Rows are buffered and written
+    in batches; health checks are skipped (METRICS_EXCLUDED_ENDPOINTS).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.RECORD_REQUEST_METRICS or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        response_time_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            record_request(
+                getattr(request, 'resolver_match', None), response_time_ms, response.status_code
+            )
+        except Exception as e:
+            logger.warning(f"Could not record request metrics: {str(e)}")
+
+        return response
+
+
+def shed_response(rejection):
+    """503 telling the client when capacity should be available again."""
+    response = JsonResponse(
+        {
+            'error': 'Server is busy. Please retry shortly.',
+            'reason': rejection.reason,
+            'retry_after': rejection.retry_after,
+        },
+        status=503,
+    )
+    response['Retry-After'] = str(rejection.retry_after)
+    return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Reserve capacity for document uploads before their body is read.
+
+    The reservation is sized from Content-Length and refined by the view once
+    the file type and page count are known. Requests over the limits get a
+    503 with Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            not settings.ADMISSION_CONTROL_ENABLED
+            or request.method != 'POST'
+            or request.path not in settings.ADMISSION_CONTROL_PATHS
+        ):
+            return self.get_response(request)
+
+        try:
+            size_bytes = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            size_bytes = 0
+        ticket, rejection = admission_controller.try_admit(estimate_cost_mb(size_bytes))
+        if rejection:
+            return shed_response(rejection)
+
+        request.admission_ticket = ticket
+        try:
+            return self.get_response(request)
+        finally:
+            admission_controller.release(ticket)
+
+
+class RequestProfilingMiddleware:
+    """
+    Stack-sample selected requests on the profiled paths.
+
+    A request is profiled when it carries ``X-Profile-Token`` matching
+    PROFILING_TOKEN, or at random with probability PROFILING_SAMPLE_RATE.
+    The saved profile id is returned in the ``X-Profile-Id`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _should_profile(self, request):
+        if request.path not in settings.PROFILING_PATHS:
+            return False
+        token = request.headers.get('X-Profile-Token')
+        if token and settings.PROFILING_TOKEN:
+            return hmac.compare_digest(token, settings.PROFILING_TOKEN)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler().start()
+        try:
+            response = self.get_response(request)
+            # Render lazily rendered responses inside the profile window
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        finally:
+            sampler.stop()
+
+        try:
+            profile_id = save_profile(sampler, f"{request.method} {request.path}")
+            response['X-Profile-Id'] = profile_id
+        except Exception as e:
+            logger.warning(f"Could not save request profile: {str(e)}")
+
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_systemmetrics_alter_translation_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('endpoint', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0, help_text='Responses with status >= 500')),
+                ('latency_sum_ms', models.FloatField(default=0)),
+                ('latency_max_ms', models.FloatField(default=0)),
+                ('latency_sketch', models.JSONField(default=dict, help_text='Log-bucketed latency histogram (mergeable quantile sketch)')),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='documents_m_resolut_f43193_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricsrollup',
+            constraint=models.UniqueConstraint(fields=('resolution', 'bucket_start', 'endpoint'), name='unique_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_metricsrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_id', models.CharField(max_length=64, unique=True)),
+                ('simplified_text', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResultTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=10)),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translations', to='documents.documentresult')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resulttranslation',
+            constraint=models.UniqueConstraint(fields=('result', 'language'), name='unique_result_language'),
+        ),
+    ]
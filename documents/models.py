@@ -1,6 +1,8 @@
 """
-Minimal models for stateless operation.
-No user data or document content is stored.
+Minimal models for near-stateless operation.
+Uploaded files are never stored. Extracted text and simplification results
+are kept by content hash, so every worker can serve and translate them
+later, and are purged after RESULT_RETENTION_DAYS.
 """
 
 from django.db import models
@@ -24,4 +26,87 @@ class SystemMetrics(models.Model):
         return f"{self.endpoint} - {self.status_code} ({self.response_time_ms}ms)"
 
 
-# No other models needed - completely stateless operation
\ No newline at end of file
+class MetricsRollup(models.Model):
+    """
+    Per-minute or per-hour aggregate of SystemMetrics rows.
+    Raw rows are downsampled into these and then expired.
+    """
+    RESOLUTION_MINUTE = 'minute'
+    RESOLUTION_HOUR = 'hour'
+    RESOLUTION_CHOICES = [
+        (RESOLUTION_MINUTE, 'Minute'),
+        (RESOLUTION_HOUR, 'Hour'),
+    ]
+    
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    endpoint = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0, help_text="Responses with status >= 500")
+    latency_sum_ms = models.FloatField(default=0)
+    latency_max_ms = models.FloatField(default=0)
+    latency_sketch = models.JSONField(
+        default=dict,
+        help_text="Log-bucketed latency histogram (mergeable quantile sketch)"
+    )
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['resolution', 'bucket_start', 'endpoint'],
+                name='unique_rollup_bucket'
+            )
+        ]
+        indexes = [models.Index(fields=['resolution', 'bucket_start'])]
+    
+    def __str__(self):
+        return f"{self.endpoint} @ {self.bucket_start} ({self.resolution}, {self.count} requests)"
+
+
+class DocumentResult(models.Model):
+    """
+    Simplification result keyed by the content hash of the extracted text.
+    """
+    content_id = models.CharField(max_length=64, unique=True)
+    simplified_text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Result {self.content_id[:12]}"
+
+
+class OriginalText(models.Model):
+    """
+    Extracted text of a processed document, served by the original-text endpoint.
+    """
+    content_id = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Original text {self.content_id[:12]}"
+
+
+class ResultTranslation(models.Model):
+    """
+    Translation of a stored result, created on first request per language.
+    """
+    result = models.ForeignKey(DocumentResult, on_delete=models.CASCADE, related_name='translations')
+    language = models.CharField(max_length=10)
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['result', 'language'], name='unique_result_language')
+        ]
+    
+    def __str__(self):
+        return f"{self.result} [{self.language}]"
\ No newline at end of file
@@ -2,6 +2,7 @@
 API serializers for request validation.
 """
 
+from django.conf import settings
 from rest_framework import serializers
 
 
@@ -17,6 +18,11 @@ class ProcessDocumentSerializer(serializers.Serializer):
         default='en',
         help_text="Target language code for translation (optional)"
     )
+    include_original_text = serializers.BooleanField(
+        required=False,
+        default=True,
+        help_text="Return the extracted text inline; if false, only a fetch URL is returned"
+    )
     
     def validate_file(self, value):
         """Validate uploaded file."""
@@ -39,4 +45,25 @@ class ProcessDocumentSerializer(serializers.Serializer):
                 "Unsupported file type. Please upload PDF, DOCX, or image files."
             )
         
-        return value
\ No newline at end of file
+        return value
+
+
+class OriginalTextPageSerializer(serializers.Serializer):
+    """Serializer for paginated original-text requests."""
+    
+    offset = serializers.IntegerField(min_value=0, required=False, default=0)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.ORIGINAL_TEXT_MAX_PAGE_SIZE,
+        required=False,
+        default=settings.ORIGINAL_TEXT_PAGE_SIZE
+    )
+
+
+
+class MetricsQuerySerializer(serializers.Serializer):
+    """Serializer for metrics dashboard queries."""
+    
+    resolution = serializers.ChoiceField(choices=['minute', 'hour'], required=False, default='hour')
+    hours = serializers.IntegerField(min_value=1, max_value=24 * 365, required=False, default=24)
+    endpoint = serializers.CharField(max_length=50, required=False)
@@ -0,0 +1,201 @@
+"""
+Admission control for expensive document requests.
+
+Each worker process tracks its in-flight documents, their estimated memory
+cost (from upload size, file type and page count) and its own RSS. Work that
+would exceed a limit is rejected up front with a Retry-After derived from
+recent service times, instead of queueing until clients time out.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Transient memory per byte of upload while a document is extracted in the worker
+COST_MULTIPLIERS = {
+    'pdf': 3,
+    'docx': 4,
+    'image': 8,  # decoded bitmaps are far larger than the compressed file
+}
+DEFAULT_COST_MULTIPLIER = 4
+# With the extraction sandbox, parsing and OCR memory is in the child processes
+# (bounded by EXTRACTION_WORKERS x EXTRACTION_MEMORY_MB); the worker only holds
+# the upload and the copy sent down the pipe
+SANDBOXED_COST_MULTIPLIER = 2
+# Extracted text, LLM payloads and response per request / per PDF page
+BASE_COST_MB = 5
+PDF_PAGE_COST_MB = 0.5
+
+# Service time assumed before any request has finished
+DEFAULT_SERVICE_MS = 10000
+
+_PDF_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+Rejection = namedtuple('Rejection', ['reason', 'retry_after'])
+
+
+def current_rss_mb():
+    """Resident set size of the current process in MB (0 if unknown)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def count_pdf_pages(file_content):
+    """Cheap page count from raw PDF bytes (0 when pages sit in object streams)."""
+    return len(_PDF_PAGE.findall(file_content))
+
+
+def estimate_cost_mb(size_bytes, file_type=None, page_count=0):
+    """Estimated peak memory in MB to process one document (in this worker)."""
+    if settings.EXTRACTION_SANDBOX_ENABLED:
+        multiplier = SANDBOXED_COST_MULTIPLIER
+    else:
+        multiplier = COST_MULTIPLIERS.get(file_type, DEFAULT_COST_MULTIPLIER)
+    return BASE_COST_MB + size_bytes * multiplier / (1024 * 1024) + page_count * PDF_PAGE_COST_MB
+
+
+class Ticket:
+    """An admitted request's reservation."""
+
+    __slots__ = ('cost_mb', 'started')
+
+    def __init__(self, cost_mb):
+        self.cost_mb = cost_mb
+        self.started = time.perf_counter()
+
+
+class AdmissionController:
+    """Per-process limits on concurrent document work."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.reserved_mb = 0.0
+
+    def _service_seconds(self):
+        p50 = stats.quantile('admission.service_ms', 0.5)
+        return (p50 if p50 is not None else DEFAULT_SERVICE_MS) / 1000
+
+    def _retry_after(self, fraction):
+        """Seconds until roughly ``fraction`` of current work has drained."""
+        seconds = math.ceil(self._service_seconds() * max(fraction, 0.1))
+        return min(max(seconds, 1), settings.ADMISSION_MAX_RETRY_AFTER)
+
+    def _check(self, cost_mb, rss_mb):
+        """Rejection for new work of ``cost_mb`` given current load, or None."""
+        if self.in_flight == 0:
+            # An idle worker always takes work, or nothing would ever run
+            return None
+
+        max_in_flight = settings.ADMISSION_MAX_IN_FLIGHT
+        if self.in_flight >= max_in_flight:
+            excess = self.in_flight - max_in_flight + 1
+            return Rejection('in_flight', self._retry_after(excess / max_in_flight))
+
+        max_cost_mb = settings.ADMISSION_MAX_COST_MB
+        if self.reserved_mb + cost_mb > max_cost_mb:
+            needed = self.reserved_mb + cost_mb - max_cost_mb
+            return Rejection('cost', self._retry_after(needed / self.reserved_mb))
+
+        if settings.ADMISSION_MAX_RSS_MB and rss_mb + cost_mb > settings.ADMISSION_MAX_RSS_MB:
+            return Rejection('memory', self._retry_after(1))
+
+        return None
+
+    def try_admit(self, cost_mb):
+        """
+        Reserve capacity for a request.
+
+        Returns:
+            tuple: (Ticket, None) when admitted, (None, Rejection) otherwise
+        """
+        rss_mb = current_rss_mb()
+        with self._lock:
+            rejection = self._check(cost_mb, rss_mb)
+            if rejection is None:
+                self.in_flight += 1
+                self.reserved_mb += cost_mb
+        if rejection:
+            stats.increment('admission.rejected', rejection.reason)
+            logger.warning(
+                f"Shedding request ({rejection.reason}): cost {cost_mb:.1f} MB, "
+                f"in flight {self.in_flight}, reserved {self.reserved_mb:.1f} MB, RSS {rss_mb:.0f} MB"
+            )
+            return None, rejection
+        stats.increment('admission.admitted')
+        return Ticket(cost_mb), None
+
+    def resize(self, ticket, cost_mb):
+        """
+        Re-estimate an admitted request once its content is known.
+
+        Returns:
+            Rejection or None. On rejection the ticket keeps its old cost.
+        """
+        extra_mb = cost_mb - ticket.cost_mb
+        if extra_mb <= 0:
+            with self._lock:
+                self.reserved_mb += extra_mb
+            ticket.cost_mb = cost_mb
+            return None
+
+        rss_mb = current_rss_mb()
+        with self._lock:
+            # Check as if this request were not yet in flight
+            self.in_flight -= 1
+            self.reserved_mb -= ticket.cost_mb
+            rejection = self._check(cost_mb, rss_mb)
+            self.in_flight += 1
+            if rejection is None:
+                self.reserved_mb += cost_mb
+                ticket.cost_mb = cost_mb
+            else:
+                self.reserved_mb += ticket.cost_mb
+        if rejection:
+            stats.increment('admission.rejected', rejection.reason)
+        return rejection
+
+    def release(self, ticket):
+        with self._lock:
+            self.in_flight -= 1
+            self.reserved_mb -= ticket.cost_mb
+        stats.observe('admission.service_ms', (time.perf_counter() - ticket.started) * 1000)
+
+    def state(self):
+        """Current load and limits, for the health check."""
+        rss_mb = current_rss_mb()
+        with self._lock:
+            in_flight = self.in_flight
+            reserved_mb = self.reserved_mb
+        shedding = in_flight > 0 and (
+            in_flight >= settings.ADMISSION_MAX_IN_FLIGHT
+            or reserved_mb >= settings.ADMISSION_MAX_COST_MB
+            or bool(settings.ADMISSION_MAX_RSS_MB and rss_mb >= settings.ADMISSION_MAX_RSS_MB)
+        )
+        return {
+            'state': 'shedding' if shedding else 'accepting',
+            'in_flight': in_flight,
+            'max_in_flight': settings.ADMISSION_MAX_IN_FLIGHT,
+            'reserved_mb': round(reserved_mb, 1),
+            'max_cost_mb': settings.ADMISSION_MAX_COST_MB,
+            'rss_mb': round(rss_mb),
+            'max_rss_mb': settings.ADMISSION_MAX_RSS_MB,
+        }
+
+
+# Global per-process controller
+admission_controller = AdmissionController()
@@ -7,93 +7,167 @@ from functools import lru_cache
 from django.conf import settings
 from django.core.cache import cache
 
-logger = logging.getLogger(__name__)
+from .hashing import content_hash
+from .llm_client import get_llm_client
+from .tokens import plan_request, record_usage
+from .model_router import model_router
+from .similarity_index import get_similarity_index
+from .result_patch import patch_result
+from .stats import stats
+from .extractive_summary import summarize, is_extractive_summary
+from .glossary import split_glossary_section
 
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
 class AIService:
     """Optimized AI service with caching and connection pooling."""
     
     _instance = None
-    _groq_client = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        if not hasattr(self, 'initialized'):
-            self.groq_initialized = False
-            self.initialized = True
-    
-    def _initialize_groq(self):
-        """Initialize Groq client with connection reuse."""
-        if self.groq_initialized:
-            return self._groq_client is not None
-        
-        if not GROQ_AVAILABLE:
-            self.groq_initialized = True
-            return False
-        
-        api_key = getattr(settings, 'GROQ_API_KEY', None)
-        if not api_key or api_key == 'your_groq_api_key_here':
-            self.groq_initialized = True
-            return False
-        
-        try:
-            self._groq_client = Groq(api_key=api_key)
-        except Exception:
-            self._groq_client = None
-        
-        self.groq_initialized = True
-        return self._groq_client is not None
-    
     def simplify_legal_text(self, text):
-        """Optimized legal text simplification with caching."""
-        # Check cache first
-        cache_key = f"simplified_{hash(text)}"
-        cached_result = cache.get(cache_key)
+        """Optimized legal text simplification with caching and model routing."""
+        # Check cache first, under every model (routing shifts with latency)
+        cached_result = get_cached_simplification(text)
         if cached_result:
             return cached_result
         
-        if not self._initialize_groq():
+        model = model_router.choose_for_text('simplify', text)
+        
+        # Reuse, or patch, the simplification of a near-identical document
+        near_duplicate_result = self._get_near_duplicate_result(text)
+        if near_duplicate_result:
+            cache.set(simplified_cache_key(text, model), near_duplicate_result, 3600)
+            return near_duplicate_result
+        
+        timeout = 3600
+        if get_llm_client() is None:
             result = self._get_fallback_response(text)
+            timeout = settings.AI_FALLBACK_CACHE_TIMEOUT
         else:
             try:
-                completion = self._groq_client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": self._get_optimized_prompt()
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Explain this legal document:\n\n{text[:4000]}"  # Limit input
-                        }
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.3,
-                    max_tokens=1500,  # Reduced for faster response
-                    timeout=30  # 30 second timeout
-                )
-                
-                result = completion.choices[0].message.content
+                # Cached under the model that answered, which may be the fast one
+                result, model = self._simplify_with_model(text, model)
+                self._index_near_duplicates(text)
             except Exception:
                 result = self._get_fallback_response(text)
+                # Degraded answers expire quickly so the LLM is retried soon
+                timeout = settings.AI_FALLBACK_CACHE_TIMEOUT
         
-        # Cache result for 1 hour
-        cache.set(cache_key, result, 3600)
+        cache.set(simplified_cache_key(text, model), result, timeout)
         return result
     
+    def _get_near_duplicate_result(self, text):
+        """
+        Simplification of an earlier near-identical document.
+
+        Reused as is when only whitespace differs, otherwise patched with
+        the differing names, dates and amounts (see result_patch). Counted
+        under similarity.lookups as hit, patched, near_duplicate (similar
+        but not patchable) or miss.
+        """
+        if not settings.NEAR_DUPLICATE_ENABLED:
+            return None
+        # Stored results and texts outlive the cache
+        from .results import get_original_text, get_simplified_text
+        try:
+            matches = get_similarity_index().find(text, exclude=content_hash(text))
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed: {str(e)}")
+            return None
+        
+        outcome = 'near_duplicate' if matches else 'miss'
+        result = None
+        for content_id, score, same_layout in matches:
+            earlier_result = get_cached_simplification_for_id(content_id)
+            if earlier_result is None:
+                # Stored results carry the glossary section, added again by the pipeline
+                earlier_result = split_glossary_section(get_simplified_text(content_id) or '')[0]
+            if not earlier_result or is_fallback_response(text, earlier_result):
+                continue
+            if same_layout:
+                result, outcome = earlier_result, 'hit'
+                break
+            earlier_text = get_original_text(content_id)
+            if earlier_text is None:
+                continue
+            result = patch_result(earlier_result, earlier_text, text)
+            if result:
+                outcome = 'patched'
+                break
+        
+        stats.increment('similarity.lookups', outcome)
+        if result:
+            logger.info(f"Reusing simplification of near-duplicate {content_id[:12]} ({score:.2f}, {outcome})")
+        return result
+    
+    def _index_near_duplicates(self, text):
+        if not settings.NEAR_DUPLICATE_ENABLED:
+            return
+        try:
+            get_similarity_index().add(text, content_hash(text))
+        except Exception as e:
+            logger.warning(f"Could not index document for near-duplicate reuse: {str(e)}")
+    
+    def _simplify_with_model(self, text, model):
+        """
+        Simplify with the routed model, optionally after a fast first pass.
+
+        Returns:
+            tuple: (simplified text, model that produced it)
+        """
+        if model_router.use_first_pass('simplify', model):
+            try:
+                completion, answered_by = self._request_completion(text, model_router.fast_model)
+                if model_router.accept_first_pass(completion):
+                    return completion.choices[0].message.content, answered_by
+            except Exception as e:
+                logger.warning(f"Fast first pass failed, escalating: {str(e)}")
+        
+        completion, answered_by = self._request_completion(text, model)
+        return completion.choices[0].message.content, answered_by
+    
+    def _request_completion(self, text, model):
+        """Single budgeted simplification call, returning (completion, model that answered)."""
+        system_prompt = self._get_optimized_prompt()
+        # Fit input to the token budget at a sentence boundary
+        plan = plan_request('simplify', model, system_prompt, text)
+        
+        completion, answered_by = model_router.timed_completion(
+            get_llm_client(),
+            'simplify',
+            model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": f"Explain this legal document:\n\n{plan.text}"
+                }
+            ],
+            temperature=0.3,
+            max_tokens=plan.max_output_tokens,
+            timeout=settings.AI_SIMPLIFY_TIMEOUT
+        )
+        
+        record_usage('simplify', answered_by, 'en', plan, completion)
+        return completion, answered_by
+    
     @lru_cache(maxsize=1)
     def _get_optimized_prompt(self):
         """Cached optimized system prompt."""
-        return """You are a legal expert. Explain legal documents in simple terms using this format:
+        # With the glossary on, terms are explained locally after the call
+        terms_section = "" if settings.GLOSSARY_ENABLED else """## 📝 Important Terms
+Key legal terms explained simply
+
+"""
+        return f"""You are a legal expert. Explain legal documents in simple terms using this format:
 
 # 📋 Document Summary
 
@@ -103,10 +177,7 @@ Brief 2-sentence summary
 ## 👥 Key Parties
 Main people/organizations involved
 
-## 📝 Important Terms
-Key legal terms explained simply
-
-## 📄 Main Points
+{terms_section}## 📄 Main Points
 - Key clauses in plain English
 - Important obligations
 
@@ -119,6 +190,14 @@ What to do next
 Use simple language. Be concise."""
     
     def _get_fallback_response(self, text):
+        """Local extractive summary, or a static stub if even that fails."""
+        try:
+            return summarize(text)
+        except Exception as e:
+            logger.error(f"Extractive summary failed: {str(e)}")
+            return self._get_stub_response(text)
+    
+    def _get_stub_response(self, text):
         """Optimized fallback response."""
         return f"""# 📋 Document Analysis
 
@@ -138,9 +217,34 @@ The AI service is not configured. Configure your Groq API key for detailed analy
 ## 🎯 Recommendation
 Configure AI service or consult an attorney."""
 
+def simplified_cache_key(text, model):
+    """Cache key for the simplification of ``text`` by ``model``."""
+    return simplified_cache_key_for_id(content_hash(text), model)
+
+def simplified_cache_key_for_id(content_id, model):
+    """Cache key for the simplification of the text with hash ``content_id``."""
+    return f"simplified_{model}_{content_id}"
+
+def get_cached_simplification_for_id(content_id):
+    """Cached simplification of the text with hash ``content_id`` by any model, or None."""
+    for model in model_router.cached_models():
+        result = cache.get(simplified_cache_key_for_id(content_id, model))
+        if result:
+            return result
+    return None
+
+def get_cached_simplification(text):
+    """Cached simplification of ``text`` by any model (large model first), or None."""
+    return get_cached_simplification_for_id(content_hash(text))
+
 # Global singleton instance
 ai_service = AIService()
 
 def simplify_legal_text(text):
     """Optimized convenience function."""
-    return ai_service.simplify_legal_text(text)
\ No newline at end of file
+    return ai_service.simplify_legal_text(text)
+
+def is_fallback_response(text, result):
+    """Whether ``result`` is the canned fallback for ``text`` rather than an AI answer."""
+    result, _ = split_glossary_section(result)
+    return is_extractive_summary(result) or result == ai_service._get_stub_response(text)
\ No newline at end of file
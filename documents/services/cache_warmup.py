@@ -0,0 +1,242 @@
+"""
+Cache warmup for frequently uploaded legal templates.
+
+Runs a corpus of standard documents (NDAs, leases, employment agreements)
+through the full pipeline so a freshly started worker already holds their
+extraction, simplification and translation results.
+
+The ``warm_cache`` command calls the LLM once per deploy and stores the
+results in the database. Workers warm their in-memory cache at boot from
+those stored results only, so recycling a worker never spends LLM quota.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .hashing import content_hash
+from .text_extractor import determine_file_type, extraction_cache_key
+from .ai_service import get_cached_simplification, is_fallback_response, simplified_cache_key
+from .translation_service import get_cached_translation, translation_cache_key
+from .model_router import model_router
+from .pipeline import extract_document_text, simplify_and_translate
+from .glossary import split_glossary_section
+from .results import (
+    get_simplified_text,
+    get_stored_translation,
+    save_result,
+    save_translation,
+    store_original_text,
+)
+
+logger = logging.getLogger(__name__)
+
+STATUS_WARMED = 'warmed'
+STATUS_LOADED = 'loaded'
+STATUS_MISSING = 'missing'
+STATUS_CACHED = 'cached'
+STATUS_FAILED = 'failed'
+
+
+def discover_corpus(corpus_dir):
+    """
+    List supported documents in a corpus directory (recursively).
+
+    Args:
+        corpus_dir: Directory containing template documents
+
+    Returns:
+        list: Sorted list of (Path, file_type) tuples
+    """
+    root = Path(corpus_dir)
+    if not root.is_dir():
+        raise Exception(f"Corpus directory not found: {corpus_dir}")
+
+    documents = []
+    for path in sorted(root.rglob('*')):
+        if not path.is_file():
+            continue
+        file_type = determine_file_type(path.name, '')
+        if file_type != 'unknown':
+            documents.append((path, file_type))
+    return documents
+
+
+def is_cached(file_content, file_type, languages):
+    """Check whether every pipeline stage for a document is already cached."""
+    if cache.get(extraction_cache_key(file_content, file_type)) is None:
+        return False
+
+    extracted_text = extract_document_text(file_content, file_type)
+    if not extracted_text:
+        # Nothing to simplify; the extraction result is all there is to warm
+        return True
+
+    simplified_text = get_cached_simplification(extracted_text)
+    if simplified_text is None:
+        return False
+
+    return all(
+        get_cached_translation(simplified_text, language) is not None
+        for language in languages
+        if language != 'en'
+    )
+
+
+def _llm_text(stored_text):
+    # Stored texts carry the glossary section, which the pipeline adds after the LLM call
+    if settings.GLOSSARY_ENABLED:
+        stored_text, _ = split_glossary_section(stored_text)
+    return stored_text
+
+
+def load_stored_results(extracted_text, languages):
+    """
+    Fill the simplification and translation caches from stored results.
+
+    Returns:
+        bool: True if a result was stored for every language
+    """
+    content_id = content_hash(extracted_text)
+    stored_text = get_simplified_text(content_id)
+    if stored_text is None:
+        return False
+
+    # The producing model is not stored; any model's entry satisfies the lookups
+    model = model_router.large_model
+    simplified_text = _llm_text(stored_text)
+    cache.set(simplified_cache_key(extracted_text, model), simplified_text, 3600)
+
+    complete = True
+    for language in languages:
+        if language == 'en':
+            continue
+        translated_text = get_stored_translation(content_id, language)
+        if translated_text is None:
+            complete = False
+            continue
+        cache.set(
+            translation_cache_key(simplified_text, language, model), _llm_text(translated_text), 7200
+        )
+    return complete
+
+
+def warm_document(path, file_type, languages, call_llm=True):
+    """
+    Warm the caches for one document and each configured language.
+
+    Stored results are loaded first; only what is missing goes through the
+    LLM, and is stored for later runs and other workers.
+
+    Returns:
+        str: STATUS_CACHED if nothing had to be computed, STATUS_LOADED if
+        stored results covered everything, STATUS_MISSING if they did not
+        and ``call_llm`` is False, else STATUS_WARMED
+    """
+    file_content = Path(path).read_bytes()
+    if is_cached(file_content, file_type, languages):
+        return STATUS_CACHED
+
+    extracted_text = extract_document_text(file_content, file_type)
+    if not extracted_text:
+        return STATUS_WARMED
+    if load_stored_results(extracted_text, languages):
+        return STATUS_LOADED
+    if not call_llm:
+        return STATUS_MISSING
+
+    content_id = content_hash(extracted_text)
+    for language in languages or ['en']:
+        simplified_text, translated_text = simplify_and_translate(extracted_text, language)
+        if is_fallback_response(extracted_text, simplified_text):
+            continue
+        save_result(content_id, simplified_text)
+        if translated_text:
+            save_translation(content_id, language, translated_text)
+    # Lets filled-in copies of the template reuse its result (near-duplicate patching)
+    store_original_text(extracted_text)
+    return STATUS_WARMED
+
+
+def warm_cache(corpus_dir, languages=None, workers=None, progress=None, call_llm=True):
+    """
+    Pre-populate the caches from every document in a corpus directory.
+
+    Args:
+        corpus_dir: Directory containing template documents
+        languages: Target language codes (defaults to CACHE_WARMUP_LANGUAGES)
+        workers: Number of parallel workers (defaults to CACHE_WARMUP_WORKERS)
+        progress: Optional callable(done, total, path, status) invoked per document
+        call_llm: Simplify documents without stored results (else skip them)
+
+    Returns:
+        dict: Counts per status plus the total number of documents
+    """
+    if languages is None:
+        languages = settings.CACHE_WARMUP_LANGUAGES
+    if workers is None:
+        workers = settings.CACHE_WARMUP_WORKERS
+
+    documents = discover_corpus(corpus_dir)
+    summary = {'total': len(documents)}
+    summary.update(dict.fromkeys(
+        (STATUS_WARMED, STATUS_LOADED, STATUS_MISSING, STATUS_CACHED, STATUS_FAILED), 0
+    ))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(warm_document, path, file_type, languages, call_llm): path
+            for path, file_type in documents
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"Cache warmup failed for {path}: {str(e)}")
+                result = STATUS_FAILED
+            summary[result] += 1
+            if progress:
+                progress(done, summary['total'], path, result)
+
+    logger.info(
+        f"Cache warmup finished: {summary[STATUS_WARMED]} warmed, "
+        f"{summary[STATUS_LOADED]} loaded from stored results, "
+        f"{summary[STATUS_MISSING]} without stored results, "
+        f"{summary[STATUS_CACHED]} already cached, {summary[STATUS_FAILED]} failed"
+    )
+    return summary
+
+
+def start_background_warmup():
+    """
+    Startup hook: warm the cache in a daemon thread if enabled in settings.
+
+    Only results stored by the ``warm_cache`` command are loaded; documents
+    without them are skipped rather than sent to the LLM by every worker.
+
+    Returns:
+        threading.Thread or None
+    """
+    corpus_dir = settings.CACHE_WARMUP_CORPUS_DIR
+    if not settings.CACHE_WARMUP_ON_STARTUP or not corpus_dir:
+        return None
+
+    def _run():
+        try:
+            summary = warm_cache(corpus_dir, call_llm=False)
+            if summary[STATUS_MISSING]:
+                logger.warning(
+                    f"{summary[STATUS_MISSING]} warmup documents have no stored results; "
+                    f"run `python manage.py warm_cache` once per deploy"
+                )
+        except Exception as e:
+            logger.error(f"Startup cache warmup error: {str(e)}")
+
+    thread = threading.Thread(target=_run, name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,250 @@
+"""
+Sandboxed text extraction.
+
+Extraction runs in a small pool of child processes with rlimits on CPU time
+and address space, plus a wall-clock timeout enforced by the parent. A
+pathological PDF or decompression-bomb image kills or exhausts only its
+child, which is then replaced. Children are also recycled after a fixed
+number of jobs to shed leaked memory from the parsing libraries.
+"""
+
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+
+from .lazy_imports import EXTRACTION_FORMATS, format_modules
+from .stats import stats
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, the wall-clock timeout still applies
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionLimitError(Exception):
+    """
+    A document exceeded an extraction limit.
+
+    CPU and memory limits are per job and depend only on the file, so those
+    outcomes are safe to cache. Timeouts and crashes also depend on load
+    (CPU contention, the OOM killer) and are not.
+    """
+
+    FILE_LIMITS = ('cpu', 'memory')
+
+    MESSAGES = {
+        'timeout': "Text extraction took longer than {limit} seconds",
+        'cpu': "Text extraction used more than {limit} seconds of CPU time",
+        'memory': "Text extraction needed more than {limit} MB of memory",
+        'crashed': "Text extraction crashed on this file",
+    }
+
+    def __init__(self, reason, limit=None):
+        self.reason = reason
+        self.limit = limit
+        super().__init__(
+            self.MESSAGES[reason].format(limit=limit)
+            + ". The file may be corrupt or too complex; try a smaller or simpler version."
+        )
+
+    @property
+    def cacheable(self):
+        """Whether the same file would hit the limit again regardless of load."""
+        return self.reason in self.FILE_LIMITS
+
+
+class _CpuLimitExceeded(BaseException):
+    """Raised in a child on SIGXCPU (BaseException so extractors cannot swallow it)."""
+
+
+def _on_cpu_limit(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _set_cpu_limit(cpu_seconds):
+    # RLIMIT_CPU counts the whole process lifetime, so each job gets its
+    # allowance on top of what earlier jobs used. Only the soft limit moves;
+    # an unprivileged process could never raise a lowered hard limit again.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, cpu_seconds, memory_mb):
+    """Child loop: receive (file_content, file_type), send back the outcome."""
+    from .text_extractor import extract_text_uncached
+
+    if resource is not None:
+        memory_bytes = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        file_content, file_type = job
+        try:
+            if resource is not None:
+                _set_cpu_limit(cpu_seconds)
+            conn.send(('ok', extract_text_uncached(file_content, file_type)))
+        except _CpuLimitExceeded:
+            conn.send(('limit', 'cpu'))
+            return
+        except MemoryError:
+            conn.send(('limit', 'memory'))
+            return
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+def sandbox_preload_modules():
+    """
+    Modules the forkserver imports once, so every child it forks (including
+    those replacing recycled or killed children) starts with them loaded.
+
+    text_extractor imports its backends lazily, so they are listed
+    explicitly; missing optional backends are skipped by the forkserver.
+    """
+    return ['documents.services.text_extractor', *format_modules(EXTRACTION_FORMATS)]
+
+
+class _SandboxProcess:
+    """One child process and the parent's end of its pipe."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, settings.EXTRACTION_CPU_SECONDS, settings.EXTRACTION_MEMORY_MB),
+            name='extraction-sandbox',
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    @property
+    def reusable(self):
+        return self.process.is_alive() and self.jobs < settings.EXTRACTION_MAX_JOBS_PER_WORKER
+
+    def run(self, file_content, file_type, timeout):
+        """
+        Returns:
+            tuple: ('ok', (text, report)), ('error', message) or ('limit', reason)
+        """
+        self.jobs += 1
+        try:
+            self.conn.send((file_content, file_type))
+            if not self.conn.poll(timeout):
+                return ('limit', 'timeout')
+            return self.conn.recv()
+        except (EOFError, OSError):
+            # Killed outright (hard rlimit, OOM killer, segfault in a C library)
+            return ('limit', 'crashed')
+
+    def close(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionSandbox:
+    """Bounded pool of sandbox processes shared by the threads of a worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = []
+        self._slots = None
+        self._context = None
+
+    def _setup(self):
+        # Created on first use so nothing is forked before gunicorn forks workers
+        with self._lock:
+            if self._slots is None:
+                self._context = multiprocessing.get_context(settings.EXTRACTION_START_METHOD)
+                if settings.EXTRACTION_START_METHOD == 'forkserver':
+                    self._context.set_forkserver_preload(sandbox_preload_modules())
+                self._slots = threading.BoundedSemaphore(settings.EXTRACTION_WORKERS)
+
+    def _acquire_process(self):
+        with self._lock:
+            while self._idle:
+                sandbox_process = self._idle.pop()
+                if sandbox_process.reusable:
+                    return sandbox_process
+                sandbox_process.close()
+        stats.increment('extraction.sandbox', 'spawned')
+        return _SandboxProcess(self._context)
+
+    def extract(self, file_content, file_type):
+        """
+        Extract text in a sandbox process.
+
+        Returns:
+            tuple: (extracted text, PdfReport or None) as from ``extract_text_uncached``
+
+        Raises:
+            ExtractionLimitError: the file hit a time, CPU or memory limit
+            Exception: the extractor itself failed (as when run inline)
+        """
+        self._setup()
+        timeout = settings.EXTRACTION_TIMEOUT
+        with self._slots:
+            sandbox_process = self._acquire_process()
+            started = time.perf_counter()
+            outcome = sandbox_process.run(file_content, file_type, timeout)
+            stats.observe('extraction.sandbox_ms', (time.perf_counter() - started) * 1000, file_type)
+
+            if outcome[0] == 'limit':
+                sandbox_process.close(kill=True)
+            elif sandbox_process.reusable:
+                with self._lock:
+                    self._idle.append(sandbox_process)
+            else:
+                sandbox_process.close()
+
+        kind, value = outcome
+        if kind == 'ok':
+            return value
+        if kind == 'error':
+            raise Exception(value)
+
+        stats.increment('extraction.limit_exceeded', f"{file_type}:{value}")
+        logger.warning(f"Extraction of {file_type} file stopped: {value} limit")
+        limits = {
+            'timeout': timeout,
+            'cpu': settings.EXTRACTION_CPU_SECONDS,
+            'memory': settings.EXTRACTION_MEMORY_MB,
+        }
+        raise ExtractionLimitError(value, limits.get(value))
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sandbox_process in idle:
+            sandbox_process.close()
+
+
+# Global per-process sandbox pool
+extraction_sandbox = ExtractionSandbox()
@@ -0,0 +1,248 @@
+"""
+Local extractive summarizer used when the LLM is unavailable.
+
+Sentences are scored with TextRank over TF-IDF sentence vectors (NumPy,
+CPU only), and parties, dates, amounts and obligations are picked out with
+rules. The result fills the same markdown sections as the LLM prompt, so
+the frontend renders it unchanged. A 50k-character document takes a few
+tens of milliseconds.
+"""
+
+import logging
+import re
+from collections import Counter
+
+from .lazy_imports import optional_import
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Shown at the top of every extractive summary (also how it is recognized)
+DEGRADED_NOTICE = (
+    "> ⚡ Quick automatic summary: key sentences taken directly from the document. "
+    "A detailed plain-language explanation is temporarily unavailable."
+)
+
+MAX_SENTENCES = 400
+MAX_VOCABULARY = 1500
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+MIN_SENTENCE_WORDS = 5
+MAX_SENTENCE_CHARS = 400
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+(?=[A-Z0-9"(\u201C])|\n{2,}')
+_WORD = re.compile(r'[a-z]{3,}')
+_KEY_WORD = re.compile(r'\w+')
+_STOP_WORDS = frozenset("""
+    the and for that this with from shall will such any all are not may have has been
+    under upon which each other than its into said thereof hereof herein hereby there
+    their they them these those who whom what when where being was were would should
+    could also only more most per but nor our your you his her
+""".split())
+
+_PARTY_BETWEEN = re.compile(
+    r'\bbetween\s+(.{3,120}?)\s*(?:\([^)]*\)\s*)?,?\s+and\s+(.{3,120}?)\s*(?:\(|,|\.|;|\n)',
+    re.IGNORECASE
+)
+_DEFINED_ROLE = re.compile(r'\(\s*(?:the\s+|hereinafter\s+)?["\u201C]([A-Z][\w ]{1,30})["\u201D]\s*\)')
+_ORGANIZATION = re.compile(
+    r'\b((?:[A-Z][\w&\-]*\s+){0,4}(?:Inc|LLC|Ltd|Limited|Corp|Corporation|LLP|GmbH|Pvt|PLC)\b\.?)'
+)
+_DATE = re.compile(
+    r'\b(?:(?:January|February|March|April|May|June|July|August|September|October|November|December)'
+    r'\s+\d{1,2},?\s+\d{4}'
+    r'|\d{1,2}(?:st|nd|rd|th)?\s+(?:January|February|March|April|May|June|July|August|September|October|November|December),?\s+\d{4}'
+    r'|\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}/\d{1,2}/\d{2,4})\b'
+)
+_AMOUNT = re.compile(r'(?:[$\u20AC\u00A3\u20B9]|\b(?:USD|EUR|GBP|INR|Rs\.?)\s?)\s?\d[\d,]*(?:\.\d+)?')
+_OBLIGATION = re.compile(
+    r'\b(?:shall|must|agrees? to|is required to|are required to|undertakes? to|will not|may not)\b',
+    re.IGNORECASE
+)
+_WARNING = re.compile(
+    r'\b(?:terminat\w*|penalt\w*|liab\w*|indemnif\w*|breach\w*|default\w*|forfeit\w*|'
+    r'waive\w*|late fee|interest|evict\w*|damages|non-refundable|arbitration)\b',
+    re.IGNORECASE
+)
+
+
+def split_sentences(text):
+    """Sentences worth scoring, with layout-only fragments dropped."""
+    sentences = []
+    for raw in _SENTENCE_SPLIT.split(text):
+        sentence = ' '.join(raw.split())
+        if len(sentence.split()) >= MIN_SENTENCE_WORDS:
+            sentences.append(sentence[:MAX_SENTENCE_CHARS])
+            if len(sentences) == MAX_SENTENCES:
+                break
+    return sentences
+
+
+def score_sentences(sentences):
+    """
+    TextRank centrality of each sentence over TF-IDF cosine similarity.
+
+    Returns:
+        numpy.ndarray or None if NumPy is not installed
+    """
+    np = optional_import('numpy')
+    if np is None or not sentences:
+        return None
+
+    tokenized = [
+        [word for word in _WORD.findall(sentence.lower()) if word not in _STOP_WORDS]
+        for sentence in sentences
+    ]
+    document_frequency = Counter(word for words in tokenized for word in set(words))
+    vocabulary = {
+        word: index
+        for index, (word, _) in enumerate(document_frequency.most_common(MAX_VOCABULARY))
+    }
+
+    rows = []
+    columns = []
+    for row, words in enumerate(tokenized):
+        for word in words:
+            column = vocabulary.get(word)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+
+    count = len(sentences)
+    term_counts = np.zeros((count, len(vocabulary)), dtype=np.float32)
+    np.add.at(term_counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1)
+
+    df = np.array([document_frequency[word] for word in vocabulary], dtype=np.float32)
+    tfidf = np.log1p(term_counts) * (np.log((1 + count) / (1 + df)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf /= np.where(norms == 0, 1, norms)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = similarity / np.where(out_weight == 0, 1, out_weight)
+
+    scores = np.full(count, 1 / count, dtype=np.float32)
+    for _ in range(TEXTRANK_ITERATIONS):
+        scores = (1 - TEXTRANK_DAMPING) / count + TEXTRANK_DAMPING * (transition.T @ scores)
+
+    # Opening sentences usually state what the document is
+    scores *= 1 + 0.5 / (1 + np.arange(count, dtype=np.float32))
+    return scores
+
+
+def _sentence_key(sentence):
+    # Boilerplate repeats sentences with different case, spacing or punctuation
+    return ' '.join(_KEY_WORD.findall(sentence.lower()))
+
+
+def _top(sentences, scores, limit, pattern=None, exclude=()):
+    """
+    Highest scoring distinct sentences (matching ``pattern``), in document order.
+
+    Repeats of a chosen or excluded sentence are skipped.
+    """
+    candidates = [
+        index for index, sentence in enumerate(sentences)
+        if index not in exclude and (pattern is None or pattern.search(sentence))
+    ]
+    if scores is not None:
+        candidates.sort(key=lambda index: -scores[index])
+
+    seen = {_sentence_key(sentences[index]) for index in exclude}
+    chosen = []
+    for index in candidates:
+        key = _sentence_key(sentences[index])
+        if key in seen:
+            continue
+        seen.add(key)
+        chosen.append(index)
+        if len(chosen) == limit:
+            break
+    return sorted(chosen)
+
+
+def _unique(values, limit):
+    seen = []
+    for value in values:
+        value = ' '.join(value.split()).strip(' ,.;')
+        if value and value not in seen:
+            seen.append(value)
+            if len(seen) == limit:
+                break
+    return seen
+
+
+def find_parties(text):
+    """Party names from 'between X and Y', defined roles and company suffixes."""
+    head = text[:5000]
+    parties = []
+    for match in _PARTY_BETWEEN.finditer(head):
+        parties.extend(match.groups())
+    parties.extend(_DEFINED_ROLE.findall(head))
+    parties.extend(_ORGANIZATION.findall(head))
+    return _unique(parties, 6)
+
+
+def _bullets(items, empty):
+    if not items:
+        return f"- {empty}"
+    return '\n'.join(f"- {item}" for item in items)
+
+
+def summarize(text):
+    """
+    Build a markdown summary in the same sections as the LLM output.
+
+    Returns:
+        str: Markdown summary
+    """
+    sentences = split_sentences(text)
+    scores = score_sentences(sentences)
+
+    # The opening sentence usually names the document and parties
+    overview = sorted({0} | set(_top(sentences, scores, 1, exclude={0}))) if sentences else []
+    main_points = _top(sentences, scores, 5, _OBLIGATION, exclude=set(overview))
+    if not main_points:
+        main_points = _top(sentences, scores, 5, exclude=set(overview))
+    warnings = _top(sentences, scores, 3, _WARNING, exclude=set(overview) | set(main_points))
+
+    parties = find_parties(text)
+    dates = _unique(_DATE.findall(text), 5)
+    amounts = _unique(_AMOUNT.findall(text), 5)
+
+    terms = []
+    if dates:
+        terms.append(f"**Dates:** {', '.join(dates)}")
+    if amounts:
+        terms.append(f"**Amounts:** {', '.join(amounts)}")
+
+    stats.increment('summarizer.extractive', 'ranked' if scores is not None else 'unranked')
+    return f"""# 📋 Document Summary
+
+{DEGRADED_NOTICE}
+
+## 🔍 Overview
+{' '.join(sentences[index] for index in overview) or 'No summary sentences could be found in this document.'}
+
+## 👥 Key Parties
+{_bullets(parties, 'Not identified automatically; check the opening paragraph.')}
+
+## 📅 Dates & Amounts
+{_bullets(terms, 'No dates or amounts detected.')}
+
+## 📄 Main Points
+{_bullets([sentences[index] for index in main_points], 'No obligations detected.')}
+
+## ⚠️ Key Warnings
+{_bullets([sentences[index] for index in warnings], 'Review termination, liability and payment clauses carefully.')}
+
+## 🎯 Next Steps
+- Read the full clauses quoted above in the original document
+- Note every date and amount listed
+- Consider legal consultation before signing"""
+
+
+def is_extractive_summary(result):
+    return DEGRADED_NOTICE in result
@@ -0,0 +1,206 @@
+"""
+Curated legal glossary matched without the LLM.
+
+Term spellings from ``documents/data/legal_glossary.json`` are compiled once
+into an Aho-Corasick automaton, so the full extracted text is scanned in a
+single linear pass however many terms there are. Matched terms get
+plain-language definitions written in advance for every supported language,
+and the "Important Terms" section is built from them instead of being
+generated (and translated) by the LLM.
+"""
+
+import json
+import logging
+import re
+from collections import Counter, deque
+from functools import lru_cache
+from pathlib import Path
+
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+GLOSSARY_PATH = Path(__file__).resolve().parent.parent / 'data' / 'legal_glossary.json'
+# Terms listed per document, most frequent first
+MAX_TERMS = 8
+SECTION_HEADING = '## 📝 '
+# The LLM output (and its translations) keep the emoji on each heading
+MAIN_POINTS_HEADING = '## 📄'
+
+_WHITESPACE = re.compile(r'\s+')
+_SECTION = re.compile(r'^' + re.escape(SECTION_HEADING) + r'.*\n(?:(?!## ).*(?:\n|$))*', re.MULTILINE)
+_ENTRY_NAME = re.compile(r'^- \*\*(.+?)\*\*:', re.MULTILINE)
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over lowercase term spellings."""
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: Iterable of (spelling, term_id) pairs
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for spelling, term_id in patterns:
+            spelling = _WHITESPACE.sub(' ', spelling.lower()).strip()
+            state = 0
+            for char in spelling:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((len(spelling), term_id))
+
+        # Breadth-first so every failure link points at a finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @property
+    def size(self):
+        return len(self._goto)
+
+    def scan(self, text):
+        """
+        Find whole-word, case-insensitive term occurrences.
+
+        Yields:
+            tuple: (start, end, term_id) in the lowercased, whitespace-collapsed text
+        """
+        text = _WHITESPACE.sub(' ', text.lower())
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, term_id in output[state]:
+                start = index - length + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (
+                    index + 1 == len(text) or not text[index + 1].isalnum()
+                ):
+                    yield start, index + 1, term_id
+
+
+class Glossary:
+    """Term definitions per language and the matcher built from their spellings."""
+
+    def __init__(self, data):
+        self.section_titles = data['section_titles']
+        self.terms = {term['id']: term for term in data['terms']}
+        self.matcher = TermMatcher(
+            (spelling, term['id']) for term in data['terms'] for spelling in term['patterns']
+        )
+        # Rendered names in any language map back to their term
+        self._ids_by_name = {}
+        for term in data['terms']:
+            for name in term['names'].values():
+                self._ids_by_name.setdefault(name.lower(), term['id'])
+
+    def find_terms(self, text):
+        """Ids of glossary terms in text, most frequent first (ties by first use)."""
+        counts = Counter(term_id for _, _, term_id in self.matcher.scan(text))
+        term_ids = [term_id for term_id, _ in counts.most_common(MAX_TERMS)]
+        stats.observe('glossary.terms_found', len(counts))
+        return term_ids
+
+    def entries(self, term_ids, language='en'):
+        """Term names and definitions in language (English if missing)."""
+        entries = []
+        for term_id in term_ids:
+            term = self.terms.get(term_id)
+            if term is None:
+                continue
+            entries.append({
+                'id': term_id,
+                'term': term['names'].get(language) or term['names']['en'],
+                'definition': term['definitions'].get(language) or term['definitions']['en'],
+            })
+        return entries
+
+    def section(self, term_ids, language='en'):
+        """Markdown "Important Terms" section, or '' when nothing matched."""
+        entries = self.entries(term_ids, language)
+        if not entries:
+            return ''
+        title = self.section_titles.get(language) or self.section_titles['en']
+        lines = [f"{SECTION_HEADING}{title}"]
+        lines.extend(f"- **{entry['term']}**: {entry['definition']}" for entry in entries)
+        return '\n'.join(lines)
+
+    def split_section(self, text):
+        """
+        Remove an injected glossary section from markdown.
+
+        Returns:
+            tuple: (text without the section, term ids it listed)
+        """
+        # Other sections share the heading emoji; ours lists glossary terms
+        for match in _SECTION.finditer(text):
+            term_ids = []
+            for name in _ENTRY_NAME.findall(match.group(0)):
+                term_id = self._ids_by_name.get(name.lower())
+                if term_id and term_id not in term_ids:
+                    term_ids.append(term_id)
+            if term_ids:
+                remaining = text[:match.start()] + text[match.end():]
+                if match.end() == len(text):
+                    remaining = remaining.rstrip()
+                return remaining, term_ids
+        return text, []
+
+    def add_section(self, text, term_ids, language='en'):
+        """Insert the glossary section before "Main Points" (or at the end)."""
+        text, _ = self.split_section(text)
+        section = self.section(term_ids, language)
+        if not section:
+            return text
+        position = text.find(MAIN_POINTS_HEADING)
+        if position == -1:
+            return f"{text.rstrip()}\n\n{section}"
+        return f"{text[:position]}{section}\n\n{text[position:]}"
+
+
+@lru_cache(maxsize=1)
+def get_glossary():
+    """The glossary, loaded and compiled once per process."""
+    with open(GLOSSARY_PATH, encoding='utf-8') as f:
+        glossary = Glossary(json.load(f))
+    logger.info(
+        f"Loaded legal glossary: {len(glossary.terms)} terms, {glossary.matcher.size} automaton states"
+    )
+    return glossary
+
+
+def find_terms(text):
+    """Convenience function for ``get_glossary().find_terms``."""
+    return get_glossary().find_terms(text)
+
+
+def add_glossary_section(text, term_ids, language='en'):
+    """Convenience function for ``get_glossary().add_section``."""
+    return get_glossary().add_section(text, term_ids, language)
+
+
+def split_glossary_section(text):
+    """Convenience function for ``get_glossary().split_section``."""
+    return get_glossary().split_section(text)
+
+
+def glossary_entries(term_ids, language='en'):
+    """Convenience function for ``get_glossary().entries``."""
+    return get_glossary().entries(term_ids, language)
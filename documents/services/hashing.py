@@ -0,0 +1,23 @@
+"""
+Stable content hashing for cache keys and resource identifiers.
+"""
+
+import hashlib
+
+
+def content_hash(data):
+    """
+    Return a stable SHA-256 hex digest of text or binary content.
+
+    Unlike the built-in ``hash()``, the digest is identical across processes
+    and restarts, so it can be shared by workers and warmup jobs.
+
+    Args:
+        data: ``str`` or ``bytes`` content
+
+    Returns:
+        str: 64-character hex digest
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,164 @@
+"""
+Offline language identification.
+
+Non-Latin scripts are identified from Unicode ranges. Latin-script
+languages are scored by the cosine similarity of padded character trigram
+frequencies against profiles built at first use from each language's
+frequent words, plus the share of the text's words found in that list.
+Trigrams separate language families; the word share separates close
+languages such as Swedish, Danish and Norwegian, whose trigrams overlap.
+Used to skip translations into the language a text is already in (only on
+a decisive lead, see SKIP_MARGIN) and to pick Tesseract language packs.
+"""
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from django.core.cache import cache
+
+from .hashing import content_hash
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Characters examined per text; enough for a stable guess
+SAMPLE_CHARS = 3000
+MIN_LETTERS = 20
+# Minimum share of letters in a script for it to decide the language
+SCRIPT_SHARE = 0.3
+# Minimum score, and lead over the runner-up, for a confident guess
+MIN_SIMILARITY = 0.1
+MIN_MARGIN = 0.02
+# Lead required before a translation is skipped as already in the target language
+SKIP_MARGIN = 0.08
+# Weight of the frequent-word share in a language's score
+WORD_WEIGHT = 0.5
+
+_SCRIPTS = {
+    'hi': re.compile(r'[\u0900-\u097F]'),
+    'ar': re.compile(r'[\u0600-\u06FF\u0750-\u077F]'),
+    'ru': re.compile(r'[\u0400-\u04FF]'),
+    'th': re.compile(r'[\u0E00-\u0E7F]'),
+    'ko': re.compile(r'[\uAC00-\uD7AF\u1100-\u11FF]'),
+    'ja': re.compile(r'[\u3040-\u30FF]'),
+    'zh': re.compile(r'[\u4E00-\u9FFF]'),
+}
+# Share of kana that marks kanji-heavy text as Japanese rather than Chinese
+KANA_SHARE = 0.05
+_LETTER = re.compile(r'[^\W\d_]')
+_LATIN_WORD = re.compile(r'[a-z\u00C0-\u024F\u1E00-\u1EFF]+')
+
+# Frequent words per Latin-script language: function words, common verbs
+# and contract vocabulary, including the words that tell close languages
+# apart (Swedish "och/inte/är", Danish "af/efter/sig", Norwegian "av/etter/seg")
+WORDS_PATH = Path(__file__).resolve().parent.parent / 'data' / 'language_words.json'
+
+# Tesseract language packs per language code
+TESSERACT_LANGUAGES = {
+    'en': 'eng', 'es': 'spa', 'fr': 'fra', 'de': 'deu', 'pt': 'por', 'it': 'ita',
+    'vi': 'vie', 'nl': 'nld', 'pl': 'pol', 'sv': 'swe', 'da': 'dan', 'no': 'nor',
+    'fi': 'fin', 'hi': 'hin', 'ar': 'ara', 'ru': 'rus', 'th': 'tha', 'ko': 'kor',
+    'ja': 'jpn', 'zh': 'chi_sim',
+}
+# Tesseract OSD script names per language code
+OSD_SCRIPTS = {
+    'Devanagari': 'hi', 'Arabic': 'ar', 'Cyrillic': 'ru', 'Thai': 'th',
+    'Hangul': 'ko', 'Japanese': 'ja', 'Katakana': 'ja', 'Hiragana': 'ja', 'Han': 'zh',
+}
+
+
+def _trigrams(words):
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3]
+
+
+@lru_cache(maxsize=1)
+def _profiles():
+    """Per-language (trigram weights normalized to unit length, word set)."""
+    with open(WORDS_PATH, encoding='utf-8') as f:
+        frequent_words = json.load(f)
+    profiles = {}
+    for language, words in frequent_words.items():
+        words = words.split()
+        counts = Counter(_trigrams(words))
+        norm = math.sqrt(sum(count * count for count in counts.values()))
+        profiles[language] = ({trigram: count / norm for trigram, count in counts.items()}, frozenset(words))
+    return profiles
+
+
+def _detect_script(sample, letters):
+    counts = {language: len(pattern.findall(sample)) for language, pattern in _SCRIPTS.items()}
+    language = max(counts, key=counts.get)
+    if counts[language] < letters * SCRIPT_SHARE:
+        return None
+    if language == 'zh' and counts['ja'] >= letters * KANA_SHARE:
+        return 'ja'
+    return language
+
+
+def identify_language(text):
+    """
+    Identify the language of text, with the lead over the runner-up.
+
+    Returns:
+        tuple: (language code from LANGUAGE_NAMES or None, margin); script
+        matches have margin 1.0
+    """
+    sample = text[:SAMPLE_CHARS]
+    letters = len(_LETTER.findall(sample))
+    if letters < MIN_LETTERS:
+        return None, 0.0
+
+    language = _detect_script(sample, letters)
+    if language:
+        return language, 1.0
+
+    words = _LATIN_WORD.findall(sample.lower())
+    trigrams = Counter(_trigrams(words))
+    norm = math.sqrt(sum(count * count for count in trigrams.values()))
+    if not norm:
+        return None, 0.0
+
+    scores = sorted(
+        (
+            (1 - WORD_WEIGHT) * sum(count * weights.get(trigram, 0) for trigram, count in trigrams.items()) / norm
+            + WORD_WEIGHT * sum(word in frequent for word in words) / len(words),
+            language,
+        )
+        for language, (weights, frequent) in _profiles().items()
+    )
+    (best, language), (runner_up, _) = scores[-1], scores[-2]
+    if best < MIN_SIMILARITY:
+        return None, 0.0
+    return language, best - runner_up
+
+
+def detect_language(text, min_margin=MIN_MARGIN):
+    """
+    Identify the language of text.
+
+    Returns:
+        str: Language code from LANGUAGE_NAMES, or None if unsure
+    """
+    language, margin = identify_language(text)
+    return language if margin >= min_margin else None
+
+
+def detect_language_cached(text, min_margin=MIN_MARGIN):
+    """``detect_language`` cached by content hash."""
+    cache_key = f"language_{content_hash(text)}"
+    detected = cache.get(cache_key)
+    if detected is None:
+        language, margin = identify_language(text)
+        detected = (language or '', margin)
+        cache.set(cache_key, detected, 86400)
+        stats.increment('language_id.detected', language if margin >= MIN_MARGIN else 'unknown')
+    language, margin = detected
+    return language if language and margin >= min_margin else None
@@ -0,0 +1,68 @@
+"""
+Lazy loading of heavy optional dependencies.
+
+PIL, pytesseract, python-docx, the PDF backends, groq and numpy are imported on first use
+instead of at module load, so gunicorn workers and management commands only
+pay for the backends they actually touch.
+"""
+
+import importlib
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Backends needed per document format (and for the LLM services)
+FORMAT_MODULES = {
+    # Every backend registered in pdf_backends, in the order they are usually tried
+    'pdf': ('pypdfium2', 'pypdf', 'PyPDF2', 'pdfminer.high_level'),
+    'docx': ('docx',),
+    'image': ('PIL.Image', 'pytesseract'),
+    'llm': ('groq', 'httpx'),
+    'summary': ('numpy',),
+}
+# Formats read by text extraction (in sandbox processes when enabled)
+EXTRACTION_FORMATS = ('pdf', 'docx', 'image')
+
+
+def format_modules(formats):
+    """Module names needed by the given FORMAT_MODULES keys, in order."""
+    return [module_name for file_format in formats for module_name in FORMAT_MODULES.get(file_format, ())]
+
+
+@lru_cache(maxsize=None)
+def optional_import(module_name):
+    """
+    Import a module on first use.
+
+    Args:
+        module_name: Dotted module path
+
+    Returns:
+        module or None if the package is not installed
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        logger.warning(f"Optional dependency not available: {module_name}")
+        return None
+
+
+def preload(formats=None):
+    """
+    Import backends ahead of time.
+
+    Called from the WSGI module when PRELOAD_HEAVY_MODULES is enabled, so that
+    with ``gunicorn --preload`` the modules are loaded once in the master and
+    shared copy-on-write by forked workers.
+
+    Args:
+        formats: Iterable of keys from FORMAT_MODULES (defaults to all)
+
+    Returns:
+        dict: Module name -> whether it is available
+    """
+    if formats is None:
+        formats = FORMAT_MODULES.keys()
+
+    return {module_name: optional_import(module_name) is not None for module_name in format_modules(formats)}
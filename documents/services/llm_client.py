@@ -0,0 +1,167 @@
+"""
+Shared Groq client for simplification and translation.
+
+One client per process owns an explicit HTTP keep-alive pool, so both
+services (and hedged duplicates) reuse the same warm TLS connections. At
+worker start the pool is pre-warmed with a few cheap requests, and a
+daemon thread pings the API periodically so idle connections are not
+closed between requests.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .lazy_imports import optional_import
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientPool:
+    """Lazily built, process-wide Groq client with a tunable connection pool."""
+
+    def __init__(self):
+        self._client = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._keepalive_thread = None
+        self._stop = threading.Event()
+
+    def _build_client(self):
+        groq = optional_import('groq')
+        if groq is None:
+            return None
+
+        api_key = getattr(settings, 'GROQ_API_KEY', None)
+        if not api_key or api_key == 'your_groq_api_key_here':
+            return None
+
+        # Installed with groq. Always passed in: groq 0.4.1 builds its default
+        # client with an argument httpx 0.28 no longer accepts.
+        httpx = optional_import('httpx')
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                max(settings.AI_SIMPLIFY_TIMEOUT, settings.AI_TRANSLATE_TIMEOUT),
+                connect=settings.LLM_CONNECT_TIMEOUT,
+            ),
+        )
+        return groq.Groq(
+            api_key=api_key, max_retries=settings.LLM_MAX_RETRIES, http_client=http_client
+        )
+
+    def get_client(self):
+        """
+        The shared client, built on first use.
+
+        Returns:
+            groq.Groq or None if Groq is not installed or not configured
+        """
+        if self._initialized:
+            return self._client
+
+        with self._lock:
+            if not self._initialized:
+                try:
+                    self._client = self._build_client()
+                except Exception as e:
+                    logger.error(f"Could not create Groq client: {str(e)}")
+                    self._client = None
+                self._initialized = True
+        return self._client
+
+    def _ping(self, reason):
+        """One cheap authenticated request over a pooled connection."""
+        client = self.get_client()
+        if client is None:
+            return False
+        start = time.perf_counter()
+        try:
+            client.models.list()
+        except Exception as e:
+            stats.increment('llm.pool', f"{reason}_failed")
+            logger.warning(f"LLM {reason} request failed: {str(e)}")
+            return False
+        stats.increment('llm.pool', reason)
+        stats.observe('llm.pool_ping_ms', (time.perf_counter() - start) * 1000, reason)
+        return True
+
+    def prewarm(self, connections=None):
+        """
+        Open keep-alive connections before the first user request.
+
+        Concurrent requests each take their own connection, so ``connections``
+        pings in parallel leave that many warm connections in the pool.
+
+        Returns:
+            int: Number of successful pings
+        """
+        if connections is None:
+            connections = settings.LLM_POOL_PREWARM_CONNECTIONS
+        if connections <= 0 or self.get_client() is None:
+            return 0
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='llm-prewarm') as executor:
+            warmed = sum(executor.map(lambda _: self._ping('prewarm'), range(connections)))
+        logger.info(f"Pre-warmed {warmed}/{connections} LLM connections")
+        return warmed
+
+    def _keepalive_loop(self, interval):
+        while not self._stop.wait(interval):
+            self._ping('keepalive')
+
+    def start_keepalive(self, interval=None):
+        """Ping the API every ``interval`` seconds from a daemon thread."""
+        if interval is None:
+            interval = settings.LLM_KEEPALIVE_INTERVAL
+        if interval <= 0 or self.get_client() is None:
+            return None
+        if self._keepalive_thread is None or not self._keepalive_thread.is_alive():
+            self._stop.clear()
+            self._keepalive_thread = threading.Thread(
+                target=self._keepalive_loop, args=(interval,), name='llm-keepalive', daemon=True
+            )
+            self._keepalive_thread.start()
+        return self._keepalive_thread
+
+    def stop_keepalive(self):
+        self._stop.set()
+
+
+# Global pool instance
+llm_client_pool = LLMClientPool()
+
+
+def get_llm_client():
+    """Convenience function for the shared client (None if unavailable)."""
+    return llm_client_pool.get_client()
+
+
+def start_llm_client_pool():
+    """
+    Startup hook: pre-warm connections and start keepalive pings in a
+    daemon thread, so worker boot is not delayed by the network.
+
+    Returns:
+        threading.Thread or None
+    """
+    if not settings.LLM_PREWARM_ON_STARTUP:
+        return None
+
+    def _run():
+        try:
+            llm_client_pool.prewarm()
+            llm_client_pool.start_keepalive()
+        except Exception as e:
+            logger.error(f"LLM client pool startup error: {str(e)}")
+
+    thread = threading.Thread(target=_run, name='llm-prewarm', daemon=True)
+    thread.start()
+    return thread
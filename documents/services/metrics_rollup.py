@@ -0,0 +1,205 @@
+"""
+Time-series rollups and retention for SystemMetrics.
+
+Raw request metrics are downsampled into per-minute and per-hour
+MetricsRollup rows holding counts, error counts and a mergeable latency
+sketch. Dashboards read the rollups, and raw rows are expired after a short
+retention window so the table stays small.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from ..models import MetricsRollup, SystemMetrics
+
+logger = logging.getLogger(__name__)
+
+# Relative accuracy of sketch quantiles (1%)
+SKETCH_ACCURACY = 0.01
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_LATENCY_MS = 0.01
+
+
+def sketch_add(sketch, value):
+    """Add a latency sample (ms) to a log-bucketed sketch dict in place."""
+    index = str(math.ceil(math.log(max(value, _MIN_LATENCY_MS)) / _LOG_GAMMA))
+    sketch[index] = sketch.get(index, 0) + 1
+
+
+def sketch_merge(target, other):
+    """Merge ``other`` into ``target`` in place."""
+    for index, count in other.items():
+        target[index] = target.get(index, 0) + count
+
+
+def sketch_quantile(sketch, q):
+    """
+    Estimate a quantile from a sketch (within SKETCH_ACCURACY relative error).
+
+    Returns:
+        float or None for an empty sketch
+    """
+    total = sum(sketch.values())
+    if not total:
+        return None
+
+    rank = q * (total - 1)
+    seen = 0
+    for index in sorted(sketch, key=int):
+        seen += sketch[index]
+        if seen > rank:
+            return round(2 * _GAMMA ** int(index) / (_GAMMA + 1), 2)
+    return None
+
+
+def _floor(timestamp, resolution):
+    if resolution == MetricsRollup.RESOLUTION_HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _new_bucket():
+    return {
+        'count': 0,
+        'error_count': 0,
+        'latency_sum_ms': 0.0,
+        'latency_max_ms': 0.0,
+        'latency_sketch': {},
+    }
+
+
+def _save_buckets(resolution, buckets):
+    with transaction.atomic():
+        for (bucket_start, endpoint), values in buckets.items():
+            MetricsRollup.objects.update_or_create(
+                resolution=resolution,
+                bucket_start=bucket_start,
+                endpoint=endpoint,
+                defaults=values,
+            )
+
+
+def rollup_minutes(now):
+    """
+    Rebuild minute buckets from raw rows up to the last complete minute.
+
+    The newest existing minute bucket is recomputed too, so rows that landed
+    after the previous run are included. Buckets are replaced, never
+    incremented, so reruns are idempotent.
+
+    Returns:
+        set: Hour starts touched by the rebuilt buckets
+    """
+    cutoff = _floor(now, MetricsRollup.RESOLUTION_MINUTE)
+    since = MetricsRollup.objects.filter(
+        resolution=MetricsRollup.RESOLUTION_MINUTE
+    ).aggregate(latest=Max('bucket_start'))['latest']
+    if since is None:
+        since = SystemMetrics.objects.aggregate(earliest=Min('timestamp'))['earliest']
+        if since is None:
+            return set()
+
+    buckets = defaultdict(_new_bucket)
+    rows = SystemMetrics.objects.filter(
+        timestamp__gte=_floor(since, MetricsRollup.RESOLUTION_MINUTE),
+        timestamp__lt=cutoff,
+    ).values_list('timestamp', 'endpoint', 'response_time_ms', 'status_code')
+
+    for timestamp, endpoint, response_time_ms, status_code in rows.iterator(chunk_size=2000):
+        bucket = buckets[(_floor(timestamp, MetricsRollup.RESOLUTION_MINUTE), endpoint)]
+        bucket['count'] += 1
+        if status_code >= 500:
+            bucket['error_count'] += 1
+        bucket['latency_sum_ms'] += response_time_ms
+        bucket['latency_max_ms'] = max(bucket['latency_max_ms'], response_time_ms)
+        sketch_add(bucket['latency_sketch'], response_time_ms)
+
+    _save_buckets(MetricsRollup.RESOLUTION_MINUTE, buckets)
+    return {_floor(bucket_start, MetricsRollup.RESOLUTION_HOUR) for bucket_start, _ in buckets}
+
+
+def rollup_hours(hour_starts):
+    """Rebuild hour buckets from the minute buckets of the given hours."""
+    buckets = defaultdict(_new_bucket)
+    for hour_start in hour_starts:
+        minutes = MetricsRollup.objects.filter(
+            resolution=MetricsRollup.RESOLUTION_MINUTE,
+            bucket_start__gte=hour_start,
+            bucket_start__lt=hour_start + timedelta(hours=1),
+        )
+        for minute in minutes.iterator():
+            bucket = buckets[(hour_start, minute.endpoint)]
+            bucket['count'] += minute.count
+            bucket['error_count'] += minute.error_count
+            bucket['latency_sum_ms'] += minute.latency_sum_ms
+            bucket['latency_max_ms'] = max(bucket['latency_max_ms'], minute.latency_max_ms)
+            sketch_merge(bucket['latency_sketch'], minute.latency_sketch)
+
+    _save_buckets(MetricsRollup.RESOLUTION_HOUR, buckets)
+    return len(buckets)
+
+
+def enforce_retention(now):
+    """
+    Delete raw rows and rollups older than their retention windows.
+
+    Returns:
+        dict: Deleted row counts per table/resolution
+    """
+    retention = settings.METRICS_RETENTION
+    deleted = {}
+    deleted['raw'], _ = SystemMetrics.objects.filter(
+        timestamp__lt=now - timedelta(hours=retention['raw_hours'])
+    ).delete()
+    for resolution, days_key in (
+        (MetricsRollup.RESOLUTION_MINUTE, 'minute_days'),
+        (MetricsRollup.RESOLUTION_HOUR, 'hour_days'),
+    ):
+        deleted[resolution], _ = MetricsRollup.objects.filter(
+            resolution=resolution,
+            bucket_start__lt=now - timedelta(days=retention[days_key]),
+        ).delete()
+    return deleted
+
+
+def rollup_metrics(now=None):
+    """
+    Run a full rollup pass: minutes, then hours, then retention.
+
+    Returns:
+        dict: Summary of touched buckets and deleted rows
+    """
+    now = now or timezone.now()
+    touched_hours = rollup_minutes(now)
+    hour_buckets = rollup_hours(touched_hours)
+    deleted = enforce_retention(now)
+
+    logger.info(
+        f"Metrics rollup: {len(touched_hours)} hours rebuilt ({hour_buckets} buckets), "
+        f"deleted {deleted}"
+    )
+    return {'hours_rebuilt': len(touched_hours), 'hour_buckets': hour_buckets, 'deleted': deleted}
+
+
+def summarize_rollup(rollup):
+    """Dashboard view of one rollup row."""
+    return {
+        'bucket_start': rollup.bucket_start.isoformat(),
+        'endpoint': rollup.endpoint,
+        'count': rollup.count,
+        'error_count': rollup.error_count,
+        'error_rate': round(rollup.error_count / rollup.count, 4) if rollup.count else 0,
+        'latency_mean_ms': round(rollup.latency_sum_ms / rollup.count, 2) if rollup.count else None,
+        'latency_max_ms': rollup.latency_max_ms,
+        'latency_p50_ms': sketch_quantile(rollup.latency_sketch, 0.5),
+        'latency_p95_ms': sketch_quantile(rollup.latency_sketch, 0.95),
+        'latency_p99_ms': sketch_quantile(rollup.latency_sketch, 0.99),
+    }
@@ -0,0 +1,288 @@
+"""
+Model routing for LLM calls.
+
+Short inputs go to a fast model and long ones to the large model. The
+cut-over point per task comes from settings and is widened while the large
+model's observed latency is over its target. Every decision and call
+latency is recorded in the stats registry.
+
+With hedging on, a call still running at the model's observed p90 latency
+gets one duplicate request and the first answer wins. Hedges are drawn from
+a budget earned per call, so they stay a bounded share of quota.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .stats import stats
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Sections the simplification prompt asks for; a fast first pass missing
+# any of them is escalated to the large model.
+REQUIRED_SECTIONS = ('## 🔍 Overview', '## 📄 Main Points', '## ⚠️ Key Warnings')
+
+# Hedged calls and their duplicates share one pool per process
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=settings.AI_HEDGE_PRIMARY_WORKERS + settings.AI_HEDGE_MAX_WORKERS,
+                    thread_name_prefix='llm-hedge',
+                )
+    return _hedge_executor
+
+
+def _reset_hedge_executor():
+    # Pool threads do not survive a fork; the child starts its own
+    global _hedge_executor, _hedge_executor_lock
+    _hedge_executor = None
+    _hedge_executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_hedge_executor)
+
+
+class HedgeBudget:
+    """
+    Token bucket for hedged requests.
+
+    Every primary call earns ``rate`` tokens (up to ``burst``) and every hedge
+    spends one, so hedges never exceed ``rate`` of calls over time.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.rate)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class ModelRouter:
+    """Chooses a model per call from task, input size and observed latency."""
+
+    def __init__(self):
+        self._hedge_budget = None
+        self._hedge_slots = None
+        self._hedge_lock = threading.Lock()
+
+    @property
+    def large_model(self):
+        return settings.AI_MODELS['large']
+
+    @property
+    def fast_model(self):
+        return settings.AI_MODELS['fast']
+
+    def cached_models(self):
+        """
+        Models whose cached answers may be served, large model first.
+
+        Routing shifts with observed latency, so an answer cached under
+        either model is used rather than calling the LLM again.
+        """
+        models = [self.large_model]
+        models += [model for model in settings.AI_MODELS.values() if model not in models]
+        return models
+
+    def latency_p50(self, model):
+        """Median of recent call latencies in ms, or None without data."""
+        return stats.quantile('llm.latency_ms', 0.5, model)
+
+    def choose(self, task, input_tokens, record=True):
+        """
+        Pick a model for a call.
+
+        Args:
+            task: 'simplify' or 'translate'
+            input_tokens: Estimated input size
+            record: Count the decision in the stats (off for cache lookups)
+
+        Returns:
+            str: Model name
+        """
+        threshold = settings.AI_ROUTING[task]['fast_max_input_tokens']
+        reason = 'short' if input_tokens <= threshold else 'long'
+
+        large_p50 = self.latency_p50(self.large_model)
+        if large_p50 is not None and large_p50 > settings.AI_ROUTER_LATENCY_TARGET_MS:
+            # Large model is slow right now: shift medium inputs to the fast model
+            threshold *= settings.AI_ROUTER_DEGRADED_MULTIPLIER
+            if reason == 'long' and input_tokens <= threshold:
+                reason = 'large_model_slow'
+
+        model = self.fast_model if input_tokens <= threshold else self.large_model
+        if record:
+            stats.increment('router.decisions', f"{task}:{model}:{reason}")
+        return model
+
+    def use_first_pass(self, task, model):
+        """Whether to try the fast model before a large-model simplification."""
+        return (
+            settings.AI_FAST_FIRST_PASS
+            and task == 'simplify'
+            and model != self.fast_model
+        )
+
+    def accept_first_pass(self, completion):
+        """Accept a fast-model draft if it is complete and not truncated."""
+        choice = completion.choices[0]
+        content = choice.message.content or ''
+        accepted = (
+            getattr(choice, 'finish_reason', None) != 'length'
+            and all(section in content for section in REQUIRED_SECTIONS)
+        )
+        stats.increment('router.first_pass', 'accepted' if accepted else 'escalated')
+        return accepted
+
+    def choose_for_text(self, task, text, record=True):
+        """Pick a model from the estimated (budget-capped) size of text."""
+        input_tokens = min(
+            estimate_tokens(text), settings.AI_TOKEN_BUDGETS[task]['max_input_tokens']
+        )
+        return self.choose(task, input_tokens, record)
+
+    def timed_completion(self, client, task, model, **kwargs):
+        """
+        Run a chat completion and record its latency per model and task.
+        Hedged when AI_HEDGE_ENABLED is set.
+
+        Returns:
+            tuple: (completion, model that answered), which differs from
+            ``model`` when a hedge to the other tier won
+        """
+        if settings.AI_HEDGE_ENABLED:
+            return self.hedged_completion(client, task, model, **kwargs)
+        return self._completion(client, task, model, **kwargs), model
+
+    def _completion(self, client, task, model, **kwargs):
+        started = time.perf_counter()
+        try:
+            completion = client.chat.completions.create(model=model, **kwargs)
+        except Exception:
+            stats.increment('llm.errors', f"{task}:{model}")
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        stats.observe('llm.latency_ms', latency_ms, model)
+        stats.observe('llm.latency_ms', latency_ms, f"{task}:{model}")
+        return completion
+
+    def hedge_delay_ms(self, task, model):
+        """Observed p90 latency of the model for the task, or the configured default."""
+        p90 = stats.quantile('llm.latency_ms', 0.9, f"{task}:{model}")
+        if p90 is None:
+            return settings.AI_HEDGE_DEFAULT_DELAY_MS
+        return max(p90, settings.AI_HEDGE_MIN_DELAY_MS)
+
+    def hedge_model(self, model):
+        """Model for the duplicate request: the same one, or the other tier."""
+        if not settings.AI_HEDGE_ALTERNATE_MODEL:
+            return model
+        return self.fast_model if model == self.large_model else self.large_model
+
+    def _get_hedge_state(self):
+        if self._hedge_budget is None:
+            with self._hedge_lock:
+                if self._hedge_budget is None:
+                    # In-flight duplicates, counted until they finish (even after losing)
+                    self._hedge_slots = threading.BoundedSemaphore(settings.AI_HEDGE_MAX_WORKERS)
+                    self._hedge_budget = HedgeBudget(
+                        settings.AI_HEDGE_BUDGET_RATE, settings.AI_HEDGE_BUDGET_BURST
+                    )
+        return self._hedge_budget, self._hedge_slots
+
+    def hedged_completion(self, client, task, model, **kwargs):
+        """
+        Run a completion, sending one duplicate if it is slower than p90.
+
+        The first successful response wins. A request already in flight
+        cannot be interrupted, so the loser keeps its pool thread until it
+        returns (bounded by the request timeout). The pool has room for
+        AI_HEDGE_PRIMARY_WORKERS calls plus AI_HEDGE_MAX_WORKERS duplicates,
+        the most that can be in flight per process, so losers never hold
+        up later calls.
+
+        Returns:
+            tuple: (completion, model that answered)
+        """
+        budget, slots = self._get_hedge_state()
+        budget.earn()
+
+        timeout = kwargs.get('timeout')
+        deadline = time.perf_counter() + timeout if timeout else None
+        executor = _get_hedge_executor()
+        primary = executor.submit(self._completion, client, task, model, **kwargs)
+
+        done, _ = wait([primary], timeout=self.hedge_delay_ms(task, model) / 1000)
+        if done:
+            stats.increment('llm.hedge', 'not_needed')
+            return primary.result(), model
+
+        if not slots.acquire(blocking=False):
+            stats.increment('llm.hedge', 'no_free_slot')
+            return primary.result(timeout=self._remaining(deadline)), model
+        if not budget.try_spend():
+            slots.release()
+            stats.increment('llm.hedge', 'over_budget')
+            return primary.result(timeout=self._remaining(deadline)), model
+
+        hedge_model = self.hedge_model(model)
+        hedge_kwargs = dict(kwargs)
+        if deadline is not None:
+            hedge_kwargs['timeout'] = self._remaining(deadline)
+        hedge = executor.submit(self._completion, client, task, hedge_model, **hedge_kwargs)
+        hedge.add_done_callback(lambda _: slots.release())
+        stats.increment('llm.hedge', f"sent:{task}:{hedge_model}")
+
+        models = {primary: model, hedge: hedge_model}
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    stats.increment('llm.hedge', 'hedge_won' if future is hedge else 'primary_won')
+                    return future.result(), models[future]
+                error = future.exception()
+
+        stats.increment('llm.hedge', 'both_failed')
+        if error is None:
+            raise TimeoutError(f"Hedged {task} request timed out")
+        raise error
+
+    @staticmethod
+    def _remaining(deadline):
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.perf_counter())
+
+
+# Global router instance
+model_router = ModelRouter()
@@ -0,0 +1,120 @@
+"""
+Normalization of extracted text before it reaches the LLM.
+
+PDF and OCR output carries layout noise: words hyphenated across line
+breaks, running headers and footers repeated on every page, page numbers,
+hard-wrapped lines and runs of whitespace. All of it costs input tokens.
+Every step here is a single regex pass or a per-line count, so the whole
+stage is linear in the text length.
+"""
+
+import logging
+import math
+import re
+from collections import Counter, namedtuple
+
+from .stats import stats
+from .text_extractor import PAGE_BREAK
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lines at each end of a page checked for running headers/footers
+EDGE_LINES = 3
+# Share of pages an edge line must appear on to count as a header/footer
+REPEAT_THRESHOLD = 0.5
+
+_HYPHENATED_BREAK = re.compile(r'(?<=[^\W\d_])-\n(?=[a-z\u00DF-\u00FF])')
+_WRAPPED_LINE = re.compile(r'(?<=[^\n.:;!?])\n(?=[a-z\u00DF-\u00FF])')
+_INLINE_SPACE = re.compile(r'[ \t\f\v\u00A0]+')
+_TRAILING_SPACE = re.compile(r' *\n *')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_DIGITS = re.compile(r'\d+')
+_PAGE_NUMBER = re.compile(
+    r'^[\s\-\u2013\u2014]*(page\s*)?\d+(\s*(of|/)\s*\d+)?[\s\-\u2013\u2014]*$', re.IGNORECASE
+)
+# Without other pages to compare, a bare number may be a clause number
+_LABELLED_PAGE_NUMBER = re.compile(
+    r'^[\s\-\u2013\u2014]*(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+)[\s\-\u2013\u2014]*$',
+    re.IGNORECASE
+)
+
+NormalizationReport = namedtuple(
+    'NormalizationReport', ['chars_before', 'chars_after', 'tokens_before', 'tokens_after']
+)
+
+
+def _edge_key(line):
+    # Page numbers inside headers ("Lease Agreement - Page 3") differ per page
+    return _DIGITS.sub('#', ' '.join(line.lower().split()))
+
+
+def _edge_indices(lines):
+    """Indices of the first and last few non-empty lines (never the page body)."""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    count = min(EDGE_LINES, len(non_empty) // 3)
+    if not count:
+        return set()
+    return set(non_empty[:count] + non_empty[-count:])
+
+
+def remove_running_lines(pages):
+    """
+    Drop page numbers and header/footer lines repeated across pages.
+
+    A single page only loses labelled page numbers ("Page 2", "2 of 5").
+
+    Args:
+        pages: List of page texts
+
+    Returns:
+        list: Page texts without their running lines
+    """
+    page_lines = [page.split('\n') for page in pages]
+    edges = [_edge_indices(lines) for lines in page_lines]
+
+    repeated = set()
+    page_number = _PAGE_NUMBER if len(pages) > 1 else _LABELLED_PAGE_NUMBER
+    if len(pages) > 1:
+        counts = Counter()
+        for lines, indices in zip(page_lines, edges):
+            counts.update({_edge_key(lines[i]) for i in indices})
+        min_pages = max(2, math.ceil(len(pages) * REPEAT_THRESHOLD))
+        repeated = {key for key, count in counts.items() if count >= min_pages}
+
+    cleaned = []
+    for lines, indices in zip(page_lines, edges):
+        cleaned.append('\n'.join(
+            line for i, line in enumerate(lines)
+            if i not in indices
+            or not (page_number.match(line) or _edge_key(line) in repeated)
+        ))
+    return cleaned
+
+
+def normalize_text(text):
+    """
+    Clean extracted text for the LLM.
+
+    Returns:
+        tuple: (normalized text, NormalizationReport)
+    """
+    pages = remove_running_lines(text.split(PAGE_BREAK))
+    normalized = '\n\n'.join(page for page in pages if page.strip())
+
+    normalized = _INLINE_SPACE.sub(' ', normalized)
+    normalized = _TRAILING_SPACE.sub('\n', normalized)
+    normalized = _HYPHENATED_BREAK.sub('', normalized)
+    normalized = _WRAPPED_LINE.sub(' ', normalized)
+    normalized = _BLANK_LINES.sub('\n\n', normalized).strip()
+
+    report = NormalizationReport(
+        len(text), len(normalized), estimate_tokens(text), estimate_tokens(normalized)
+    )
+    stats.observe('normalization.chars_saved', report.chars_before - report.chars_after)
+    stats.observe('normalization.tokens_saved', report.tokens_before - report.tokens_after)
+    logger.info(
+        f"Normalized text: {report.chars_before} -> {report.chars_after} chars, "
+        f"~{report.tokens_before} -> ~{report.tokens_after} tokens"
+    )
+    return normalized, report
@@ -0,0 +1,264 @@
+"""
+Pluggable PDF text extraction backends.
+
+PyPDF2, pypdf, pypdfium2 and pdfminer.six are registered here and used when
+installed. Each document is classified from cheap byte-level features (page
+count, embedded fonts, images), and the backends preferred for its class
+are tried in order. Output that looks broken (no text despite a text layer,
+words run together, unmapped glyphs) moves on to the next backend, as long
+as the next attempt is likely to finish within EXTRACTION_TIMEOUT; a slow
+fallthrough returns the best output so far instead of timing out. Every
+attempt reports its pages per second per class, so the preference lists
+can be tuned to the fastest backend that still reads each class well
+(``python manage.py benchmark_pdf_backends`` measures a corpus offline).
+"""
+
+import logging
+import re
+import time
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+
+from .admission import count_pdf_pages
+from .lazy_imports import optional_import
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Text shorter than this is too little to judge
+MIN_CHECKED_CHARS = 200
+# Whitespace share below this means words were run together
+MIN_WHITESPACE_SHARE = 0.08
+# Share of unmapped glyphs above this means the font encoding was not understood
+MAX_UNMAPPED_SHARE = 0.05
+# Another backend is tried only if this multiple of the slowest attempt fits in the time left
+FALLTHROUGH_MARGIN = 2
+
+_BASE_FONT = re.compile(rb'/BaseFont\s*/([^\s/\[\]<>()]+)')
+_IMAGE = re.compile(rb'/Subtype\s*/Image\b')
+_OBJECT_STREAM = re.compile(rb'/Type\s*/ObjStm\b')
+_UNMAPPED = re.compile(r'\(cid:\d+\)|\uFFFD')
+
+PdfFeatures = namedtuple('PdfFeatures', ['pages', 'fonts', 'images', 'compressed_objects'])
+# attempts: ((backend, seconds, pages, outcome), ...) with outcome 'used', 'failed',
+# 'out_of_time' or the rejection reason; backend is the one whose pages were returned
+PdfReport = namedtuple('PdfReport', ['document_class', 'backend', 'pages', 'attempts'])
+PdfExtraction = namedtuple('PdfExtraction', ['pages', 'report'])
+
+# name -> (module to import, extract function taking (module, file_content))
+PDF_BACKENDS = {}
+
+
+def register_backend(name, module_name):
+    """Register a function returning a list of page texts as a PDF backend."""
+    def decorator(extract):
+        PDF_BACKENDS[name] = (module_name, extract)
+        return extract
+    return decorator
+
+
+def _reader_pages(reader):
+    pages = []
+    for page_num, page in enumerate(reader.pages):
+        try:
+            pages.append(page.extract_text() or '')
+        except Exception as page_error:
+            logger.warning(f"Could not extract text from page {page_num + 1}: {page_error}")
+            pages.append('')
+    return pages
+
+
+@register_backend('pypdfium2', 'pypdfium2')
+def _extract_pypdfium2(pdfium, file_content):
+    pdf = pdfium.PdfDocument(file_content)
+    try:
+        pages = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            try:
+                pages.append(text_page.get_text_range())
+            finally:
+                text_page.close()
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+@register_backend('pypdf', 'pypdf')
+def _extract_pypdf(pypdf, file_content):
+    return _reader_pages(pypdf.PdfReader(BytesIO(file_content)))
+
+
+@register_backend('pypdf2', 'PyPDF2')
+def _extract_pypdf2(PyPDF2, file_content):
+    return _reader_pages(PyPDF2.PdfReader(BytesIO(file_content)))
+
+
+@register_backend('pdfminer', 'pdfminer.high_level')
+def _extract_pdfminer(high_level, file_content):
+    # Layout analysis keeps multi-column text in reading order; pages end in form feeds
+    pages = high_level.extract_text(BytesIO(file_content)).split('\f')
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+def installed_backends():
+    """Names of registered backends whose library is installed."""
+    return [
+        name for name, (module_name, _) in PDF_BACKENDS.items()
+        if optional_import(module_name) is not None
+    ]
+
+
+def pdf_features(file_content):
+    """Page count, distinct embedded fonts and images, from a scan of the raw bytes."""
+    return PdfFeatures(
+        pages=count_pdf_pages(file_content),
+        fonts=len(set(_BASE_FONT.findall(file_content))),
+        images=len(_IMAGE.findall(file_content)),
+        compressed_objects=bool(_OBJECT_STREAM.search(file_content)),
+    )
+
+
+def classify_pdf(features):
+    """
+    Document class used to pick backends.
+
+    Returns:
+        str: 'scanned', 'long', 'complex' or 'standard'
+    """
+    if features.compressed_objects and not features.fonts:
+        # Fonts hidden in object streams; nothing to judge by but the page count
+        return 'long' if features.pages >= settings.PDF_LONG_DOCUMENT_PAGES else 'standard'
+    if not features.fonts and features.images:
+        return 'scanned'
+    if features.pages >= settings.PDF_LONG_DOCUMENT_PAGES:
+        return 'long'
+    if features.fonts >= settings.PDF_COMPLEX_FONT_COUNT:
+        # Many fonts usually mean columns, tables and footnotes
+        return 'complex'
+    return 'standard'
+
+
+def candidate_backends(document_class):
+    """Backends to try for a class: PDF_BACKEND first if set, then the class preferences."""
+    names = list(settings.PDF_BACKEND_PREFERENCES.get(document_class, ()))
+    if settings.PDF_BACKEND != 'auto':
+        names.insert(0, settings.PDF_BACKEND)
+    names.extend(PDF_BACKENDS)
+
+    candidates = []
+    for name in names:
+        if name in PDF_BACKENDS and name not in candidates:
+            candidates.append(name)
+    return candidates
+
+
+def unacceptable_reason(pages, features):
+    """Why extracted pages look broken, or None if they look usable."""
+    text = ''.join(pages)
+    if not text.strip():
+        return 'empty' if features.fonts else None
+    if len(text) < MIN_CHECKED_CHARS:
+        return None
+    if sum(char.isspace() for char in text) / len(text) < MIN_WHITESPACE_SHARE:
+        return 'run_together'
+    unmapped = sum(len(match) for match in _UNMAPPED.findall(text))
+    if unmapped / len(text) > MAX_UNMAPPED_SHARE:
+        return 'unmapped_glyphs'
+    return None
+
+
+def run_backend(name, file_content):
+    """
+    Extract page texts with one backend.
+
+    Returns:
+        tuple: (page texts, seconds), or None if the library is not installed
+    """
+    module_name, extract = PDF_BACKENDS[name]
+    module = optional_import(module_name)
+    if module is None:
+        return None
+    started = time.perf_counter()
+    pages = extract(module, file_content)
+    return pages, time.perf_counter() - started
+
+
+def extract_pdf(file_content, time_budget=None):
+    """
+    Extract page texts with the best backend for this document.
+
+    Args:
+        file_content: Binary content of the PDF
+        time_budget: Seconds the whole extraction may take (EXTRACTION_TIMEOUT if None)
+
+    Returns:
+        PdfExtraction: page texts and the report of every backend tried
+    """
+    if time_budget is None:
+        time_budget = settings.EXTRACTION_TIMEOUT
+    started = time.perf_counter()
+    features = pdf_features(file_content)
+    document_class = classify_pdf(features)
+
+    attempts = []
+    fallback = None
+    slowest = 0.0
+    for name in candidate_backends(document_class):
+        remaining = time_budget - (time.perf_counter() - started)
+        if attempts and slowest * FALLTHROUGH_MARGIN > remaining:
+            logger.info(
+                f"PDF backend {name} skipped for {document_class} document: "
+                f"{remaining:.1f}s left, slowest attempt took {slowest:.1f}s"
+            )
+            attempts.append((name, 0.0, 0, 'out_of_time'))
+            break
+        try:
+            attempt_started = time.perf_counter()
+            outcome = run_backend(name, file_content)
+        except MemoryError:
+            raise
+        except Exception as e:
+            logger.warning(f"PDF backend {name} failed: {str(e)}")
+            slowest = max(slowest, time.perf_counter() - attempt_started)
+            attempts.append((name, 0.0, 0, 'failed'))
+            continue
+        if outcome is None:
+            continue
+
+        pages, seconds = outcome
+        slowest = max(slowest, seconds)
+        reason = unacceptable_reason(pages, features)
+        if reason is None:
+            attempts.append((name, seconds, len(pages), 'used'))
+            return PdfExtraction(pages, PdfReport(document_class, name, len(pages), tuple(attempts)))
+
+        logger.info(f"PDF backend {name} output rejected for {document_class} document: {reason}")
+        attempts.append((name, seconds, len(pages), reason))
+        if fallback is None:
+            fallback = (name, pages)
+
+    if fallback is not None:
+        # Every backend looked broken (or time ran out); the first output beats none
+        name, pages = fallback
+        return PdfExtraction(pages, PdfReport(document_class, name, len(pages), tuple(attempts)))
+    if attempts:
+        raise Exception("All installed PDF backends failed to read this file")
+    raise Exception(
+        "PDF processing is not available. Install pypdfium2, pypdf, PyPDF2 or pdfminer.six."
+    )
+
+
+def record_pdf_report(report):
+    """Publish per-backend throughput and outcomes (in the parent process)."""
+    for name, seconds, pages, outcome in report.attempts:
+        key = f"{report.document_class}:{name}"
+        stats.increment('pdf.backend', f"{key}:{outcome}")
+        if seconds > 0 and pages:
+            stats.observe('pdf.pages_per_second', pages / seconds, key)
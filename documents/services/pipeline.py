@@ -0,0 +1,75 @@
+"""
+Document processing pipeline shared by the API and background jobs.
+Extraction, simplification and translation all go through the same
+cached service calls, so warm entries are reused by live requests.
+"""
+
+import logging
+
+from django.conf import settings
+
+from .text_extractor import extract_text_from_file
+from .normalization import normalize_text
+from .ai_service import simplify_legal_text
+from .translation_service import translate_text
+from .glossary import find_terms, add_glossary_section
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_LENGTH = 50000  # 50k chars limit
+MIN_TEXT_LENGTH = 10
+
+
+def extract_document_text(file_content, file_type):
+    """
+    Extract text from a document, normalize it and cap it at the processing limit.
+
+    Args:
+        file_content: Binary content of file
+        file_type: Type of file ('pdf', 'docx', or 'image')
+
+    Returns:
+        str: Extracted text, or None if nothing meaningful was found
+    """
+    extracted_text = extract_text_from_file(file_content, file_type)
+    if not extracted_text:
+        return None
+    
+    # Strip layout noise before anything is hashed, cached or sent to the LLM
+    extracted_text, _ = normalize_text(extracted_text)
+    if len(extracted_text) < MIN_TEXT_LENGTH:
+        return None
+
+    if len(extracted_text) > MAX_TEXT_LENGTH:
+        extracted_text = extracted_text[:MAX_TEXT_LENGTH] + "\n\n[Text truncated for processing]"
+
+    return extracted_text
+
+
+def simplify_and_translate(extracted_text, target_language='en'):
+    """
+    Simplify extracted text and translate it if requested.
+
+    Args:
+        extracted_text: Text returned by ``extract_document_text``
+        target_language: Target language code
+
+    Returns:
+        tuple: (simplified_text, translated_text or None)
+    """
+    simplified_text = simplify_legal_text(extracted_text)
+
+    translated_text = None
+    if target_language != 'en':
+        translated_text = translate_text(simplified_text, target_language)
+
+    # Glossary definitions are precomputed per language, so they are added
+    # after translation and never cost LLM tokens
+    if settings.GLOSSARY_ENABLED:
+        term_ids = find_terms(extracted_text)
+        simplified_text = add_glossary_section(simplified_text, term_ids)
+        if translated_text:
+            translated_text = add_glossary_section(translated_text, term_ids, target_language)
+
+    return simplified_text, translated_text
+
@@ -0,0 +1,108 @@
+"""
+Buffered recording of per-request SystemMetrics rows.
+
+Rows are collected in memory and written with one bulk INSERT once
+METRICS_FLUSH_SIZE rows are pending, or every METRICS_FLUSH_INTERVAL
+seconds from a daemon thread, so requests never wait on SQLite. The
+rollup recomputes its newest minute bucket on every run, which picks up
+rows written a few seconds late. Pending rows are flushed at exit.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import SystemMetrics
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Endpoint recorded for requests that matched no URL pattern
+UNMATCHED_ENDPOINT = 'unmatched'
+
+
+class RequestMetricsBuffer:
+    """Per-process buffer of SystemMetrics rows, flushed in batches."""
+
+    def __init__(self):
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def record(self, endpoint, response_time_ms, status_code):
+        """Queue one row; flushes inline when the buffer is full."""
+        row = SystemMetrics(
+            timestamp=timezone.now(),
+            endpoint=endpoint[:50],
+            response_time_ms=round(response_time_ms, 2),
+            status_code=status_code,
+        )
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= settings.METRICS_FLUSH_SIZE
+            if self._flusher is None:
+                self._start_flusher()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending rows in one INSERT.
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            SystemMetrics.objects.bulk_create(rows)
+        except Exception as e:
+            # Dropped rather than retried, so a locked database cannot grow the buffer
+            stats.increment('metrics.rows', 'dropped', len(rows))
+            logger.warning(f"Could not record {len(rows)} request metrics: {str(e)}")
+            return 0
+        stats.increment('metrics.rows', 'written', len(rows))
+        return len(rows)
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def _start_flusher(self):
+        # Called with the lock held, on the first request of the process
+        # (after gunicorn forks, so the thread lives in the worker)
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            args=(settings.METRICS_FLUSH_INTERVAL,),
+            name='metrics-flush',
+            daemon=True,
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+# Global per-process buffer
+request_metrics = RequestMetricsBuffer()
+
+
+def record_request(resolver_match, response_time_ms, status_code):
+    """
+    Queue a metrics row for an API request.
+
+    Requests that matched no URL are recorded under one 'unmatched'
+    endpoint, and endpoints in METRICS_EXCLUDED_ENDPOINTS are skipped.
+    """
+    endpoint = resolver_match.url_name if resolver_match else None
+    if endpoint in settings.METRICS_EXCLUDED_ENDPOINTS:
+        return
+    request_metrics.record(endpoint or UNMATCHED_ENDPOINT, response_time_ms, status_code)
@@ -0,0 +1,184 @@
+"""
+Low-overhead stack-sampling profiler for individual requests.
+
+A background thread samples the request thread's Python stack at a fixed
+interval. This needs real threads: under gevent workers the request runs in
+a greenlet and ``sys._current_frames`` only sees the hub thread. Samples are saved as collapsed stacks (for flamegraph.pl and
+similar tools) and as speedscope JSON, in a directory that keeps only the
+newest PROFILING_MAX_PROFILES profiles.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 128
+COLLAPSED_SUFFIX = '.collapsed.txt'
+SPEEDSCOPE_SUFFIX = '.speedscope.json'
+# Microseconds keep ids in save order within a second (older ids lack them)
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}(?:[0-9]{6})?_[0-9a-f]{12}$')
+
+
+class StackSampler:
+    """Samples one thread's stack from a daemon thread."""
+
+    def __init__(self, thread_id=None, interval_ms=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = (interval_ms or settings.PROFILING_INTERVAL_MS) / 1000
+        self.samples = Counter()
+        self.started_at = None
+        self.duration_ms = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        if stack:
+            self.samples[tuple(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration_ms = (time.perf_counter() - self.started_at) * 1000
+        return self
+
+    @staticmethod
+    def _label(frame):
+        name, filename, _ = frame
+        return f"{os.path.basename(filename)}:{name}"
+
+    def to_collapsed(self):
+        """Collapsed-stack text: 'root;child;leaf count' per line."""
+        return '\n'.join(
+            f"{';'.join(self._label(frame) for frame in stack)} {count}"
+            for stack, count in self.samples.most_common()
+        ) + '\n'
+
+    def to_speedscope(self, name):
+        """Speedscope 'sampled' profile JSON document."""
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        interval_ms = self.interval * 1000
+        for stack, count in self.samples.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(count * interval_ms)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(self.duration_ms, 2),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'name': name,
+            'exporter': 'legalease',
+        }
+
+
+def get_profile_dir():
+    profile_dir = Path(settings.PROFILING_DIR)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    return profile_dir
+
+
+def save_profile(sampler, label):
+    """
+    Write a finished sampler to disk and prune the ring buffer.
+
+    Returns:
+        str: Profile id
+    """
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}_{uuid.uuid4().hex[:12]}"
+    profile_dir = get_profile_dir()
+    name = f"{label} ({sampler.duration_ms:.0f} ms)"
+
+    (profile_dir / f"{profile_id}{COLLAPSED_SUFFIX}").write_text(sampler.to_collapsed())
+    (profile_dir / f"{profile_id}{SPEEDSCOPE_SUFFIX}").write_text(
+        json.dumps(sampler.to_speedscope(name))
+    )
+    prune_profiles()
+    return profile_id
+
+
+def list_profiles():
+    """
+    List stored profiles, newest first.
+
+    Returns:
+        list: dicts with id, created (from the id), files and total size
+    """
+    profile_dir = Path(settings.PROFILING_DIR)
+    if not profile_dir.is_dir():
+        return []
+
+    profiles = {}
+    for path in profile_dir.iterdir():
+        profile_id = path.name.split('.', 1)[0]
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            continue
+        entry = profiles.setdefault(profile_id, {'id': profile_id, 'files': [], 'size_bytes': 0})
+        entry['files'].append(path.name)
+        entry['size_bytes'] += path.stat().st_size
+
+    return sorted(profiles.values(), key=lambda entry: entry['id'], reverse=True)
+
+
+def prune_profiles():
+    """Delete the oldest profiles beyond PROFILING_MAX_PROFILES."""
+    profile_dir = Path(settings.PROFILING_DIR)
+    for entry in list_profiles()[settings.PROFILING_MAX_PROFILES:]:
+        for filename in entry['files']:
+            try:
+                (profile_dir / filename).unlink()
+            except OSError as e:
+                logger.warning(f"Could not delete profile file {filename}: {e}")
+
+
+def get_profile_path(filename):
+    """Resolve a stored profile file, or None if the name is not a profile file."""
+    profile_id, _, suffix = filename.partition('.')
+    if not PROFILE_ID_PATTERN.match(profile_id) or f".{suffix}" not in (COLLAPSED_SUFFIX, SPEEDSCOPE_SUFFIX):
+        return None
+    path = Path(settings.PROFILING_DIR) / filename
+    return path if path.is_file() else None
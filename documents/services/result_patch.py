@@ -0,0 +1,188 @@
+"""
+Patch a simplification written for one document so it fits a near-duplicate.
+
+Filled-in templates differ from each other in a few short spans: party
+names, dates, amounts. The two extracted texts are diffed word by word;
+when every difference is a short replacement that is applied consistently
+(each old span is replaced everywhere it occurs, always by the same new
+span), the same replacements are applied to the cached simplification.
+
+The patch is refused, and the caller asks the LLM instead, when the texts
+differ in anything longer (added or removed clauses), or when the patched
+simplification still mentions an old name or number, or any number that
+does not occur in the new document (e.g. a yearly total the LLM derived
+from the old rent).
+"""
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Longest replaced span (in tokens) treated as a filled-in field
+MAX_SPAN_TOKENS = 6
+# Most distinct replacements, and replaced spans in total, before the
+# documents count as different
+MAX_SUBSTITUTIONS = 20
+MAX_REPLACEMENTS = 100
+# Unchanged tokens added around a span to tell its changed occurrences apart
+MAX_CONTEXT_TOKENS = 2
+
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+_NUMBER = re.compile(r'\d+')
+_SENTENCE_END = frozenset('.;:!?')
+_SEPARATOR = '\x1f'
+
+
+def _tokenize(text):
+    matches = list(_TOKEN.finditer(text))
+    return [match.group() for match in matches], [match.span() for match in matches]
+
+
+def _sentences(tokens):
+    """Token offsets where sentences start, plus the end offset."""
+    starts = [0]
+    for position, token in enumerate(tokens, 1):
+        if token in _SENTENCE_END and position < len(tokens):
+            starts.append(position)
+    return starts + [len(tokens)]
+
+
+def _token_opcodes(old_tokens, new_tokens):
+    """
+    Token-level differences, found sentence by sentence.
+
+    Diffing whole sentences first keeps a 50k-character document to a few
+    milliseconds; only the sentences that changed are diffed token by token.
+    """
+    old_starts, new_starts = _sentences(old_tokens), _sentences(new_tokens)
+    old_sentences = [tuple(old_tokens[a:b]) for a, b in zip(old_starts, old_starts[1:])]
+    new_sentences = [tuple(new_tokens[a:b]) for a, b in zip(new_starts, new_starts[1:])]
+
+    matcher = SequenceMatcher(None, old_sentences, new_sentences, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_from, old_to = old_starts[i1], old_starts[i2]
+        new_from, new_to = new_starts[j1], new_starts[j2]
+        tokens = SequenceMatcher(
+            None, old_tokens[old_from:old_to], new_tokens[new_from:new_to], autojunk=False
+        )
+        for tag, a1, a2, b1, b2 in tokens.get_opcodes():
+            if tag != 'equal':
+                yield tag, old_from + a1, old_from + a2, new_from + b1, new_from + b2
+
+
+def _occurrences(tokens, span):
+    """Non-overlapping occurrences of a token sequence."""
+    haystack = _SEPARATOR + _SEPARATOR.join(tokens) + _SEPARATOR
+    return haystack.count(_SEPARATOR + _SEPARATOR.join(span) + _SEPARATOR)
+
+
+def _with_context(old_tokens, new_tokens, replacement, context):
+    """Replacement widened by ``context`` unchanged tokens each side, or None."""
+    i1, i2, j1, j2 = replacement
+    if i1 < context or j1 < context or len(old_tokens) - i2 < context or len(new_tokens) - j2 < context:
+        return None
+    left, right = old_tokens[i1 - context:i1], old_tokens[i2:i2 + context]
+    if left != new_tokens[j1 - context:j1] or right != new_tokens[j2:j2 + context]:
+        return None
+    return i1 - context, i2 + context, j1 - context, j2 + context
+
+
+def find_substitutions(old_text, new_text):
+    """
+    Replacements turning old_text into new_text, if they are all short fields.
+
+    Returns:
+        list: (old token tuple, new span text) pairs, or None if the texts
+        differ in more than filled-in fields
+    """
+    old_tokens, _ = _tokenize(old_text)
+    new_tokens, new_spans = _tokenize(new_text)
+
+    replacements = []
+    for tag, i1, i2, j1, j2 in _token_opcodes(old_tokens, new_tokens):
+        if tag != 'replace' or i2 - i1 > MAX_SPAN_TOKENS or j2 - j1 > MAX_SPAN_TOKENS:
+            return None
+        replacements.append((i1, i2, j1, j2))
+        if len(replacements) > MAX_REPLACEMENTS:
+            return None
+
+    substitutions = {}
+    pending = replacements
+    for context in range(MAX_CONTEXT_TOKENS + 1):
+        widened = []
+        for replacement in pending:
+            replacement = _with_context(old_tokens, new_tokens, replacement, context)
+            if replacement:
+                i1, i2, j1, j2 = replacement
+                old = tuple(old_tokens[i1:i2])
+                new = ' '.join(new_text[new_spans[j1][0]:new_spans[j2 - 1][1]].split())
+                replacement = (old, new)
+            widened.append(replacement)
+        targets = {}
+        for replacement in filter(None, widened):
+            targets.setdefault(replacement[0], set()).add(replacement[1])
+        replaced = Counter(replacement[0] for replacement in widened if replacement)
+
+        unresolved = []
+        for original, replacement in zip(pending, widened):
+            # Consistent: one new value, and the old span never survives unchanged
+            if (
+                replacement
+                and len(targets[replacement[0]]) == 1
+                and _occurrences(old_tokens, replacement[0]) == replaced[replacement[0]]
+            ):
+                substitutions[replacement[0]] = replacement[1]
+            else:
+                unresolved.append(original)
+        if not unresolved:
+            break
+        pending = unresolved
+    else:
+        return None
+
+    if len(substitutions) > MAX_SUBSTITUTIONS:
+        return None
+    return list(substitutions.items())
+
+
+def _span_pattern(tokens):
+    pattern = r'\s*'.join(re.escape(token) for token in tokens)
+    if re.match(r'\w', tokens[0]):
+        pattern = r'(?<!\w)' + pattern
+    if re.match(r'\w', tokens[-1]):
+        pattern += r'(?!\w)'
+    return pattern
+
+
+def patch_result(result, old_text, new_text):
+    """
+    Rewrite a simplification of old_text to describe new_text.
+
+    Returns:
+        str: Patched simplification, or None if it cannot be patched safely
+    """
+    substitutions = find_substitutions(old_text, new_text)
+    if substitutions is None:
+        return None
+    if not substitutions:
+        return result
+
+    # Longest spans first, applied in one pass so replacements never chain
+    substitutions.sort(key=lambda item: len(item[0]), reverse=True)
+    pattern = re.compile('|'.join(
+        f'(?P<s{number}>{_span_pattern(old)})' for number, (old, _) in enumerate(substitutions)
+    ))
+    patched = pattern.sub(lambda match: substitutions[int(match.lastgroup[1:])][1], result)
+
+    new_words = set(_TOKEN.findall(new_text))
+    stale = {
+        token for old, _ in substitutions for token in old
+        if (token[:1].isupper() or _NUMBER.search(token)) and token not in new_words
+    }
+    if stale & set(_TOKEN.findall(patched)):
+        return None
+    if not set(_NUMBER.findall(patched)) <= set(_NUMBER.findall(new_text)):
+        return None
+    return patched
@@ -0,0 +1,203 @@
+"""
+Stored extracted texts, simplification results and lazy per-language translations.
+
+A result is saved under the content hash of its extracted text. Each
+translation is produced on its first request, then served from the cache
+or database, so languages nobody asks for never cost an LLM call. Rows
+live in the database so that every worker can serve them. Extracted texts
+and results come from users' documents, so they are purged, with their
+near-duplicate index entries, after RESULT_RETENTION_DAYS.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils import timezone
+
+from ..models import DocumentResult, OriginalText, ResultTranslation
+from .hashing import content_hash
+from .similarity_index import get_similarity_index
+from .translation_service import translate_text, is_mock_translation
+from .glossary import split_glossary_section, add_glossary_section
+
+logger = logging.getLogger(__name__)
+
+# Results are immutable once stored, so cache entries can live long
+RESULT_CACHE_TIMEOUT = 6 * 3600
+# Results deleted per query when purging (keeps SQLite's IN lists short)
+PURGE_BATCH_SIZE = 500
+
+
+def _result_cache_key(content_id):
+    return f"result_{content_id}"
+
+
+def _translation_cache_key(content_id, language):
+    return f"result_translation_{content_id}_{language}"
+
+
+def _original_text_cache_key(content_id):
+    return f"original_text_{content_id}"
+
+
+def store_original_text(extracted_text):
+    """
+    Keep extracted text fetchable by content hash.
+
+    Returns:
+        str: Content id of the text
+    """
+    content_id = content_hash(extracted_text)
+    OriginalText.objects.get_or_create(content_id=content_id, defaults={'text': extracted_text})
+    cache.set(_original_text_cache_key(content_id), extracted_text, RESULT_CACHE_TIMEOUT)
+    return content_id
+
+
+def get_original_text(content_id):
+    """Stored extracted text for a content id, or None once purged."""
+    cache_key = _original_text_cache_key(content_id)
+    text = cache.get(cache_key)
+    if text is None:
+        text = OriginalText.objects.filter(
+            content_id=content_id
+        ).values_list('text', flat=True).first()
+        if text is not None:
+            cache.set(cache_key, text, RESULT_CACHE_TIMEOUT)
+    return text
+
+
+def save_result(content_id, simplified_text):
+    """Persist a simplification result (first write wins)."""
+    result, _ = DocumentResult.objects.get_or_create(
+        content_id=content_id,
+        defaults={'simplified_text': simplified_text},
+    )
+    cache.set(_result_cache_key(content_id), result.simplified_text, RESULT_CACHE_TIMEOUT)
+    return result
+
+
+def get_simplified_text(content_id):
+    """Stored simplified text for a content id, or None."""
+    cache_key = _result_cache_key(content_id)
+    simplified_text = cache.get(cache_key)
+    if simplified_text is None:
+        simplified_text = DocumentResult.objects.filter(
+            content_id=content_id
+        ).values_list('simplified_text', flat=True).first()
+        if simplified_text is not None:
+            cache.set(cache_key, simplified_text, RESULT_CACHE_TIMEOUT)
+    return simplified_text
+
+
+def get_stored_translation(content_id, language):
+    """Previously produced translation, or None (never calls the LLM)."""
+    if language == 'en':
+        return get_simplified_text(content_id)
+
+    cache_key = _translation_cache_key(content_id, language)
+    translated_text = cache.get(cache_key)
+    if translated_text is None:
+        translated_text = ResultTranslation.objects.filter(
+            result__content_id=content_id, language=language
+        ).values_list('translated_text', flat=True).first()
+        if translated_text is not None:
+            cache.set(cache_key, translated_text, RESULT_CACHE_TIMEOUT)
+    return translated_text
+
+
+def save_translation(content_id, language, translated_text):
+    """Persist a real translation of a stored result."""
+    if language == 'en' or is_mock_translation(translated_text, language):
+        return
+    try:
+        result = DocumentResult.objects.get(content_id=content_id)
+        ResultTranslation.objects.get_or_create(
+            result=result,
+            language=language,
+            defaults={'translated_text': translated_text},
+        )
+    except (DocumentResult.DoesNotExist, IntegrityError) as e:
+        logger.warning(f"Could not store translation {content_id[:12]}/{language}: {str(e)}")
+        return
+    cache.set(_translation_cache_key(content_id, language), translated_text, RESULT_CACHE_TIMEOUT)
+
+
+def get_translation(content_id, language):
+    """
+    Translation of a stored result, translating on first request.
+
+    Returns:
+        tuple: (translated_text, created) or (None, False) if the result is unknown
+    """
+    translated_text = get_stored_translation(content_id, language)
+    if translated_text is not None:
+        return translated_text, False
+
+    simplified_text = get_simplified_text(content_id)
+    if simplified_text is None:
+        return None, False
+
+    # Only the LLM-written part is translated; glossary entries come localized
+    simplified_text, term_ids = split_glossary_section(simplified_text)
+    translated_text = translate_text(simplified_text, language)
+    if term_ids:
+        translated_text = add_glossary_section(translated_text, term_ids, language)
+    save_translation(content_id, language, translated_text)
+    return translated_text, True
+
+
+def _delete_in_batches(queryset, content_ids):
+    """
+    Delete a queryset PURGE_BATCH_SIZE rows at a time.
+
+    Returns:
+        dict: Deleted row counts per model label; deleted content ids are
+        added to ``content_ids``
+    """
+    deleted = {}
+    while True:
+        batch = list(queryset.values_list('pk', 'content_id')[:PURGE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        _, counts = queryset.model.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+        content_ids.update(content_id for _, content_id in batch)
+        for label, count in counts.items():
+            deleted[label] = deleted.get(label, 0) + count
+
+
+def purge_expired_results(now=None):
+    """
+    Delete extracted texts and results older than RESULT_RETENTION_DAYS,
+    with the results' translations and near-duplicate index entries.
+
+    Copies already in a worker's cache expire within RESULT_CACHE_TIMEOUT.
+
+    Returns:
+        dict: Deleted original text, result, translation and index entry counts
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.RESULT_RETENTION_DAYS)
+
+    content_ids = set()
+    counts = _delete_in_batches(DocumentResult.objects.filter(created_at__lt=cutoff), content_ids)
+    counts.update(_delete_in_batches(OriginalText.objects.filter(created_at__lt=cutoff), content_ids))
+    deleted = {
+        'original_texts': counts.get(OriginalText._meta.label, 0),
+        'results': counts.get(DocumentResult._meta.label, 0),
+        'translations': counts.get(ResultTranslation._meta.label, 0),
+        'index_entries': 0,
+    }
+    if content_ids:
+        try:
+            deleted['index_entries'] = get_similarity_index().remove(content_ids)
+        except Exception as e:
+            logger.warning(f"Could not prune the near-duplicate index: {str(e)}")
+
+    logger.info(
+        f"Purged {deleted['original_texts']} original texts, {deleted['results']} results, "
+        f"{deleted['translations']} translations and {deleted['index_entries']} index entries"
+    )
+    return deleted
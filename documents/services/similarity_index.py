@@ -0,0 +1,333 @@
+"""
+Near-duplicate detection over extracted text.
+
+Documents get a 64-bit SimHash of their word 3-shingles, computed after
+lower-casing and masking digits so that changed dates, amounts and
+whitespace barely move the signature. Signatures are split into LSH bands
+stored as sorted arrays. Any two signatures within the configured Hamming
+distance share at least one identical band (pigeonhole), so a lookup is a
+few binary searches plus popcounts on the candidates.
+
+A similar signature is not enough to reuse a result as is: leases that
+differ only in rent, dates or party names look alike. Each entry also
+carries a layout digest of its exact word sequence. Matches whose digest
+is equal (the texts differ in whitespace and line breaks alone) are
+reusable directly; the others have to be patched (see result_patch).
+
+The index is an append-only file with a format header followed by
+fixed-size records, so each worker can pick up entries added by the
+others with a cheap size check. Removing entries rewrites the file under
+a new inode, which makes every worker reload it.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 3
+MIN_TEXT_LENGTH = 200
+# Record: 8-byte signature + 32-byte SHA-256 content id + 16-byte layout digest
+RECORD = struct.Struct('<Q32s16s')
+FILE_HEADER = b'LLSIM\x00v2'
+MAX_TAIL = 1024
+
+_WORD = re.compile(r'\w+')
+_DIGIT = re.compile(r'\d')
+
+# Bit-sliced accumulation: each byte value spread into 8 counters of
+# FIELD_BITS bits, so summing spread hashes adds all 64 bit-columns at once.
+FIELD_BITS = 24
+_FIELD_MASK = (1 << FIELD_BITS) - 1
+_SPREAD_BYTE = [
+    sum(((value >> bit) & 1) << (FIELD_BITS * bit) for bit in range(8))
+    for value in range(256)
+]
+
+
+def _shingle_hashes(text):
+    words = _WORD.findall(_DIGIT.sub('0', text.lower()))
+    if len(words) < SHINGLE_SIZE:
+        return Counter()
+    return Counter(
+        hashlib.blake2b(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'), digest_size=8).digest()
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+
+def simhash(text):
+    """
+    64-bit SimHash of text (0 for texts too short to fingerprint).
+    """
+    shingles = _shingle_hashes(text)
+    if not shingles:
+        return 0
+
+    columns = 0
+    total = 0
+    for digest, weight in shingles.items():
+        spread = 0
+        for position, value in enumerate(digest):
+            spread |= _SPREAD_BYTE[value] << (FIELD_BITS * 8 * position)
+        columns += spread * weight
+        total += weight
+
+    signature = 0
+    for bit in range(SIGNATURE_BITS):
+        if ((columns >> (FIELD_BITS * bit)) & _FIELD_MASK) * 2 > total:
+            signature |= 1 << bit
+    return signature
+
+
+def layout_digest(text):
+    """Digest of the text's whitespace-separated tokens (case, digits and punctuation kept)."""
+    return hashlib.blake2b(' '.join(text.split()).encode('utf-8'), digest_size=16).digest()
+
+
+def similarity(a, b):
+    """Fraction of equal signature bits."""
+    return 1 - bin(a ^ b).count('1') / SIGNATURE_BITS
+
+
+class SimilarityIndex:
+    """Persistent SimHash index with LSH banding."""
+
+    def __init__(self, path, threshold):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_distance = int((1 - threshold) * SIGNATURE_BITS)
+        self.band_count = min(16, self.max_distance + 1)
+        self.band_bits = SIGNATURE_BITS // self.band_count
+        self._band_mask = (1 << self.band_bits) - 1
+
+        self._lock = threading.Lock()
+        self._reset()
+        self._file_id = None
+        self._incompatible = False
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature, entry):
+        for band in range(self.band_count):
+            value = (signature >> (band * self.band_bits)) & self._band_mask
+            yield band, (value << 32) | entry
+
+    def _insert(self, signature, digest, layout):
+        entry = len(self._signatures)
+        self._signatures.append(signature)
+        self._digests += digest
+        self._layouts += layout
+        for band, key in self._band_keys(signature, entry):
+            self._tails[band].append(key)
+
+    def _content_id(self, entry):
+        return self._digests[entry * 32:(entry + 1) * 32].hex()
+
+    def _layout(self, entry):
+        return bytes(self._layouts[entry * 16:(entry + 1) * 16])
+
+    def _candidates(self, signature):
+        """Entries sharing at least one band with the signature."""
+        candidates = set()
+        for band, key in self._band_keys(signature, 0):
+            band_value = key >> 32
+            sorted_keys = self._bands[band]
+            position = bisect_left(sorted_keys, key)
+            while position < len(sorted_keys) and sorted_keys[position] >> 32 == band_value:
+                candidates.add(sorted_keys[position] & 0xFFFFFFFF)
+                position += 1
+            candidates.update(
+                tail_key & 0xFFFFFFFF for tail_key in self._tails[band]
+                if tail_key >> 32 == band_value
+            )
+        return candidates
+
+    def _compact(self):
+        """Merge unsorted tails into the sorted band arrays once they grow."""
+        for band, tail in enumerate(self._tails):
+            if len(tail) > MAX_TAIL:
+                self._bands[band] = array('Q', sorted(chain(self._bands[band], tail)))
+                tail.clear()
+
+    def _reset(self):
+        self._signatures = array('Q')
+        self._digests = bytearray()  # 32 bytes per entry
+        self._layouts = bytearray()  # 16 bytes per entry
+        # Per band: sorted array of (band value << 32 | entry) plus an unsorted tail
+        self._bands = [array('Q') for _ in range(self.band_count)]
+        self._tails = [[] for _ in range(self.band_count)]
+        self._file_offset = 0
+
+    def _refresh(self):
+        """Load records appended to the file (by this or other workers)."""
+        if self._incompatible:
+            return
+        try:
+            file_stat = self.path.stat()
+        except OSError:
+            return
+        file_id = (file_stat.st_dev, file_stat.st_ino)
+        if file_id != self._file_id:
+            # New file, or rewritten by remove(): load it from the start
+            self._reset()
+            self._file_id = file_id
+        size = file_stat.st_size
+        if size <= max(self._file_offset, len(FILE_HEADER) - 1):
+            return
+
+        with self.path.open('rb') as index_file:
+            if not self._file_offset:
+                if index_file.read(len(FILE_HEADER)) != FILE_HEADER:
+                    logger.error(
+                        f"Near-duplicate index {self.path} has an older format; "
+                        f"remove it to rebuild. Reuse is disabled until then."
+                    )
+                    self._incompatible = True
+                    return
+                self._file_offset = len(FILE_HEADER)
+            index_file.seek(self._file_offset)
+            data = index_file.read(size - self._file_offset)
+        usable = len(data) - len(data) % RECORD.size
+        for signature, digest, layout in RECORD.iter_unpack(data[:usable]):
+            self._insert(signature, digest, layout)
+        self._file_offset += usable
+        self._compact()
+
+    def _create_file(self):
+        """Create the index file with its header, atomically across workers."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temporary.write_bytes(FILE_HEADER)
+        try:
+            os.link(temporary, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            temporary.unlink()
+
+    def add(self, text, content_id):
+        """Fingerprint text and persist it under ``content_id`` (a SHA-256 hex digest)."""
+        if len(text) < MIN_TEXT_LENGTH:
+            return
+        signature = simhash(text)
+        with self._lock:
+            self._refresh()
+            if self._incompatible or any(
+                self._signatures[entry] == signature and self._content_id(entry) == content_id
+                for entry in self._candidates(signature)
+            ):
+                return
+            if not self.path.exists():
+                self._create_file()
+            # Small O_APPEND writes are atomic, so workers can share the file
+            with self.path.open('ab') as index_file:
+                index_file.write(
+                    RECORD.pack(signature, bytes.fromhex(content_id), layout_digest(text))
+                )
+            # Read back our record (and any appended by other workers)
+            self._refresh()
+
+    def find(self, text, exclude=None, limit=3):
+        """
+        Find indexed documents above the similarity threshold.
+
+        Args:
+            text: Extracted text to look up
+            exclude: Content id to ignore (the document itself)
+            limit: Most matches to return
+
+        Returns:
+            list: (content_id, similarity, same_layout) tuples, documents with
+            the same words in the same order first, then by similarity
+        """
+        if len(text) < MIN_TEXT_LENGTH:
+            return []
+
+        signature = simhash(text)
+        layout = layout_digest(text)
+        started = time.perf_counter()
+        matches = {}
+        with self._lock:
+            self._refresh()
+            for entry in self._candidates(signature):
+                score = similarity(signature, self._signatures[entry])
+                if score < self.threshold:
+                    continue
+                content_id = self._content_id(entry)
+                if content_id == exclude:
+                    continue
+                match = (content_id, score, self._layout(entry) == layout)
+                if content_id not in matches or match[1:] > matches[content_id][1:]:
+                    matches[content_id] = match
+
+        stats.observe('similarity.lookup_ms', (time.perf_counter() - started) * 1000)
+        return sorted(matches.values(), key=lambda match: (match[2], match[1]), reverse=True)[:limit]
+
+    def remove(self, content_ids):
+        """
+        Drop the entries of the given content ids (e.g. purged results).
+
+        Returns:
+            int: Number of entries removed
+        """
+        content_ids = {bytes.fromhex(content_id) for content_id in content_ids}
+        with self._lock:
+            self._refresh()
+            if self._incompatible or not self.path.exists():
+                return 0
+            kept = [
+                RECORD.pack(
+                    self._signatures[entry],
+                    bytes(self._digests[entry * 32:(entry + 1) * 32]),
+                    self._layout(entry),
+                )
+                for entry in range(len(self._signatures))
+                if bytes(self._digests[entry * 32:(entry + 1) * 32]) not in content_ids
+            ]
+            removed = len(self._signatures) - len(kept)
+            if not removed:
+                return 0
+            # Records appended by other workers during the rewrite are lost;
+            # those documents are simply not reused
+            temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temporary.write_bytes(FILE_HEADER + b''.join(kept))
+            os.replace(temporary, self.path)
+            self._refresh()
+        logger.info(f"Removed {removed} entries from the near-duplicate index")
+        return removed
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Per-process index, loaded from NEAR_DUPLICATE_INDEX_PATH on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SimilarityIndex(
+                    settings.NEAR_DUPLICATE_INDEX_PATH, settings.NEAR_DUPLICATE_THRESHOLD
+                )
+                with index._lock:
+                    index._refresh()
+                logger.info(f"Loaded near-duplicate index with {len(index)} entries")
+                _index = index
+    return _index
@@ -0,0 +1,95 @@
+"""
+In-process performance counters and latency/size observations.
+
+Each gunicorn worker keeps its own registry; the numbers are exposed by the
+stats endpoint for tuning (token use, routing, hedging, normalization).
+"""
+
+import threading
+from collections import defaultdict, deque
+
+# Recent samples kept per series for quantile estimates
+RECENT_SAMPLES = 512
+
+
+class _Series:
+    """Running totals plus a window of recent samples."""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'recent')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'min': self.minimum,
+            'max': self.maximum,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class StatsRegistry:
+    """Thread-safe named counters and observation series."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._series = defaultdict(lambda: defaultdict(_Series))
+
+    def increment(self, name, key='total', amount=1):
+        with self._lock:
+            self._counters[name][key] += amount
+
+    def observe(self, name, value, key='all'):
+        with self._lock:
+            self._series[name][key].add(value)
+
+    def counter(self, name, key='total'):
+        with self._lock:
+            return self._counters[name].get(key, 0)
+
+    def quantile(self, name, q, key='all'):
+        """Quantile over recent samples, or None without data."""
+        with self._lock:
+            series = self._series[name].get(key)
+            return series.quantile(q) if series else None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': {name: dict(keys) for name, keys in self._counters.items()},
+                'observations': {
+                    name: {key: series.summary() for key, series in keys.items()}
+                    for name, keys in self._series.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._series.clear()
+
+
+# Global per-process registry
+stats = StatsRegistry()
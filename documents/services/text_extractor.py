@@ -4,35 +4,23 @@ Supports PDF, DOCX, and image files with OCR.
 """
 
 import logging
+from functools import lru_cache
 from io import BytesIO
 
-# Import packages with fallbacks for deployment
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-
-try:
-    import pytesseract
-    PYTESSERACT_AVAILABLE = True
-except ImportError:
-    PYTESSERACT_AVAILABLE = False
-
-try:
-    from docx import Document as DocxDocument
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+from django.conf import settings
+from django.core.cache import cache
+
+from .extraction_sandbox import ExtractionLimitError, extraction_sandbox
+from .hashing import content_hash
+from .language_id import detect_language, OSD_SCRIPTS, TESSERACT_LANGUAGES
+from .lazy_imports import optional_import
+from .pdf_backends import extract_pdf, record_pdf_report
 
 logger = logging.getLogger(__name__)
 
+# Separator between PDF pages in extracted text
+PAGE_BREAK = '\n\n--- Page Break ---\n\n'
+
 
 def extract_text_from_docx(file_content):
     """
@@ -44,14 +32,15 @@ def extract_text_from_docx(file_content):
     Returns:
         str: Extracted text
     """
-    if not DOCX_AVAILABLE:
+    docx = optional_import('docx')
+    if docx is None:
         raise Exception("DOCX processing is not available. The python-docx package is not installed.")
     
     try:
         logger.info("Extracting text from DOCX file")
         
         file_stream = BytesIO(file_content)
-        doc = DocxDocument(file_stream)
+        doc = docx.Document(file_stream)
         
         text_parts = []
         for paragraph in doc.paragraphs:
@@ -62,6 +51,9 @@ def extract_text_from_docx(file_content):
         logger.info(f"DOCX extraction successful: {len(extracted_text)} characters")
         return extracted_text
         
+    except MemoryError:
+        # Let the sandbox see the limit violation
+        raise
     except Exception as e:
         logger.error(f"DOCX extraction error: {str(e)}")
         raise Exception(f"Failed to extract text from DOCX: {str(e)}")
@@ -69,46 +61,73 @@ def extract_text_from_docx(file_content):
 
 def extract_text_from_pdf(file_content):
     """
-    Extract text from PDF file.
+    Extract text from PDF file with the backend chosen for the document.
     
     Args:
         file_content: Binary content of PDF file
         
     Returns:
-        str: Extracted text
+        tuple: (extracted text, PdfReport of the backends tried)
     """
-    if not PYPDF2_AVAILABLE:
-        raise Exception("PDF processing is not available. The PyPDF2 package is not installed.")
-    
     try:
         logger.info("Extracting text from PDF file")
         
-        file_stream = BytesIO(file_content)
-        pdf_reader = PyPDF2.PdfReader(file_stream)
-        
-        text_parts = []
-        for page_num, page in enumerate(pdf_reader.pages):
-            try:
-                page_text = page.extract_text()
-                if page_text.strip():
-                    text_parts.append(page_text.strip())
-            except Exception as page_error:
-                logger.warning(f"Could not extract text from page {page_num + 1}: {page_error}")
-                continue
-        
-        extracted_text = '\n\n--- Page Break ---\n\n'.join(text_parts)
+        pages, report = extract_pdf(file_content)
+        extracted_text = PAGE_BREAK.join(page.strip() for page in pages if page.strip())
         
         if not extracted_text.strip():
-            return "This PDF appears to contain images or scanned content. OCR processing may be needed."
+            return "This PDF appears to contain images or scanned content. OCR processing may be needed.", report
         
-        logger.info(f"PDF extraction successful: {len(extracted_text)} characters")
-        return extracted_text
+        logger.info(
+            f"PDF extraction successful with {report.backend} ({report.document_class}): "
+            f"{len(extracted_text)} characters"
+        )
+        return extracted_text, report
         
+    except MemoryError:
+        raise
     except Exception as e:
         logger.error(f"PDF extraction error: {str(e)}")
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
 
+@lru_cache(maxsize=1)
+def _installed_tesseract_languages(pytesseract):
+    try:
+        return frozenset(pytesseract.get_languages(config=''))
+    except Exception as e:
+        logger.warning(f"Could not list Tesseract languages: {str(e)}")
+        return frozenset()
+
+
+def _second_pass_ocr_language(first_pass_text, image, pytesseract):
+    """
+    Tesseract language string for a second OCR pass, or None to keep the first.
+    
+    The English pass is identified directly when it reads as another Latin
+    language. Other scripts come out of an English pass as noise, so the
+    script is then taken from Tesseract's orientation and script detection.
+    """
+    if not settings.OCR_SECOND_PASS:
+        return None
+    
+    language = detect_language(first_pass_text)
+    if language is None:
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+            language = OSD_SCRIPTS.get(osd.get('script'))
+        except Exception as e:
+            # Needs the osd traineddata; without it only Latin languages are handled
+            logger.debug(f"Script detection unavailable: {str(e)}")
+            return None
+    
+    pack = TESSERACT_LANGUAGES.get(language)
+    if not pack or pack == 'eng' or pack not in _installed_tesseract_languages(pytesseract):
+        return None
+    # Keep English for the mixed-language text common in contracts
+    return f"{pack}+eng"
+
+
 def extract_text_from_image(file_content):
     """
     Extract text from image using OCR.
@@ -119,10 +138,12 @@ def extract_text_from_image(file_content):
     Returns:
         str: Extracted text
     """
-    if not PIL_AVAILABLE:
+    Image = optional_import('PIL.Image')
+    if Image is None:
         raise Exception("Image processing is not available. The Pillow package is not installed.")
     
-    if not PYTESSERACT_AVAILABLE:
+    pytesseract = optional_import('pytesseract')
+    if pytesseract is None:
         raise Exception("OCR processing is not available. The pytesseract package is not installed.")
     
     try:
@@ -137,12 +158,20 @@ def extract_text_from_image(file_content):
         extracted_text = pytesseract.image_to_string(image, lang='eng')
         extracted_text = extracted_text.strip()
         
+        # Re-run with the document's language pack when it isn't English
+        ocr_language = _second_pass_ocr_language(extracted_text, image, pytesseract)
+        if ocr_language:
+            logger.info(f"Second OCR pass with lang={ocr_language}")
+            extracted_text = pytesseract.image_to_string(image, lang=ocr_language).strip()
+        
         if not extracted_text:
             return "No readable text found in this image."
         
         logger.info(f"Image OCR successful: {len(extracted_text)} characters")
         return extracted_text
         
+    except MemoryError:
+        raise
     except Exception as e:
         logger.error(f"Image extraction error: {str(e)}")
         raise Exception(f"Failed to extract text from image: {str(e)}")
@@ -179,24 +208,81 @@ def determine_file_type(filename, content_type):
     return 'unknown'
 
 
+def extraction_cache_key(file_content, file_type):
+    """Cache key for the extracted text of a file."""
+    return f"extracted_{file_type}_{content_hash(file_content)}"
+
+
+def extraction_failure_cache_key(file_content, file_type):
+    """Cache key for a file that hit an extraction limit."""
+    return f"extraction_failed_{file_type}_{content_hash(file_content)}"
+
+
+def extract_text_uncached(file_content, file_type):
+    """
+    Run the extractor for a file type (inline; also used by sandbox processes).
+    
+    Returns:
+        tuple: (extracted text, PdfReport or None), the report recorded by the caller
+    """
+    if file_type == 'pdf':
+        return extract_text_from_pdf(file_content)
+    elif file_type == 'docx':
+        return extract_text_from_docx(file_content), None
+    elif file_type == 'image':
+        return extract_text_from_image(file_content), None
+    raise Exception(f"Unsupported file type: {file_type}")
+
+
 def extract_text_from_file(file_content, file_type):
     """
     Extract text from file based on type.
     
+    Results are cached by content hash, so identical uploads (and files
+    pre-processed by the cache warmup) skip extraction entirely. With
+    EXTRACTION_SANDBOX_ENABLED, extraction runs in a resource-limited child
+    process; files that hit the CPU or memory limit are remembered and fail
+    fast on retry.
+    
     Args:
         file_content: Binary content of file
         file_type: Type of file ('pdf', 'docx', or 'image')
         
     Returns:
         str: Extracted text
+        
+    Raises:
+        ExtractionLimitError: the file exceeded a sandbox limit
     """
+    cache_key = extraction_cache_key(file_content, file_type)
+    cached_text = cache.get(cache_key)
+    if cached_text:
+        return cached_text
+    
+    if file_type not in ('pdf', 'docx', 'image'):
+        raise Exception(f"Unsupported file type: {file_type}")
+    
     logger.info(f"Extracting text from {file_type} file")
     
-    if file_type == 'pdf':
-        return extract_text_from_pdf(file_content)
-    elif file_type == 'docx':
-        return extract_text_from_docx(file_content)
-    elif file_type == 'image':
-        return extract_text_from_image(file_content)
+    if settings.EXTRACTION_SANDBOX_ENABLED:
+        failure_key = extraction_failure_cache_key(file_content, file_type)
+        failure = cache.get(failure_key)
+        if failure:
+            raise ExtractionLimitError(*failure)
+        try:
+            extracted_text, report = extraction_sandbox.extract(file_content, file_type)
+        except ExtractionLimitError as e:
+            # Same file, same outcome: don't burn another sandbox on it
+            if e.cacheable:
+                cache.set(failure_key, (e.reason, e.limit), 3600)
+            raise
     else:
-        raise Exception(f"Unsupported file type: {file_type}")
\ No newline at end of file
+        extracted_text, report = extract_text_uncached(file_content, file_type)
+    
+    # Backend throughput is published here, since the sandbox's stats stay in the child
+    if report:
+        record_pdf_report(report)
+    
+    # Cache extraction for 1 hour
+    cache.set(cache_key, extracted_text, 3600)
+    return extracted_text
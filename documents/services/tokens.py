@@ -0,0 +1,172 @@
+"""
+Fast local token estimates and per-model input budgeting.
+
+Replaces fixed character slicing: inputs are trimmed at sentence boundaries
+to fit the token window left after the system prompt and reserved output,
+so dense or non-Latin text neither overflows nor wastes the context.
+"""
+
+import logging
+import math
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+from .stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Context window and output ceiling per model
+MODEL_BUDGETS = {
+    'llama-3.3-70b-versatile': {'context_window': 131072, 'max_output_tokens': 32768},
+    'llama-3.1-8b-instant': {'context_window': 131072, 'max_output_tokens': 8192},
+}
+DEFAULT_MODEL_BUDGET = {'context_window': 8192, 'max_output_tokens': 2048}
+
+# Tokens reserved for chat formatting and estimation error
+SAFETY_MARGIN_TOKENS = 64
+
+# Approximate characters per token for runs of each script
+_SCRIPT_PATTERNS = (
+    (re.compile(r'[\u0400-\u04FF]+'), 2.5),                           # Cyrillic
+    (re.compile(r'[\u0600-\u06FF\u0750-\u077F]+'), 2.0),              # Arabic
+    (re.compile(r'[\u0900-\u097F]+'), 1.5),                           # Devanagari
+    (re.compile(r'[\u0E00-\u0E7F]+'), 1.5),                           # Thai
+    (re.compile(r'[\u3040-\u30FF\u4E00-\u9FFF\uAC00-\uD7AF]+'), 1.0),  # CJK / kana / Hangul
+)
+_LATIN_WORD = re.compile(r'[A-Za-z\u00C0-\u024F\u1E00-\u1EFF]+')
+_DIGITS = re.compile(r'\d+')
+_PUNCTUATION = re.compile(r'[!-/:-@\[-`{-~\u2010-\u205E\u3000-\u303F\uFF01-\uFF0F]')
+_SENTENCE_END = re.compile(r'(?<=[.!?;:\u0964\u3002\uFF01\uFF1F])\s+|\n+')
+
+# Expected output/input token ratio when translating English into a language
+TRANSLATION_TOKEN_RATIO = {
+    'hi': 2.5, 'th': 2.5, 'ar': 1.8, 'ru': 1.6, 'ko': 1.5,
+    'ja': 1.4, 'zh': 1.2, 'vi': 1.5, 'pl': 1.4, 'fi': 1.4,
+}
+DEFAULT_TRANSLATION_TOKEN_RATIO = 1.3
+
+TokenPlan = namedtuple('TokenPlan', ['text', 'input_tokens', 'max_output_tokens', 'trimmed'])
+
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Latin words count one token per ~6 letters, digits one per 3, each
+    punctuation mark one, and other scripts by their characters-per-token
+    ratio. Runs entirely in C-level regex scans.
+    """
+    if not text:
+        return 0
+
+    tokens = sum(1 + (len(word) - 1) // 6 for word in _LATIN_WORD.findall(text))
+    tokens += sum(math.ceil(len(run) / 3) for run in _DIGITS.findall(text))
+    tokens += len(_PUNCTUATION.findall(text))
+    for pattern, chars_per_token in _SCRIPT_PATTERNS:
+        script_chars = sum(len(run) for run in pattern.findall(text))
+        tokens += math.ceil(script_chars / chars_per_token)
+    return tokens
+
+
+def get_model_budget(model):
+    return MODEL_BUDGETS.get(model, DEFAULT_MODEL_BUDGET)
+
+
+def trim_to_token_budget(text, max_tokens):
+    """
+    Trim text at the last sentence boundary that fits the budget.
+
+    Returns:
+        tuple: (trimmed text, estimated tokens)
+    """
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text, total
+
+    used = 0
+    end = 0
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence_tokens = estimate_tokens(text[start:match.end()])
+        if used + sentence_tokens > max_tokens:
+            break
+        used += sentence_tokens
+        end = start = match.end()
+
+    if end == 0:
+        # A single sentence is over budget: cut at the longest prefix that
+        # fits (estimates never shrink as a prefix grows)
+        low, high = 1, int(len(text) * max_tokens / total) + 1
+        while estimate_tokens(text[:high]) <= max_tokens:
+            low, high = high, min(len(text), high * 2)
+        while low < high - 1:
+            middle = (low + high) // 2
+            if estimate_tokens(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle
+        return text[:low], estimate_tokens(text[:low])
+
+    return text[:end].rstrip(), used
+
+
+def plan_request(task, model, system_prompt, text, target_language=None):
+    """
+    Fit an LLM input into the task and model budgets.
+
+    Args:
+        task: 'simplify' or 'translate' (keys of settings.AI_TOKEN_BUDGETS)
+        model: Model name (key of MODEL_BUDGETS)
+        system_prompt: System prompt sent with the request
+        text: User content to trim
+        target_language: Target language code for translations
+
+    Returns:
+        TokenPlan: trimmed text, its estimated tokens and max_tokens to request
+    """
+    task_budget = settings.AI_TOKEN_BUDGETS[task]
+    model_budget = get_model_budget(model)
+
+    max_output_tokens = task_budget['max_output_tokens']
+    if task == 'translate' and target_language:
+        ratio = TRANSLATION_TOKEN_RATIO.get(target_language, DEFAULT_TRANSLATION_TOKEN_RATIO)
+        # Leave room for the translation to be longer than its source
+        source_tokens = min(estimate_tokens(text), task_budget['max_input_tokens'])
+        max_output_tokens = max(max_output_tokens, math.ceil(source_tokens * ratio))
+    max_output_tokens = min(max_output_tokens, model_budget['max_output_tokens'])
+
+    window = (
+        model_budget['context_window']
+        - estimate_tokens(system_prompt)
+        - max_output_tokens
+        - SAFETY_MARGIN_TOKENS
+    )
+    input_budget = max(1, min(task_budget['max_input_tokens'], window))
+
+    trimmed_text, input_tokens = trim_to_token_budget(text, input_budget)
+    return TokenPlan(trimmed_text, input_tokens, max_output_tokens, len(trimmed_text) < len(text))
+
+
+def record_usage(task, model, language, plan, completion=None):
+    """
+    Record estimated and (when reported) actual token use of one LLM call.
+    """
+    key = f"{task}:{model}:{language}"
+    stats.observe('llm.input_tokens_estimated', plan.input_tokens, key)
+    if plan.trimmed:
+        stats.increment('llm.inputs_trimmed', key)
+
+    usage = getattr(completion, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    if prompt_tokens is not None:
+        stats.observe('llm.prompt_tokens', prompt_tokens, key)
+    if completion_tokens is not None:
+        stats.observe('llm.completion_tokens', completion_tokens, key)
+
+    logger.info(
+        f"LLM {key}: ~{plan.input_tokens} input tokens (trimmed={plan.trimmed}), "
+        f"prompt={prompt_tokens}, completion={completion_tokens}"
+    )
@@ -0,0 +1,149 @@
+"""
+Cross-request micro-batching of short translations.
+
+Short texts (headings, small sections, tiny documents) bound for the same
+language and model within a few milliseconds are joined into one
+delimited prompt and sent as a single LLM call. The first caller of a
+batch waits out the window, sends the batch and splits the response back
+to the waiting callers. A segment whose delimiter does not survive the
+round trip, or any failure of the batched call, returns None so that
+caller falls back to an individual request.
+"""
+
+import logging
+import re
+import threading
+
+from django.conf import settings
+
+from .stats import stats
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_MARKER = re.compile(r'^[ \t]*<<<(\d+)>>>[ \t]*$', re.MULTILINE)
+
+
+def join_segments(texts):
+    """Texts joined under numbered marker lines (numbered from 1)."""
+    return '\n'.join(f"<<<{number}>>>\n{text}" for number, text in enumerate(texts, 1))
+
+
+def split_segments(output, count):
+    """
+    Split a batched response back into segments.
+
+    Returns:
+        list: ``count`` translations, None for each marker that did not round-trip
+    """
+    parts = _MARKER.split(output)
+    # parts = [preamble, number, body, number, body, ...]
+    numbers = [int(number) for number in parts[1::2]]
+    bodies = [body.strip() for body in parts[2::2]]
+
+    results = [None] * count
+    for position, (number, body) in enumerate(zip(numbers, bodies)):
+        # A body is only trusted when the next marker follows in sequence;
+        # otherwise it may have swallowed a segment whose marker was lost
+        following = numbers[position + 1] if position + 1 < len(numbers) else count + 1
+        if 1 <= number <= count and following == number + 1 and numbers.count(number) == 1 and body:
+            results[number - 1] = body
+    return results
+
+
+class _Batch:
+    def __init__(self):
+        self.texts = []
+        self.tokens = 0
+        self.results = None
+        self.closed = threading.Event()
+        self.done = threading.Event()
+
+
+class TranslationBatcher:
+    """Collects short translation segments per (language, model) and sends them together."""
+
+    def __init__(self, send_batch):
+        """
+        Args:
+            send_batch: Callable (target_language, model, texts) returning one
+                translation or None per text
+        """
+        self._send_batch = send_batch
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def eligible(self, text):
+        """Whether text is short enough to wait for a batch."""
+        return (
+            settings.TRANSLATION_BATCH_ENABLED
+            and estimate_tokens(text) <= settings.TRANSLATION_BATCH_MAX_SEGMENT_TOKENS
+            and not _MARKER.search(text)
+        )
+
+    def translate(self, text, target_language, model):
+        """
+        Translate text as part of a batch.
+
+        Returns:
+            str or None: Translation, or None if the caller should translate on its own
+        """
+        key = (target_language, model)
+        tokens = estimate_tokens(text)
+
+        with self._lock:
+            batch = self._open.get(key)
+            if batch is not None and batch.tokens + tokens > settings.TRANSLATION_BATCH_MAX_TOKENS:
+                self._close(key, batch)
+                batch = None
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.texts)
+            batch.texts.append(text)
+            batch.tokens += tokens
+            if len(batch.texts) >= settings.TRANSLATION_BATCH_MAX_SEGMENTS:
+                self._close(key, batch)
+
+        window = settings.TRANSLATION_BATCH_WINDOW_MS / 1000
+        if leader:
+            batch.closed.wait(window)
+            with self._lock:
+                self._close(key, batch)
+            self._flush(target_language, model, batch)
+        elif not batch.done.wait(window + settings.AI_TRANSLATE_TIMEOUT + 1):
+            stats.increment('translation.batch', 'wait_timeout')
+            return None
+
+        return batch.results[index]
+
+    def _close(self, key, batch):
+        # Called with the lock held; later segments start a new batch
+        if self._open.get(key) is batch:
+            del self._open[key]
+        batch.closed.set()
+
+    def _flush(self, target_language, model, batch):
+        count = len(batch.texts)
+        results = [None] * count
+        try:
+            if count > 1:
+                results = self._send_batch(target_language, model, batch.texts)
+                if len(results) != count:
+                    raise ValueError(f"expected {count} segments, got {len(results)}")
+                recovered = sum(result is not None for result in results)
+                stats.observe('translation.batch_size', count, target_language)
+                stats.increment('translation.batch', 'segments_batched', recovered)
+                if recovered < count:
+                    stats.increment('translation.batch', 'segments_unsplit', count - recovered)
+                    logger.warning(
+                        f"Batched translation to {target_language}: {count - recovered}/{count} "
+                        f"segments lost their delimiters; translating them individually"
+                    )
+        except Exception as e:
+            stats.increment('translation.batch', 'failed')
+            logger.warning(f"Batched translation to {target_language} failed: {str(e)}")
+            results = [None] * count
+        finally:
+            batch.results = results
+            batch.done.set()
@@ -7,13 +7,16 @@ from functools import lru_cache
 from django.conf import settings
 from django.core.cache import cache
 
-logger = logging.getLogger(__name__)
+from .hashing import content_hash
+from .llm_client import get_llm_client
+from .tokens import plan_request, record_usage
+from .model_router import model_router
+from .language_id import SKIP_MARGIN, detect_language_cached
+from .glossary import split_glossary_section
+from .translation_batcher import TranslationBatcher, join_segments, split_segments
+from .stats import stats
 
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
 # Optimized language list
 LANGUAGE_NAMES = {
@@ -43,75 +46,41 @@ class TranslationService:
     """Optimized translation service with singleton pattern."""
     
     _instance = None
-    _groq_client = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._batcher = TranslationBatcher(cls._instance._request_batch)
         return cls._instance
     
-    def __init__(self):
-        if not hasattr(self, 'initialized'):
-            self.groq_initialized = False
-            self.initialized = True
-    
-    def _initialize_groq(self):
-        """Initialize Groq client with connection reuse."""
-        if self.groq_initialized:
-            return self._groq_client is not None
-        
-        if not GROQ_AVAILABLE:
-            self.groq_initialized = True
-            return False
-        
-        api_key = getattr(settings, 'GROQ_API_KEY', None)
-        if not api_key or api_key == 'your_groq_api_key_here':
-            self.groq_initialized = True
-            return False
-        
-        try:
-            self._groq_client = Groq(api_key=api_key)
-        except Exception:
-            self._groq_client = None
-        
-        self.groq_initialized = True
-        return self._groq_client is not None
-    
     def translate_text(self, text, target_language):
-        """Optimized translation with caching."""
+        """Optimized translation with caching and model routing."""
         if target_language == 'en':
             return text
         
-        # Check cache first
-        cache_key = f"translation_{hash(text)}_{target_language}"
-        cached_result = cache.get(cache_key)
+        # Text clearly already in the target language needs no LLM call
+        if detect_language_cached(text, SKIP_MARGIN) == target_language:
+            stats.increment('translation.skipped', target_language)
+            return text
+        
+        # Check cache first, under every model (routing shifts with latency)
+        cached_result = get_cached_translation(text, target_language)
         if cached_result:
             return cached_result
         
-        if not self._initialize_groq():
+        model = model_router.choose_for_text('translate', text)
+        cache_key = translation_cache_key(text, target_language, model)
+        
+        if get_llm_client() is None:
             result = self._get_mock_translation(target_language)
         else:
             try:
-                target_language_name = LANGUAGE_NAMES.get(target_language, target_language)
-                
-                completion = self._groq_client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"Translate to {target_language_name}. Maintain formatting."
-                        },
-                        {
-                            "role": "user",
-                            "content": text[:3000]  # Limit input for faster processing
-                        }
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.2,
-                    max_tokens=2000,
-                    timeout=25  # 25 second timeout
-                )
-                
-                result = completion.choices[0].message.content
+                result = None
+                # Short texts share one LLM call with concurrent requests
+                if self._batcher.eligible(text):
+                    result = self._batcher.translate(text, target_language, model)
+                if result is None:
+                    result = self._request_translation(text, target_language, model)
             except Exception:
                 result = self._get_mock_translation(target_language)
         
@@ -119,6 +88,78 @@ class TranslationService:
         cache.set(cache_key, result, 7200)
         return result
     
+    def _request_translation(self, text, target_language, model):
+        """Single budgeted translation call."""
+        target_language_name = LANGUAGE_NAMES.get(target_language, target_language)
+        system_prompt = f"Translate to {target_language_name}. Maintain formatting."
+        # Fit input to the token budget, reserving output room for the target script
+        plan = plan_request(
+            'translate', model, system_prompt, text, target_language
+        )
+        
+        completion, answered_by = model_router.timed_completion(
+            get_llm_client(),
+            'translate',
+            model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": plan.text
+                }
+            ],
+            temperature=0.2,
+            max_tokens=plan.max_output_tokens,
+            timeout=settings.AI_TRANSLATE_TIMEOUT
+        )
+        
+        record_usage('translate', answered_by, target_language, plan, completion)
+        return completion.choices[0].message.content
+    
+    def _request_batch(self, target_language, model, texts):
+        """
+        One call translating several delimited segments.
+
+        Returns:
+            list: Translation per text, None where the delimiters did not round-trip
+        """
+        target_language_name = LANGUAGE_NAMES.get(target_language, target_language)
+        system_prompt = (
+            f"Translate each segment to {target_language_name}. Maintain formatting. "
+            "Copy every <<<n>>> marker line unchanged, in order, before its segment's translation."
+        )
+        plan = plan_request(
+            'translate', model, system_prompt, join_segments(texts), target_language
+        )
+        if plan.trimmed:
+            # Trimming would drop whole segments; let each go on its own
+            return [None] * len(texts)
+        
+        completion, answered_by = model_router.timed_completion(
+            get_llm_client(),
+            'translate',
+            model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": plan.text
+                }
+            ],
+            temperature=0.2,
+            max_tokens=plan.max_output_tokens,
+            timeout=settings.AI_TRANSLATE_TIMEOUT
+        )
+        
+        record_usage('translate', answered_by, target_language, plan, completion)
+        return split_segments(completion.choices[0].message.content, len(texts))
+    
     @lru_cache(maxsize=20)
     def _get_mock_translation(self, target_language):
         """Cached mock translations."""
@@ -163,6 +204,18 @@ class TranslationService:
         """Cached supported languages."""
         return LANGUAGE_NAMES.copy()
 
+def translation_cache_key(text, target_language, model):
+    """Cache key for the translation of ``text`` into ``target_language`` by ``model``."""
+    return f"translation_{model}_{content_hash(text)}_{target_language}"
+
+def get_cached_translation(text, target_language):
+    """Cached translation of ``text`` by any model (large model first), or None."""
+    for model in model_router.cached_models():
+        result = cache.get(translation_cache_key(text, target_language, model))
+        if result:
+            return result
+    return None
+
 # Global singleton instance
 translation_service = TranslationService()
 
@@ -170,6 +223,11 @@ def translate_text(text, target_language):
     """Optimized convenience function."""
     return translation_service.translate_text(text, target_language)
 
+def is_mock_translation(result, target_language):
+    """Whether ``result`` is the placeholder shown when translation is unavailable."""
+    result, _ = split_glossary_section(result)
+    return result == translation_service._get_mock_translation(target_language)
+
 @lru_cache(maxsize=1)
 def get_supported_languages():
     """Cached convenience function."""
@@ -0,0 +1,1101 @@
+import gzip
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .middleware import CompressionMiddleware, RequestProfilingMiddleware
+from .models import DocumentResult, MetricsRollup, OriginalText, ResultTranslation, SystemMetrics
+from .services.admission import estimate_cost_mb
+from .services.ai_service import AIService, get_cached_simplification, simplified_cache_key, simplify_legal_text
+from .services.cache_warmup import warm_cache
+from .services.extractive_summary import is_extractive_summary, summarize
+from .services.extraction_sandbox import ExtractionLimitError, ExtractionSandbox, sandbox_preload_modules
+from .services.glossary import TermMatcher, add_glossary_section, find_terms, split_glossary_section
+from .services.hashing import content_hash
+from .services.metrics_rollup import rollup_metrics, sketch_add, sketch_quantile
+from .services.model_router import REQUIRED_SECTIONS, HedgeBudget, ModelRouter, model_router
+from .services.normalization import remove_running_lines
+from .services.pdf_backends import PDF_BACKENDS, extract_pdf, installed_backends
+from .services.request_metrics import RequestMetricsBuffer
+from .services.request_profiler import COLLAPSED_SUFFIX, list_profiles
+from .services.language_id import _SCRIPTS, MIN_MARGIN, detect_language, identify_language
+from .services.lazy_imports import FORMAT_MODULES, format_modules, optional_import, preload
+from .services.llm_client import LLMClientPool
+from .services.results import purge_expired_results, save_result, save_translation, store_original_text
+from .services.result_patch import find_substitutions, patch_result
+from .services.similarity_index import FILE_HEADER, RECORD, SimilarityIndex, similarity
+from .services.stats import stats
+from .services.text_extractor import extract_text_from_docx, extract_text_from_file, extraction_failure_cache_key
+from .services.tokens import (
+    DEFAULT_MODEL_BUDGET, SAFETY_MARGIN_TOKENS, TRANSLATION_TOKEN_RATIO, estimate_tokens, plan_request,
+    trim_to_token_budget,
+)
+from .services.translation_batcher import TranslationBatcher, join_segments, split_segments
+from .services.translation_service import LANGUAGE_NAMES, get_cached_translation, translate_text
+
+
+LEASE = (
+    "This Lease Agreement is made between Jane Smith, the Landlord, and John Doe, "
+    "the Tenant. The Tenant shall pay monthly rent of 1200 dollars on the first day "
+    "of each month. The Tenant shall keep the premises in good repair and shall not "
+    "sublet without the written consent of the Landlord. Either party may terminate "
+    "this lease with sixty days written notice to the other party."
+)
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'similarity.idx'
+        self.index = SimilarityIndex(self.path, 0.95)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_bands_cover_the_distance_threshold(self):
+        self.assertEqual(self.index.max_distance, 3)
+        self.assertEqual(self.index.band_count * self.index.band_bits, 64)
+
+        generator = random.Random(35)
+        for _ in range(200):
+            signature = generator.getrandbits(64)
+            near = signature
+            for bit in generator.sample(range(64), self.index.max_distance):
+                near ^= 1 << bit
+            index = SimilarityIndex(self.path, 0.95)
+            index._insert(near, bytes(32), bytes(16))
+            self.assertIn(0, index._candidates(signature))
+
+    def test_similarity_below_threshold_is_not_returned(self):
+        self.assertLess(similarity(0, 0b1111), 0.95)
+        self.assertGreaterEqual(similarity(0, 0b111), 0.95)
+
+    def test_layout_only_difference_ranks_first(self):
+        self.index.add(LEASE.replace('1200', '1500'), 'c' * 64)
+        self.index.add(LEASE, 'a' * 64)
+        rewrapped = LEASE.replace('. ', '.\n\n')
+        matches = self.index.find(rewrapped, exclude='b' * 64)
+        self.assertEqual([(content_id, same_layout) for content_id, _, same_layout in matches],
+                         [('a' * 64, True), ('c' * 64, False)])
+
+    def test_own_entry_is_excluded(self):
+        self.index.add(LEASE, 'a' * 64)
+        self.assertEqual(self.index.find(LEASE, exclude='a' * 64), [])
+
+    def test_other_workers_entries_are_loaded(self):
+        self.index.add(LEASE, 'a' * 64)
+        other = SimilarityIndex(self.path, 0.95)
+        self.assertEqual(other.find(LEASE, exclude='b' * 64)[0][0], 'a' * 64)
+
+    def test_removed_entries_disappear_for_every_worker(self):
+        other = SimilarityIndex(self.path, 0.95)
+        self.index.add(LEASE, 'a' * 64)
+        self.index.add(LEASE.replace('1200', '1500'), 'c' * 64)
+        self.assertEqual(len(other.find(LEASE)), 2)
+
+        self.assertEqual(self.index.remove(['a' * 64, 'd' * 64]), 1)
+        self.assertEqual([match[0] for match in other.find(LEASE)], ['c' * 64])
+        self.assertEqual(self.path.stat().st_size, len(FILE_HEADER) + RECORD.size)
+
+    def test_older_index_format_is_ignored(self):
+        self.path.write_bytes(bytes(40))
+        with self.assertLogs('documents.services.similarity_index', 'ERROR'):
+            self.assertEqual(self.index.find(LEASE), [])
+        self.index.add(LEASE, 'a' * 64)
+        self.assertEqual(self.path.read_bytes(), bytes(40))
+
+
+FILLED_LEASE = (
+    LEASE.replace('Jane Smith', 'Maria Garcia').replace('John Doe', 'Ken Ito').replace('1200', '1450')
+)
+LEASE_TERMS = (
+    " The Landlord shall maintain the roof, the exterior walls and the heating system in working order."
+    " The Tenant shall pay for electricity, water, gas and internet service used at the premises."
+    " A security deposit equal to one month of rent is held by the Landlord during the term."
+    " The deposit is returned within thirty days after the Tenant leaves, less the cost of damage."
+    " The Tenant may not make alterations to the premises without prior written approval."
+    " The Landlord may enter the premises for inspection after giving twenty four hours notice."
+    " Pets are allowed only with the written consent of the Landlord and an additional deposit."
+    " The Tenant shall carry renter's insurance covering personal property and liability."
+    " This agreement is governed by the laws of the state in which the premises are located."
+    " This agreement is the entire agreement of the parties and may be changed only in writing."
+)
+LEASE_SUMMARY = (
+    "## 📄 Main Points\n- Jane Smith rents the premises to John Doe.\n"
+    "- Rent is 1200 dollars, due on the first day of each month.\n- Sixty days notice ends the lease."
+)
+
+
+class ResultPatchTests(SimpleTestCase):
+    def test_filled_in_fields_are_substituted(self):
+        self.assertEqual(
+            sorted(find_substitutions(LEASE, FILLED_LEASE)),
+            [(('1200',), '1450'), (('Jane', 'Smith'), 'Maria Garcia'), (('John', 'Doe'), 'Ken Ito')],
+        )
+        self.assertEqual(
+            patch_result(LEASE_SUMMARY, LEASE, FILLED_LEASE),
+            "## 📄 Main Points\n- Maria Garcia rents the premises to Ken Ito.\n"
+            "- Rent is 1450 dollars, due on the first day of each month.\n- Sixty days notice ends the lease.",
+        )
+
+    def test_whitespace_only_changes_need_no_substitution(self):
+        self.assertEqual(patch_result(LEASE_SUMMARY, LEASE, LEASE.replace('. ', '.\n')), LEASE_SUMMARY)
+
+    def test_ambiguous_values_are_widened_with_context(self):
+        old = LEASE + " The deposit is 1200 dollars."
+        new = FILLED_LEASE + " The deposit is 1200 dollars."
+        self.assertIn((('of', '1200', 'dollars'), 'of 1450 dollars'), find_substitutions(old, new))
+
+    def test_added_clauses_are_not_patched(self):
+        changed = FILLED_LEASE.replace(
+            'without the written consent', 'or keep pets or run a business without the written consent'
+        )
+        self.assertIsNone(find_substitutions(LEASE, changed))
+        self.assertIsNone(patch_result(LEASE_SUMMARY, LEASE, changed))
+
+    def test_stale_or_derived_values_are_not_served(self):
+        # "Mr. Doe" is not a substituted span, and 14400 is derived from the old rent
+        self.assertIsNone(patch_result(LEASE_SUMMARY + "\n- Mr. Doe pays first.", LEASE, FILLED_LEASE))
+        self.assertIsNone(patch_result(LEASE_SUMMARY + "\n- 14400 dollars a year.", LEASE, FILLED_LEASE))
+
+
+@override_settings(NEAR_DUPLICATE_ENABLED=True)
+class NearDuplicateReuseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index = SimilarityIndex(Path(directory.name) / 'similarity.idx', 0.85)
+        patcher = mock.patch('documents.services.ai_service.get_similarity_index', return_value=self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        content_id = store_original_text(LEASE + LEASE_TERMS)
+        save_result(content_id, LEASE_SUMMARY)
+        self.index.add(LEASE + LEASE_TERMS, content_id)
+
+    def test_filled_in_copy_is_patched_without_the_llm(self):
+        before = stats.counter('similarity.lookups', 'patched')
+        with mock.patch('documents.services.ai_service.get_llm_client') as get_client:
+            result = simplify_legal_text(FILLED_LEASE + LEASE_TERMS)
+        get_client.assert_not_called()
+        self.assertIn('Maria Garcia rents the premises to Ken Ito', result)
+        self.assertEqual(stats.counter('similarity.lookups', 'patched') - before, 1)
+
+    def test_purged_results_leave_the_index(self):
+        DocumentResult.objects.update(created_at=timezone.now() - timedelta(days=365))
+        OriginalText.objects.update(created_at=timezone.now() - timedelta(days=365))
+        with mock.patch('documents.services.results.get_similarity_index', return_value=self.index):
+            self.assertEqual(purge_expired_results()['index_entries'], 1)
+        self.assertEqual(len(self.index), 0)
+
+
+@override_settings(EXTRACTION_SANDBOX_ENABLED=True)
+def _pdf_with_text(text):
+    """Single-page PDF showing text in Helvetica."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+class ExtractionLimitTests(SimpleTestCase):
+    FILE = b'%PDF-1.4 limit test'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_only_file_limits_are_cacheable(self):
+        self.assertTrue(ExtractionLimitError('cpu', 15).cacheable)
+        self.assertTrue(ExtractionLimitError('memory', 768).cacheable)
+        self.assertFalse(ExtractionLimitError('timeout', 20).cacheable)
+        self.assertFalse(ExtractionLimitError('crashed').cacheable)
+
+    def test_cpu_limit_fails_fast_on_retry(self):
+        with mock.patch(
+            'documents.services.text_extractor.extraction_sandbox.extract',
+            side_effect=ExtractionLimitError('cpu', 15),
+        ) as extract:
+            for _ in range(2):
+                with self.assertRaises(ExtractionLimitError) as raised:
+                    extract_text_from_file(self.FILE, 'pdf')
+                self.assertEqual(raised.exception.reason, 'cpu')
+        self.assertEqual(extract.call_count, 1)
+
+    def test_timeout_is_retried(self):
+        with mock.patch(
+            'documents.services.text_extractor.extraction_sandbox.extract',
+            side_effect=[ExtractionLimitError('timeout', 20), ('Lease text', None)],
+        ) as extract:
+            with self.assertRaises(ExtractionLimitError):
+                extract_text_from_file(self.FILE, 'pdf')
+            self.assertIsNone(cache.get(extraction_failure_cache_key(self.FILE, 'pdf')))
+            self.assertEqual(extract_text_from_file(self.FILE, 'pdf'), 'Lease text')
+        self.assertEqual(extract.call_count, 2)
+
+    @override_settings(EXTRACTION_TIMEOUT=0, EXTRACTION_WORKERS=1)
+    def test_sandbox_timeout_replaces_the_process(self):
+        sandbox = ExtractionSandbox()
+        try:
+            with self.assertRaises(ExtractionLimitError) as raised:
+                sandbox.extract(self.FILE, 'pdf')
+            self.assertEqual(raised.exception.reason, 'timeout')
+            self.assertEqual(sandbox._idle, [])
+        finally:
+            sandbox.shutdown()
+
+    def test_forkserver_preloads_the_extraction_backends(self):
+        modules = sandbox_preload_modules()
+        for module_name in format_modules(['pdf', 'docx', 'image']):
+            self.assertIn(module_name, modules)
+
+    @skipUnless(
+        any(optional_import(module_name) for module_name in FORMAT_MODULES['pdf']),
+        "no PDF backend installed",
+    )
+    @override_settings(EXTRACTION_WORKERS=1, EXTRACTION_MAX_JOBS_PER_WORKER=2)
+    def test_real_pdf_is_extracted_in_recycled_sandbox_processes(self):
+        sandbox = ExtractionSandbox()
+        before = stats.counter('extraction.sandbox', 'spawned')
+        try:
+            for _ in range(3):
+                text, report = sandbox.extract(_pdf_with_text('Rent is due on the first day'), 'pdf')
+                self.assertEqual(text, 'Rent is due on the first day')
+                self.assertIn(report.backend, PDF_BACKENDS)
+        finally:
+            sandbox.shutdown()
+        # Two jobs per process: the third runs in a replacement
+        self.assertEqual(stats.counter('extraction.sandbox', 'spawned') - before, 2)
+
+
+class ModelRoutingCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_large_model_result_is_served_when_routing_picks_fast(self):
+        text = "The Tenant shall pay rent monthly."
+        self.assertEqual(model_router.choose_for_text('simplify', text), model_router.fast_model)
+        cache.set(simplified_cache_key(text, model_router.large_model), 'large result')
+        cache.set(simplified_cache_key(text, model_router.fast_model), 'fast result')
+        with mock.patch('documents.services.ai_service.get_llm_client') as get_client:
+            self.assertEqual(simplify_legal_text(text), 'large result')
+        get_client.assert_not_called()
+
+    @override_settings(
+        AI_FAST_FIRST_PASS=True, AI_HEDGE_ENABLED=False, NEAR_DUPLICATE_ENABLED=False,
+        AI_MODELS={'large': 'first-pass-large', 'fast': 'first-pass-fast'},
+    )
+    def test_accepted_first_pass_is_cached_and_counted_under_the_fast_model(self):
+        text = "The Tenant shall pay rent monthly and keep the premises in good repair."
+        draft = '\n'.join(REQUIRED_SECTIONS)
+        client = mock.Mock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=draft), finish_reason='stop')],
+            usage=SimpleNamespace(prompt_tokens=50, completion_tokens=20),
+        )
+        with mock.patch('documents.services.ai_service.get_llm_client', return_value=client), \
+                mock.patch.object(ModelRouter, 'choose_for_text', return_value='first-pass-large'):
+            self.assertEqual(simplify_legal_text(text), draft)
+
+        client.chat.completions.create.assert_called_once()
+        self.assertEqual(cache.get(simplified_cache_key(text, 'first-pass-fast')), draft)
+        self.assertIsNone(cache.get(simplified_cache_key(text, 'first-pass-large')))
+        observations = stats.snapshot()['observations']
+        self.assertIn('simplify:first-pass-fast:en', observations['llm.prompt_tokens'])
+        self.assertNotIn('simplify:first-pass-large:en', observations['llm.prompt_tokens'])
+        self.assertIn('first-pass-fast', observations['llm.latency_ms'])
+        self.assertNotIn('first-pass-large', observations['llm.latency_ms'])
+
+
+@override_settings(RESULT_RETENTION_DAYS=30)
+class ResultRetentionTests(TestCase):
+    def test_expired_results_and_translations_are_purged(self):
+        now = timezone.now()
+        expired = DocumentResult.objects.create(
+            content_id='a' * 64, simplified_text='old', created_at=now - timedelta(days=31)
+        )
+        ResultTranslation.objects.create(result=expired, language='es', translated_text='viejo')
+        DocumentResult.objects.create(
+            content_id='b' * 64, simplified_text='new', created_at=now - timedelta(days=29)
+        )
+        OriginalText.objects.create(content_id='a' * 64, text='old', created_at=now - timedelta(days=31))
+        OriginalText.objects.create(content_id='b' * 64, text='new', created_at=now - timedelta(days=29))
+
+        self.assertEqual(
+            purge_expired_results(now),
+            {'original_texts': 1, 'results': 1, 'translations': 1, 'index_entries': 0},
+        )
+        self.assertEqual(
+            list(DocumentResult.objects.values_list('content_id', flat=True)), ['b' * 64]
+        )
+        self.assertEqual(list(OriginalText.objects.values_list('content_id', flat=True)), ['b' * 64])
+        self.assertFalse(ResultTranslation.objects.exists())
+
+
+@override_settings(METRICS_FLUSH_SIZE=3, METRICS_FLUSH_INTERVAL=3600)
+class RequestMetricsTests(TestCase):
+    def test_buffer_writes_in_batches(self):
+        buffer = RequestMetricsBuffer()
+        try:
+            buffer.record('process_document', 120.5, 200)
+            buffer.record('process_document', 80.0, 200)
+            self.assertFalse(SystemMetrics.objects.exists())
+            buffer.record('languages', 3.0, 200)
+            self.assertEqual(SystemMetrics.objects.count(), 3)
+        finally:
+            buffer.stop()
+
+    def test_health_checks_and_unmatched_paths(self):
+        with mock.patch('documents.services.request_metrics.request_metrics.record') as record:
+            self.client.get('/api/health/')
+            self.client.get('/api/no-such-endpoint/12345/')
+            self.client.get('/api/languages/')
+        endpoints = [call.args[0] for call in record.call_args_list]
+        self.assertEqual(endpoints, ['unmatched', 'supported_languages'])
+
+
+@override_settings(
+    METRICS_RETENTION={'raw_hours': 24, 'minute_days': 7, 'hour_days': 365}
+)
+class MetricsRollupTests(TestCase):
+    def test_sketch_quantiles_are_within_accuracy(self):
+        sketch = {}
+        for latency in range(1, 1001):
+            sketch_add(sketch, latency)
+        for q, exact in ((0.5, 500.5), (0.95, 950.05), (0.99, 990.01)):
+            self.assertAlmostEqual(sketch_quantile(sketch, q), exact, delta=exact * 0.02)
+        self.assertIsNone(sketch_quantile({}, 0.5))
+
+    def test_rollup_builds_minute_and_hour_buckets(self):
+        now = timezone.now().replace(minute=30, second=0, microsecond=0)
+        for offset, latency, status_code in ((5, 100, 200), (5, 300, 200), (65, 200, 500)):
+            SystemMetrics.objects.create(
+                timestamp=now - timedelta(seconds=offset),
+                endpoint='process_document',
+                response_time_ms=latency,
+                status_code=status_code,
+            )
+
+        rollup_metrics(now)
+        minutes = MetricsRollup.objects.filter(resolution=MetricsRollup.RESOLUTION_MINUTE)
+        self.assertEqual(sorted(minutes.values_list('count', flat=True)), [1, 2])
+        hour = MetricsRollup.objects.get(resolution=MetricsRollup.RESOLUTION_HOUR)
+        self.assertEqual((hour.count, hour.error_count, hour.latency_max_ms), (3, 1, 300))
+
+        rollup_metrics(now)
+        self.assertEqual(MetricsRollup.objects.get(resolution=MetricsRollup.RESOLUTION_HOUR).count, 3)
+
+    def test_retention_deletes_old_rows(self):
+        now = timezone.now()
+        SystemMetrics.objects.create(
+            timestamp=now - timedelta(hours=25), endpoint='stats', response_time_ms=1, status_code=200
+        )
+        for resolution, age in (
+            (MetricsRollup.RESOLUTION_MINUTE, timedelta(days=8)),
+            (MetricsRollup.RESOLUTION_MINUTE, timedelta(days=6)),
+            (MetricsRollup.RESOLUTION_HOUR, timedelta(days=366)),
+        ):
+            MetricsRollup.objects.create(
+                resolution=resolution, bucket_start=now - age, endpoint='stats', count=1
+            )
+
+        deleted = rollup_metrics(now)['deleted']
+        self.assertEqual(deleted['raw'], 1)
+        self.assertEqual(deleted[MetricsRollup.RESOLUTION_MINUTE], 1)
+        self.assertEqual(deleted[MetricsRollup.RESOLUTION_HOUR], 1)
+        self.assertFalse(MetricsRollup.objects.filter(bucket_start__lt=now - timedelta(days=7)).exists())
+        self.assertTrue(MetricsRollup.objects.filter(bucket_start=now - timedelta(days=6)).exists())
+
+
+class CacheWarmupTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        (Path(self.directory.name) / 'lease.pdf').write_bytes(b'%PDF-1.4 lease')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_startup_warmup_loads_stored_results_without_the_llm(self):
+        result = DocumentResult.objects.create(content_id=content_hash(LEASE), simplified_text='Summary')
+        ResultTranslation.objects.create(result=result, language='es', translated_text='Resumen')
+
+        with mock.patch(
+            'documents.services.cache_warmup.extract_document_text', return_value=LEASE
+        ), mock.patch('documents.services.cache_warmup.simplify_and_translate') as simplify:
+            summary = warm_cache(self.directory.name, languages=['en', 'es'], call_llm=False)
+
+        simplify.assert_not_called()
+        self.assertEqual(summary['loaded'], 1)
+        self.assertEqual(get_cached_simplification(LEASE), 'Summary')
+        self.assertEqual(get_cached_translation('Summary', 'es'), 'Resumen')
+
+    def test_startup_warmup_skips_documents_without_stored_results(self):
+        with mock.patch(
+            'documents.services.cache_warmup.extract_document_text', return_value=LEASE
+        ), mock.patch('documents.services.cache_warmup.simplify_and_translate') as simplify:
+            summary = warm_cache(self.directory.name, languages=['en'], call_llm=False)
+
+        simplify.assert_not_called()
+        self.assertEqual(summary['missing'], 1)
+
+
+def _run_together(module, file_content):
+    time.sleep(0.02)
+    return ['x' * 300, 'y' * 300]
+
+
+def _readable(module, file_content):
+    return ['The tenant shall pay the rent. ' * 10]
+
+
+@override_settings(
+    PDF_BACKEND='auto',
+    PDF_BACKEND_PREFERENCES={'standard': ['broken', 'good']},
+)
+class PdfBackendTests(SimpleTestCase):
+    PDF = b'%PDF-1.4 /Type /Page /BaseFont /Helvetica'
+
+    def setUp(self):
+        patcher = mock.patch.dict(
+            PDF_BACKENDS, {'broken': ('json', _run_together), 'good': ('json', _readable)}, clear=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_attempt_reports_its_own_page_count(self):
+        pages, report = extract_pdf(self.PDF, time_budget=60)
+        self.assertEqual(report.backend, 'good')
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(
+            [(name, attempt_pages, outcome) for name, _, attempt_pages, outcome in report.attempts],
+            [('broken', 2, 'run_together'), ('good', 1, 'used')],
+        )
+
+    def test_fallthrough_stops_before_the_timeout(self):
+        pages, report = extract_pdf(self.PDF, time_budget=0.03)
+        self.assertEqual(report.backend, 'broken')
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(report.attempts[-1][0::3], ('good', 'out_of_time'))
+
+
+class ExtractiveSummaryTests(SimpleTestCase):
+    def test_repeated_sentences_are_listed_once(self):
+        text = ' '.join(
+            [LEASE] + ["The Tenant shall indemnify the Landlord against all claims."] * 5
+        ) + "\n\nthe tenant shall  indemnify the landlord against all claims"
+        summary = summarize(text)
+        self.assertEqual(summary.lower().count('indemnify the landlord'), 1)
+
+
+class _FakeCompletions:
+    """Chat completions that sleep for the next scripted delay and echo the model."""
+
+    def __init__(self, delays):
+        self._delays = list(delays)
+        self._lock = threading.Lock()
+
+    def create(self, model, **kwargs):
+        with self._lock:
+            delay = self._delays.pop(0)
+        time.sleep(delay)
+        return model
+
+
+class _FakeClient:
+    def __init__(self, delays):
+        self.chat = mock.Mock(completions=_FakeCompletions(delays))
+
+
+def _hedge_counts():
+    return dict(stats.snapshot()['counters'].get('llm.hedge', {}))
+
+
+@override_settings(AI_HEDGE_BUDGET_RATE=0, AI_HEDGE_BUDGET_BURST=1, AI_HEDGE_ALTERNATE_MODEL=False)
+class HedgedCompletionTests(SimpleTestCase):
+    def setUp(self):
+        # Hedge after 20 ms regardless of observed latency
+        patcher = mock.patch.object(ModelRouter, 'hedge_delay_ms', return_value=20)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_budget_earns_and_spends(self):
+        budget = HedgeBudget(rate=0.5, burst=1)
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        budget.earn()
+        self.assertFalse(budget.try_spend())
+        budget.earn()
+        self.assertTrue(budget.try_spend())
+
+    def test_hedges_stop_when_the_budget_is_spent(self):
+        router = ModelRouter()
+        before = _hedge_counts()
+        client = _FakeClient([0.3, 0.0, 0.06])
+        router.hedged_completion(client, 'test', 'hedge-budget-model', timeout=5)
+        router.hedged_completion(client, 'test', 'hedge-budget-model', timeout=5)
+        after = _hedge_counts()
+        self.assertEqual(after.get('hedge_won', 0) - before.get('hedge_won', 0), 1)
+        self.assertEqual(after.get('over_budget', 0) - before.get('over_budget', 0), 1)
+
+    @override_settings(AI_HEDGE_BUDGET_BURST=5, AI_HEDGE_MAX_WORKERS=1)
+    def test_losing_hedge_holds_its_slot_without_blocking_callers(self):
+        router = ModelRouter()
+        before = _hedge_counts()
+        client = _FakeClient([0.06, 0.5, 0.06])
+
+        started = time.perf_counter()
+        router.hedged_completion(client, 'test', 'hedge-slot-model', timeout=5)
+        self.assertLess(time.perf_counter() - started, 0.3)
+
+        router.hedged_completion(client, 'test', 'hedge-slot-model', timeout=5)
+        after = _hedge_counts()
+        self.assertEqual(after.get('primary_won', 0) - before.get('primary_won', 0), 1)
+        self.assertEqual(after.get('no_free_slot', 0) - before.get('no_free_slot', 0), 1)
+
+    @override_settings(
+        AI_HEDGE_ENABLED=True, AI_HEDGE_ALTERNATE_MODEL=True,
+        AI_MODELS={'large': 'hedge-usage-large', 'fast': 'hedge-usage-fast'},
+    )
+    def test_usage_is_recorded_against_the_winning_model(self):
+        client = _FakeClient([0.3, 0.0])
+        with mock.patch('documents.services.ai_service.get_llm_client', return_value=client), \
+                mock.patch.object(model_router, '_hedge_budget', HedgeBudget(rate=0, burst=1)), \
+                mock.patch.object(model_router, '_hedge_slots', threading.BoundedSemaphore(1)):
+            completion, answered_by = AIService()._request_completion(LEASE, 'hedge-usage-large')
+
+        self.assertEqual((completion, answered_by), ('hedge-usage-fast', 'hedge-usage-fast'))
+        estimated = stats.snapshot()['observations']['llm.input_tokens_estimated']
+        self.assertIn('simplify:hedge-usage-fast:en', estimated)
+        self.assertNotIn('simplify:hedge-usage-large:en', estimated)
+
+    def test_hedged_calls_share_one_pool(self):
+        router = ModelRouter()
+        router.hedged_completion(_FakeClient([0.0]), 'test', 'hedge-pool-model', timeout=5)
+        with mock.patch('documents.services.model_router.ThreadPoolExecutor') as executor_class:
+            for _ in range(5):
+                router.hedged_completion(_FakeClient([0.0]), 'test', 'hedge-pool-model', timeout=5)
+        executor_class.assert_not_called()
+
+
+@override_settings(GROQ_API_KEY='test-key', LLM_POOL_MAX_CONNECTIONS=3, LLM_MAX_RETRIES=0)
+class LLMClientPoolTests(SimpleTestCase):
+    def stub_pool(self, **models):
+        pool = LLMClientPool()
+        client = mock.Mock()
+        client.models.list = mock.Mock(**models)
+        patcher = mock.patch.object(pool, '_build_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return pool, client
+
+    @skipUnless(optional_import('groq'), 'groq is not installed')
+    def test_one_groq_client_owns_the_configured_pool(self):
+        groq = optional_import('groq')
+        pool = LLMClientPool()
+        with mock.patch.object(groq, 'Groq', wraps=groq.Groq) as groq_class:
+            client = pool.get_client()
+            self.assertIs(pool.get_client(), client)
+        groq_class.assert_called_once()
+        self.assertEqual(client.max_retries, 0)
+        http_client = groq_class.call_args.kwargs['http_client']
+        self.assertIs(client._client, http_client)
+        self.assertEqual(http_client._transport._pool._max_connections, 3)
+
+    @skipUnless(optional_import('groq'), 'groq is not installed')
+    def test_prewarm_lists_models_over_the_pool(self):
+        httpx = optional_import('httpx')
+        requests = []
+
+        def handle_request(transport, request):
+            requests.append(request.url.path)
+            return httpx.Response(200, json={'object': 'list', 'data': []})
+
+        with mock.patch.object(httpx.HTTPTransport, 'handle_request', autospec=True, side_effect=handle_request):
+            self.assertEqual(LLMClientPool().prewarm(connections=2), 2)
+        self.assertEqual(requests, ['/openai/v1/models'] * 2)
+
+    def test_prewarm_counts_successes_and_failures(self):
+        before = (stats.counter('llm.pool', 'prewarm'), stats.counter('llm.pool', 'prewarm_failed'))
+        pool, client = self.stub_pool()
+        self.assertEqual(pool.prewarm(connections=3), 3)
+        self.assertEqual(client.models.list.call_count, 3)
+
+        pool, client = self.stub_pool(side_effect=ConnectionError('refused'))
+        self.assertEqual(pool.prewarm(connections=2), 0)
+        after = (stats.counter('llm.pool', 'prewarm'), stats.counter('llm.pool', 'prewarm_failed'))
+        self.assertEqual((after[0] - before[0], after[1] - before[1]), (3, 2))
+
+    def test_keepalive_pings_until_stopped(self):
+        pool, client = self.stub_pool()
+        self.assertIsNone(pool.start_keepalive(interval=0))
+
+        thread = pool.start_keepalive(interval=0.01)
+        self.assertIs(pool.start_keepalive(interval=0.01), thread)
+        deadline = time.monotonic() + 2
+        while client.models.list.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pool.stop_keepalive()
+        thread.join(timeout=1)
+        self.assertFalse(thread.is_alive())
+        self.assertGreaterEqual(client.models.list.call_count, 2)
+
+
+class TokenBudgetTests(SimpleTestCase):
+    SENTENCE = "The Tenant shall pay rent. "
+
+    def test_text_at_the_budget_is_kept_whole(self):
+        text = self.SENTENCE * 10
+        total = estimate_tokens(text)
+        self.assertEqual(trim_to_token_budget(text, total), (text, total))
+
+        trimmed, tokens = trim_to_token_budget(text, total - 1)
+        self.assertEqual(trimmed, (self.SENTENCE * 9).rstrip())
+        self.assertEqual(tokens, estimate_tokens(trimmed))
+        self.assertLessEqual(tokens, total - 1)
+
+    def test_oversized_sentence_is_cut_within_the_budget(self):
+        text = "12345 supercalifragilistic हिन्दी " * 40
+        for budget in (1, 2, 7, 13, 50, estimate_tokens(text) - 1):
+            with self.subTest(budget=budget):
+                trimmed, tokens = trim_to_token_budget(text, budget)
+                self.assertEqual(tokens, estimate_tokens(trimmed))
+                self.assertLessEqual(tokens, budget)
+                # The next character would not have fitted
+                self.assertGreater(estimate_tokens(text[:len(trimmed) + 1]), budget)
+
+    @override_settings(AI_TOKEN_BUDGETS={'simplify': {'max_input_tokens': 100000, 'max_output_tokens': 1500}})
+    def test_input_leaves_room_for_the_reserved_output(self):
+        system_prompt = "Explain the document."
+        plan = plan_request('simplify', 'unbudgeted-model', system_prompt, self.SENTENCE * 3000)
+        self.assertTrue(plan.trimmed)
+        self.assertEqual(plan.max_output_tokens, 1500)
+        used = estimate_tokens(system_prompt) + plan.input_tokens + plan.max_output_tokens
+        window = DEFAULT_MODEL_BUDGET['context_window'] - SAFETY_MARGIN_TOKENS
+        self.assertLessEqual(used, window)
+        self.assertGreater(used + estimate_tokens(self.SENTENCE), window)
+
+    def test_system_prompt_filling_the_window_leaves_one_token(self):
+        system_prompt = "word " * DEFAULT_MODEL_BUDGET['context_window']
+        plan = plan_request('simplify', 'unbudgeted-model', system_prompt, self.SENTENCE)
+        self.assertEqual(plan.input_tokens, 1)
+        self.assertTrue(plan.trimmed)
+
+    @override_settings(AI_TOKEN_BUDGETS={'translate': {'max_input_tokens': 1600, 'max_output_tokens': 500}})
+    def test_translation_output_scales_with_the_target_script(self):
+        text = self.SENTENCE * 50
+        source_tokens = estimate_tokens(text)
+        plan = plan_request('translate', 'llama-3.3-70b-versatile', 'Translate.', text, 'hi')
+        self.assertEqual(plan.max_output_tokens, math.ceil(source_tokens * TRANSLATION_TOKEN_RATIO['hi']))
+        plan = plan_request('translate', 'llama-3.3-70b-versatile', 'Translate.', self.SENTENCE, 'hi')
+        self.assertEqual(plan.max_output_tokens, 500)
+        # Never above the model's output ceiling
+        plan = plan_request('translate', 'unbudgeted-model', 'Translate.', text * 20, 'hi')
+        self.assertEqual(plan.max_output_tokens, DEFAULT_MODEL_BUDGET['max_output_tokens'])
+
+
+class RequestProfilingTests(TestCase):
+    PATH = '/api/process-document/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            PROFILING_DIR=directory.name, PROFILING_TOKEN='profile-secret',
+            PROFILING_SAMPLE_RATE=0, PROFILING_INTERVAL_MS=1,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def profile(self, path=PATH, **headers):
+        def slow_view(request):
+            time.sleep(0.02)
+            return HttpResponse('ok')
+
+        request = RequestFactory().post(path, **headers)
+        return RequestProfilingMiddleware(slow_view)(request)
+
+    def test_only_selected_requests_are_profiled(self):
+        self.assertFalse(self.profile().has_header('X-Profile-Id'))
+        self.assertFalse(self.profile(HTTP_X_PROFILE_TOKEN='wrong').has_header('X-Profile-Id'))
+        self.assertFalse(self.profile('/api/health/', HTTP_X_PROFILE_TOKEN='profile-secret').has_header('X-Profile-Id'))
+        self.assertEqual(list_profiles(), [])
+
+        profile_id = self.profile(HTTP_X_PROFILE_TOKEN='profile-secret')['X-Profile-Id']
+        entry, = list_profiles()
+        self.assertEqual(entry['id'], profile_id)
+        self.assertEqual(len(entry['files']), 2)
+
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            self.assertTrue(self.profile().has_header('X-Profile-Id'))
+
+    @override_settings(PROFILING_MAX_PROFILES=3)
+    def test_only_the_newest_profiles_are_kept(self):
+        saved = [self.profile(HTTP_X_PROFILE_TOKEN='profile-secret')['X-Profile-Id'] for _ in range(5)]
+        self.assertEqual([entry['id'] for entry in list_profiles()], saved[:1:-1])
+        self.assertEqual(len(list(Path(settings.PROFILING_DIR).iterdir())), 6)
+
+    def test_profiles_are_served_to_staff_only(self):
+        profile_id = self.profile(HTTP_X_PROFILE_TOKEN='profile-secret')['X-Profile-Id']
+        download = f'/admin/profiles/{profile_id}{COLLAPSED_SUFFIX}'
+        User = get_user_model()
+
+        for user in (None, User.objects.create_user('member', password='secret')):
+            if user:
+                self.client.force_login(user)
+            for url in ('/admin/profiles/', download):
+                with self.subTest(user=user, url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 302)
+                    self.assertIn('/admin/login/', response['Location'])
+
+        self.client.force_login(User.objects.create_user('staff', password='secret', is_staff=True))
+        self.assertContains(self.client.get('/admin/profiles/'), profile_id)
+        response = self.client.get(download)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'slow_view', b''.join(response.streaming_content))
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fsettings.py').status_code, 404)
+
+
+class AdmissionCostTests(SimpleTestCase):
+    MB = 1024 * 1024
+
+    @override_settings(EXTRACTION_SANDBOX_ENABLED=False)
+    def test_inline_extraction_charges_decoding_memory(self):
+        self.assertEqual(estimate_cost_mb(10 * self.MB, 'image'), 85)
+
+    @override_settings(EXTRACTION_SANDBOX_ENABLED=True)
+    def test_sandboxed_extraction_charges_only_the_upload(self):
+        self.assertEqual(estimate_cost_mb(10 * self.MB, 'image'), 25)
+        self.assertEqual(estimate_cost_mb(10 * self.MB, 'pdf', page_count=10), 30)
+
+
+class NormalizationTests(SimpleTestCase):
+    def test_single_page_keeps_bare_clause_numbers(self):
+        page = '\n'.join(['1', 'Rent', 'The Tenant shall pay rent.', 'Notice', 'Page 1 of 1', '2'])
+        self.assertEqual(
+            remove_running_lines([page]),
+            ['\n'.join(['1', 'Rent', 'The Tenant shall pay rent.', 'Notice', '2'])],
+        )
+
+    def test_bare_page_numbers_are_removed_across_pages(self):
+        bodies = ['Rent is due monthly.\nDeposit is held.\nRepairs are shared.',
+                  'Notice is written.\nPets need consent.\nKeys are returned.']
+        pages = [f'{body}\n{number}' for number, body in enumerate(bodies, 1)]
+        self.assertEqual(remove_running_lines(pages), bodies)
+
+
+class GlossaryMatcherTests(SimpleTestCase):
+    def test_overlapping_spellings_are_all_found(self):
+        matcher = TermMatcher([('he', 'he'), ('she', 'she'), ('hers', 'hers'), ('his', 'his')])
+        self.assertEqual(
+            sorted(term_id for _, _, term_id in matcher.scan('ushers he his she hers')),
+            ['he', 'hers', 'his', 'she'],
+        )
+
+    def test_nested_terms_match_at_word_boundaries(self):
+        matcher = TermMatcher([('jurisdiction', 'jurisdiction'), ('exclusive jurisdiction', 'exclusive')])
+        self.assertEqual(
+            list(matcher.scan('Exclusive\n  Jurisdiction.')),
+            [(0, 22, 'exclusive'), (10, 22, 'jurisdiction')],
+        )
+
+    def test_terms_inside_words_are_ignored(self):
+        matcher = TermMatcher([('lien', 'lien'), ('liens', 'lien')])
+        self.assertEqual(list(matcher.scan('The client is an alien; clients')), [])
+        self.assertEqual([term_id for _, _, term_id in matcher.scan('Liens, lien')], ['lien', 'lien'])
+
+    def test_glossary_section_round_trips(self):
+        term_ids = find_terms("The Tenant shall indemnify the Landlord. No sublet. Indemnity survives.")
+        self.assertEqual(term_ids, ['indemnification', 'sublease'])
+
+        text = "# Summary\n\n## 📄 Main Points\n- Pay rent"
+        with_section = add_glossary_section(text, term_ids, 'es')
+        self.assertEqual(add_glossary_section(with_section, term_ids, 'es'), with_section)
+        self.assertEqual(split_glossary_section(with_section), (text, term_ids))
+
+
+class TranslationBatchSplitTests(SimpleTestCase):
+    def test_segments_round_trip(self):
+        output = 'Here you go:\n' + join_segments(['Uno', 'Dos', 'Tres'])
+        self.assertEqual(split_segments(output, 3), ['Uno', 'Dos', 'Tres'])
+
+    def test_lost_marker_drops_the_segment_that_swallowed_it(self):
+        output = '<<<1>>>\nUno\nDos\n<<<3>>>\nTres'
+        self.assertEqual(split_segments(output, 3), [None, None, 'Tres'])
+
+    def test_repeated_markers_are_not_trusted(self):
+        output = '<<<1>>>\nUno\n<<<2>>>\nDos\n<<<2>>>\nOtra vez\n<<<3>>>\nTres'
+        self.assertEqual(split_segments(output, 3), ['Uno', None, 'Tres'])
+
+
+@override_settings(TRANSLATION_BATCH_ENABLED=True, TRANSLATION_BATCH_WINDOW_MS=100, AI_TRANSLATE_TIMEOUT=1)
+class TranslationBatcherTests(SimpleTestCase):
+    def translate_together(self, batcher, texts):
+        results = [None] * len(texts)
+
+        def translate(position):
+            results[position] = batcher.translate(texts[position], 'es', 'batch-test-model')
+
+        threads = [threading.Thread(target=translate, args=(position,)) for position in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_segments_share_one_call(self):
+        calls = []
+
+        def send_batch(target_language, model, texts):
+            calls.append(list(texts))
+            return [text.upper() for text in texts]
+
+        results = self.translate_together(TranslationBatcher(send_batch), ['uno', 'dos', 'tres'])
+        self.assertEqual(results, ['UNO', 'DOS', 'TRES'])
+        self.assertEqual(len(calls), 1)
+        self.assertCountEqual(calls[0], ['uno', 'dos', 'tres'])
+
+    def test_lone_segment_translates_on_its_own(self):
+        send_batch = mock.Mock()
+        self.assertIsNone(TranslationBatcher(send_batch).translate('uno', 'es', 'batch-test-model'))
+        send_batch.assert_not_called()
+
+    def test_failed_batch_falls_back_for_every_segment(self):
+        before = stats.counter('translation.batch', 'failed')
+        send_batch = mock.Mock(side_effect=RuntimeError('upstream error'))
+        results = self.translate_together(TranslationBatcher(send_batch), ['uno', 'dos'])
+        self.assertEqual(results, [None, None])
+        self.assertEqual(stats.counter('translation.batch', 'failed') - before, 1)
+
+
+class OriginalTextViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def process(self, **data):
+        upload = SimpleUploadedFile('lease.pdf', b'%PDF-1.4 lease', content_type='application/pdf')
+        with mock.patch('documents.views.extract_document_text', return_value=LEASE), \
+                mock.patch('documents.views.simplify_and_translate', return_value=('Simplified', None)):
+            return self.client.post('/api/process-document/', {'file': upload, **data})
+
+    def test_original_text_can_be_left_out_and_fetched_from_any_worker(self):
+        results = self.process(include_original_text='false').json()['results']
+        self.assertNotIn('original_text', results)
+        self.assertEqual(results['original_text_length'], len(LEASE))
+
+        # Another worker's cache does not hold the text
+        cache.clear()
+        page = self.client.get(results['original_text_url']).json()
+        self.assertEqual(page['text'], LEASE)
+        self.assertIsNone(page['next'])
+
+    def test_original_text_is_inline_by_default(self):
+        self.assertEqual(self.process().json()['results']['original_text'], LEASE)
+
+    def test_pages_chain_through_next(self):
+        text_id = store_original_text(LEASE)
+        url, pages = f'/api/original-text/{text_id}/?limit=100', []
+        while url:
+            page = self.client.get(url).json()
+            self.assertEqual(page['total_length'], len(LEASE))
+            pages.append(page['text'])
+            url = page['next']
+        self.assertEqual(len(pages), -(-len(LEASE) // 100))
+        self.assertEqual(''.join(pages), LEASE)
+
+    def test_bad_page_parameters_and_unknown_ids(self):
+        text_id = store_original_text(LEASE)
+        self.assertEqual(self.client.get(f'/api/original-text/{text_id}/?limit=0').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/original-text/{text_id}/?offset=-1').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/original-text/{"0" * 64}/').status_code, 404)
+
+    def test_encoding_follows_accept_encoding(self):
+        url = f'/api/original-text/{store_original_text(LEASE)}/'
+        brotli = optional_import('brotli')
+        cases = [('gzip', 'gzip'), ('br;q=0.5, gzip', 'gzip'), ('identity', None), ('', None)]
+        if brotli is not None:
+            cases += [('gzip, br', 'br'), ('br', 'br')]
+
+        for accept_encoding, expected in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                body = response.content
+                if expected == 'gzip':
+                    body = gzip.decompress(body)
+                elif expected == 'br':
+                    body = brotli.decompress(body)
+                self.assertEqual(json.loads(body)['text'], LEASE)
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assert_revalidates(self, url):
+        for accept_encoding in ('gzip', ''):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.status_code, 200)
+                not_modified = self.client.get(
+                    url, HTTP_ACCEPT_ENCODING=accept_encoding, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b'')
+                self.assertIn('Accept-Encoding', not_modified['Vary'])
+
+    def test_languages_answer_304(self):
+        self.assert_revalidates('/api/languages/')
+
+    def test_stored_translation_answers_304(self):
+        content_id = content_hash(LEASE)
+        save_result(content_id, LEASE_SUMMARY)
+        save_translation(content_id, 'es', 'Resumen del contrato de arrendamiento. ' * 10)
+        with mock.patch('documents.services.results.translate_text') as translate:
+            self.assert_revalidates(f'/api/results/{content_id}/translations/es/')
+        translate.assert_not_called()
+
+    def test_health_has_no_etag(self):
+        self.assertFalse(self.client.get('/api/health/').has_header('ETag'))
+
+
+LATIN_SAMPLES = {
+    'en': 'The employee will work forty hours per week and is entitled to twenty days of paid holiday each year. Either side may end the employment by giving one month of notice.',
+    'es': 'El trabajador prestará sus servicios cuarenta horas por semana y tendrá derecho a veinte días de vacaciones pagadas cada año. Cualquiera de las partes puede terminar la relación laboral con un mes de preaviso.',
+    'fr': "Le salarié travaillera quarante heures par semaine et aura droit à vingt jours de congés payés chaque année. Chacune des parties peut mettre fin au contrat de travail moyennant un préavis d'un mois.",
+    'de': 'Der Arbeitnehmer arbeitet vierzig Stunden pro Woche und hat jedes Jahr Anspruch auf zwanzig Tage bezahlten Urlaub. Jede Seite kann das Arbeitsverhältnis mit einer Frist von einem Monat beenden.',
+    'pt': 'O empregado trabalhará quarenta horas por semana e terá direito a vinte dias de férias remuneradas por ano. Qualquer das partes pode pôr fim ao contrato de trabalho mediante aviso prévio de um mês.',
+    'it': 'Il dipendente lavorerà quaranta ore alla settimana e avrà diritto a venti giorni di ferie retribuite ogni anno. Ciascuna delle parti può recedere dal rapporto di lavoro con un preavviso di un mese.',
+    'vi': 'Người lao động sẽ làm việc bốn mươi giờ mỗi tuần và được hưởng hai mươi ngày nghỉ phép có lương mỗi năm. Mỗi bên có thể chấm dứt hợp đồng lao động bằng cách báo trước một tháng.',
+    'nl': 'De werknemer werkt veertig uur per week en heeft elk jaar recht op twintig dagen betaald verlof. Elke partij kan het dienstverband beëindigen met inachtneming van een opzegtermijn van een maand.',
+    'pl': 'Pracownik będzie pracował czterdzieści godzin tygodniowo i ma prawo do dwudziestu dni płatnego urlopu w każdym roku. Każda ze stron może rozwiązać stosunek pracy z zachowaniem miesięcznego okresu wypowiedzenia.',
+    'sv': 'Den anställde arbetar fyrtio timmar i veckan och har rätt till tjugo dagars betald semester varje år. Vardera parten kan säga upp anställningen med en månads uppsägningstid.',
+    'da': 'Medarbejderen arbejder fyrre timer om ugen og har ret til tyve dages betalt ferie hvert år. Hver af parterne kan opsige ansættelsen med en måneds varsel.',
+    'no': 'Arbeidstakeren jobber førti timer i uken og har rett til tjue dagers betalt ferie hvert år. Hver av partene kan si opp ansettelsen med en måneds varsel.',
+    'fi': 'Työntekijä tekee töitä neljäkymmentä tuntia viikossa, ja hänellä on oikeus kahdenkymmenen päivän palkalliseen lomaan joka vuosi. Kumpikin osapuoli voi irtisanoa työsuhteen kuukauden irtisanomisajalla.',
+}
+
+
+class LanguageIdTests(SimpleTestCase):
+    def test_every_latin_script_language_is_identified(self):
+        latin = {code for code in LANGUAGE_NAMES if code not in _SCRIPTS}
+        self.assertEqual(set(LATIN_SAMPLES), latin)
+        for language, text in LATIN_SAMPLES.items():
+            with self.subTest(language=language):
+                self.assertEqual(detect_language(text), language)
+
+    def test_scandinavian_languages_are_told_apart(self):
+        for language in ('sv', 'da', 'no'):
+            identified, margin = identify_language(LATIN_SAMPLES[language])
+            self.assertEqual(identified, language)
+            self.assertGreater(margin, MIN_MARGIN)
+
+    def test_too_short_text_is_unsure(self):
+        self.assertIsNone(detect_language('Rent: 1200 USD'))
+
+    def test_translation_is_skipped_only_for_text_already_in_the_target(self):
+        cache.clear()
+        with mock.patch('documents.services.translation_service.get_llm_client', return_value=None):
+            self.assertEqual(translate_text(LATIN_SAMPLES['sv'], 'sv'), LATIN_SAMPLES['sv'])
+            self.assertNotEqual(translate_text(LATIN_SAMPLES['sv'], 'no'), LATIN_SAMPLES['sv'])
+            self.assertNotEqual(translate_text(LATIN_SAMPLES['no'], 'da'), LATIN_SAMPLES['no'])
+
+
+class LazyImportTests(SimpleTestCase):
+    def setUp(self):
+        optional_import.cache_clear()
+        self.addCleanup(optional_import.cache_clear)
+
+    def without(self, *module_names):
+        """Make the modules fail to import, as if not installed."""
+        optional_import.cache_clear()
+        return mock.patch.dict(sys.modules, {module_name: None for module_name in module_names})
+
+    def test_preload_covers_every_pdf_backend(self):
+        self.assertEqual(
+            list(FORMAT_MODULES['pdf']), [module_name for module_name, _ in PDF_BACKENDS.values()]
+        )
+
+    def test_missing_module_is_none_and_reported_once(self):
+        with self.without('docx'), self.assertLogs('documents.services.lazy_imports', 'WARNING') as logs:
+            self.assertIsNone(optional_import('docx'))
+            self.assertIsNone(optional_import('docx'))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('docx', logs.output[0])
+
+    def test_missing_backends_degrade_cleanly(self):
+        with self.without('docx'):
+            with self.assertRaisesMessage(Exception, 'python-docx package is not installed'):
+                extract_text_from_docx(b'PK')
+
+        with self.without('numpy'):
+            summary = summarize(LEASE)
+        self.assertTrue(is_extractive_summary(summary))
+
+        self.assertIn('pypdf2', installed_backends())
+        with self.without('PyPDF2'):
+            self.assertNotIn('pypdf2', installed_backends())
+
+        with self.without('brotli'):
+            request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br, gzip')
+            response = CompressionMiddleware(lambda request: None).process_response(
+                request, HttpResponse(LEASE)
+            )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_preload_imports_the_requested_formats(self):
+        def fake_import(module_name):
+            return None if module_name == 'pytesseract' else mock.sentinel.module
+
+        with mock.patch('documents.services.lazy_imports.optional_import', side_effect=fake_import) as imported:
+            loaded = preload(['docx', 'image'])
+        self.assertEqual(loaded, {'docx': True, 'PIL.Image': True, 'pytesseract': False})
+        self.assertEqual([call.args[0] for call in imported.call_args_list], ['docx', 'PIL.Image', 'pytesseract'])
+
+        with mock.patch('documents.services.lazy_imports.optional_import', side_effect=fake_import):
+            self.assertEqual(list(preload()), format_modules(FORMAT_MODULES))
+
+    def test_wsgi_preloads_only_when_configured(self):
+        import legalease.wsgi
+
+        for enabled in (False, True):
+            with self.subTest(enabled=enabled), override_settings(PRELOAD_HEAVY_MODULES=enabled), \
+                    mock.patch.dict(os.environ, {'LEGALEASE_DEFER_STARTUP_HOOKS': '1'}), \
+                    mock.patch('documents.services.lazy_imports.preload') as preload_modules:
+                importlib.reload(legalease.wsgi)
+                self.assertEqual(preload_modules.called, enabled)
@@ -7,6 +7,16 @@ from . import views
 
 urlpatterns = [
     path('health/', views.health_check, name='health_check'),
+    path('stats/', views.stats_view, name='stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('process-document/', views.process_document, name='process_document'),
+    path('preview-document/', views.preview_document, name='preview_document'),
+    path('original-text/<slug:text_id>/', views.get_original_text_view, name='original_text'),
+    path('results/<slug:result_id>/', views.get_result_view, name='result'),
+    path(
+        'results/<slug:result_id>/translations/<str:language>/',
+        views.get_result_translation_view,
+        name='result_translation'
+    ),
     path('languages/', views.get_supported_languages_view, name='supported_languages'),
 ]
\ No newline at end of file
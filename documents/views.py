@@ -3,7 +3,9 @@ Ultra-optimized stateless document processing views.
 All processing happens in memory with aggressive caching.
 """
 
+import json
 import logging
+from datetime import timedelta
 from functools import lru_cache
 from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes
@@ -11,13 +13,48 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from django.http import JsonResponse
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import etag
 from django.views.decorators.vary import vary_on_headers
+from django.conf import settings
 from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
 
-from .serializers import ProcessDocumentSerializer
-from .services.text_extractor import extract_text_from_file, determine_file_type
-from .services.ai_service import simplify_legal_text
-from .services.translation_service import translate_text, get_supported_languages
+from .serializers import (
+    ProcessDocumentSerializer,
+    OriginalTextPageSerializer,
+    MetricsQuerySerializer,
+)
+from .services.text_extractor import determine_file_type
+from .services.extraction_sandbox import ExtractionLimitError
+from .services.pipeline import (
+    extract_document_text,
+    simplify_and_translate,
+)
+from .services.translation_service import get_supported_languages, LANGUAGE_NAMES
+from .services.ai_service import is_fallback_response
+from .services.results import (
+    save_result,
+    save_translation,
+    get_simplified_text,
+    get_stored_translation,
+    get_translation,
+    store_original_text,
+    get_original_text,
+)
+from .services.hashing import content_hash
+from .services.stats import stats
+from .services.metrics_rollup import summarize_rollup
+from .services.extractive_summary import summarize
+from .services.language_id import detect_language_cached
+from .services.glossary import (
+    find_terms,
+    add_glossary_section,
+    split_glossary_section,
+    glossary_entries,
+)
+from .services.admission import admission_controller, estimate_cost_mb, count_pdf_pages
+from .models import MetricsRollup, ResultTranslation
 
 logger = logging.getLogger(__name__)
 
@@ -37,16 +74,137 @@ def get_cached_languages():
             'hi': 'Hindi'
         }
 
-@cache_page(60 * 15)  # Cache for 15 minutes
-def health_check(request):
-    """Cached API health check endpoint."""
-    return JsonResponse({
-        'status': 'healthy',
+@lru_cache(maxsize=1)
+def get_languages_etag():
+    """Strong ETag for the supported languages list (content hash)."""
+    return content_hash(json.dumps(get_cached_languages(), sort_keys=True))
+
+def _get_health_payload():
+    admission = admission_controller.state()
+    return {
+        'status': 'healthy' if admission['state'] == 'accepting' else 'overloaded',
         'message': 'LegalEase API is operational',
         'version': '1.0.0',
-        'timestamp': cache.get('health_timestamp', 'unknown')
+        'timestamp': cache.get('health_timestamp', 'unknown'),
+        'admission': admission,
+    }
+
+def _languages_etag(request):
+    return get_languages_etag()
+
+def _original_text_etag(request, text_id):
+    # Stored text never changes for an id, so id + page parameters identify the body
+    if get_original_text(text_id) is None:
+        return None
+    return content_hash(f"{text_id}?{request.META.get('QUERY_STRING', '')}")
+
+def _translation_etag(request, result_id, language):
+    # Only stored translations have a stable body; the first request has to run
+    translated_text = get_stored_translation(result_id, language)
+    if translated_text is None:
+        return None
+    return content_hash(translated_text)
+
+def health_check(request):
+    """API health check with the worker's current admission state (no ETag: it changes per poll)."""
+    return JsonResponse(_get_health_payload())
+
+@api_view(['GET'])
+def stats_view(request):
+    """Per-worker performance counters (token use, latencies). No user data."""
+    return Response({
+        'success': True,
+        'stats': stats.snapshot()
     })
 
+@api_view(['GET'])
+def metrics_view(request):
+    """Request metrics dashboard data, served from the rollup tables."""
+    serializer = MetricsQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid request', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    params = serializer.validated_data
+    rollups = MetricsRollup.objects.filter(
+        resolution=params['resolution'],
+        bucket_start__gte=timezone.now() - timedelta(hours=params['hours'])
+    ).order_by('bucket_start')
+    if params.get('endpoint'):
+        rollups = rollups.filter(endpoint=params['endpoint'])
+    
+    return Response({
+        'success': True,
+        'resolution': params['resolution'],
+        'buckets': [summarize_rollup(rollup) for rollup in rollups]
+    })
+
+def _check_upload(uploaded_file):
+    """
+    Validate an uploaded file's type and size.
+
+    Returns:
+        tuple: (file_type, error Response or None)
+    """
+    # Quick file type validation
+    file_type = determine_file_type(uploaded_file.name, uploaded_file.content_type)
+    if file_type == 'unknown':
+        return file_type, Response(
+            {'error': 'Unsupported file type. Please upload PDF, DOCX, or image files.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Process file in memory with size limit
+    if uploaded_file.size > 10 * 1024 * 1024:  # 10MB limit
+        return file_type, Response(
+            {'error': 'File too large. Maximum size is 10MB.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return file_type, None
+
+def _refine_admission(request, file_content, file_type):
+    """Re-size the admission reservation now that type and pages are known (503 on rejection)."""
+    ticket = getattr(request, 'admission_ticket', None)
+    if not ticket:
+        return None
+    
+    page_count = count_pdf_pages(file_content) if file_type == 'pdf' else 0
+    rejection = admission_controller.resize(
+        ticket, estimate_cost_mb(len(file_content), file_type, page_count)
+    )
+    if not rejection:
+        return None
+    return Response(
+        {'error': 'Server is busy. Please retry shortly.',
+         'reason': rejection.reason,
+         'retry_after': rejection.retry_after},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(rejection.retry_after)}
+    )
+
+def _extract_or_error(file_content, file_type):
+    """
+    Returns:
+        tuple: (extracted text, error Response or None)
+    """
+    # Extract text in a time- and memory-limited sandbox
+    try:
+        extracted_text = extract_document_text(file_content, file_type)
+    except ExtractionLimitError as e:
+        return None, Response(
+            {'error': str(e), 'reason': e.reason},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if not extracted_text:
+        return None, Response(
+            {'error': 'Could not extract meaningful text from the document.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return extracted_text, None
+
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 def process_document(request):
@@ -64,50 +222,36 @@ def process_document(request):
         
         uploaded_file = serializer.validated_data['file']
         target_language = serializer.validated_data.get('target_language', 'en')
+        include_original_text = serializer.validated_data.get('include_original_text', True)
         
-        # Quick file type validation
-        file_type = determine_file_type(uploaded_file.name, uploaded_file.content_type)
-        if file_type == 'unknown':
-            return Response(
-                {'error': 'Unsupported file type. Please upload PDF, DOCX, or image files.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Process file in memory with size limit
-        if uploaded_file.size > 10 * 1024 * 1024:  # 10MB limit
-            return Response(
-                {'error': 'File too large. Maximum size is 10MB.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        file_type, error_response = _check_upload(uploaded_file)
+        if error_response:
+            return error_response
         
         file_content = uploaded_file.read()
         
-        # Extract text with timeout protection
-        extracted_text = extract_text_from_file(file_content, file_type)
-        if not extracted_text or len(extracted_text.strip()) < 10:
-            return Response(
-                {'error': 'Could not extract meaningful text from the document.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        error_response = _refine_admission(request, file_content, file_type)
+        if error_response:
+            return error_response
+        
+        extracted_text, error_response = _extract_or_error(file_content, file_type)
+        if error_response:
+            return error_response
+        
+        # Simplify and translate (both cached by content hash)
+        simplified_text, translated_text = simplify_and_translate(
+            extracted_text, target_language
+        )
+        
+        # Extracted text is always fetchable separately by content hash
+        original_text_id = store_original_text(extracted_text)
         
-        # Limit text size for processing
-        if len(extracted_text) > 50000:  # 50k chars limit
-            extracted_text = extracted_text[:50000] + "\n\n[Text truncated for processing]"
-        
-        # Simplify legal text
-        simplified_text = simplify_legal_text(extracted_text)
-        
-        # Translate if requested (with caching)
-        translated_text = None
-        if target_language != 'en':
-            cache_key = f"translation_{hash(simplified_text)}_{target_language}"
-            translated_text = cache.get(cache_key)
-            
-            if not translated_text:
-                translated_text = translate_text(simplified_text, target_language)
-                if translated_text:
-                    # Cache translation for 1 hour
-                    cache.set(cache_key, translated_text, 3600)
+        # Persist real results so other languages can be requested later
+        result_id = None
+        if not is_fallback_response(extracted_text, simplified_text):
+            result_id = save_result(original_text_id, simplified_text).content_id
+            if translated_text:
+                save_translation(result_id, target_language, translated_text)
         
         # Prepare optimized response
         response_data = {
@@ -118,11 +262,29 @@ def process_document(request):
                 'size_mb': round(uploaded_file.size / (1024 * 1024), 2)
             },
             'results': {
-                'original_text': extracted_text,
                 'simplified_text': simplified_text,
+                'original_text_id': original_text_id,
+                'original_text_url': request.build_absolute_uri(
+                    reverse('original_text', args=[original_text_id])
+                ),
+                'original_text_length': len(extracted_text),
+                'source_language': detect_language_cached(extracted_text),
+                # Glossary terms explained in the section, in the target language
+                'glossary': glossary_entries(
+                    split_glossary_section(simplified_text)[1], target_language
+                ),
             }
         }
         
+        if result_id:
+            response_data['results']['result_id'] = result_id
+            response_data['results']['result_url'] = request.build_absolute_uri(
+                reverse('result', args=[result_id])
+            )
+        
+        if include_original_text:
+            response_data['results']['original_text'] = extracted_text
+        
         if translated_text:
             response_data['results']['translated_text'] = translated_text
             response_data['target_language'] = target_language
@@ -136,6 +298,97 @@ def process_document(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def preview_document(request):
+    """
+    Instant local summary (no LLM) to show while process-document runs.
+    Extraction is cached by content hash, so the full request reuses it.
+    """
+    try:
+        serializer = ProcessDocumentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Invalid request', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        uploaded_file = serializer.validated_data['file']
+        file_type, error_response = _check_upload(uploaded_file)
+        if error_response:
+            return error_response
+        
+        file_content = uploaded_file.read()
+        
+        error_response = _refine_admission(request, file_content, file_type)
+        if error_response:
+            return error_response
+        
+        extracted_text, error_response = _extract_or_error(file_content, file_type)
+        if error_response:
+            return error_response
+        
+        preview_text = summarize(extracted_text)
+        if settings.GLOSSARY_ENABLED:
+            preview_text = add_glossary_section(preview_text, find_terms(extracted_text))
+        
+        return Response({
+            'success': True,
+            'results': {
+                'preview_text': preview_text,
+                'original_text_id': store_original_text(extracted_text),
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Preview error: {str(e)}")
+        return Response(
+            {'error': f'Preview failed: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@etag(_original_text_etag)
+@api_view(['GET'])
+def get_original_text_view(request, text_id):
+    """
+    Paginated extracted text, keyed by content hash.
+    Lets clients that only show the summary skip original_text in the main response.
+    """
+    serializer = OriginalTextPageSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid request', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    text = get_original_text(text_id)
+    if text is None:
+        return Response(
+            {'error': 'Original text not found or expired. Please process the document again.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    offset = serializer.validated_data['offset']
+    limit = serializer.validated_data['limit']
+    end = min(offset + limit, len(text))
+    
+    next_url = None
+    if end < len(text):
+        next_url = request.build_absolute_uri(
+            f"{reverse('original_text', args=[text_id])}?offset={end}&limit={limit}"
+        )
+    
+    return Response({
+        'success': True,
+        'id': text_id,
+        'offset': offset,
+        'limit': limit,
+        'total_length': len(text),
+        'text': text[offset:end],
+        'next': next_url,
+    })
+
+@etag(_languages_etag)
 @api_view(['GET'])
 @cache_page(60 * 60)  # Cache for 1 hour
 @vary_on_headers('Accept-Language')
@@ -153,4 +406,67 @@ def get_supported_languages_view(request):
         return Response(
             {'error': 'Failed to get supported languages'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+def get_result_view(request, result_id):
+    """Stored simplification and the languages it has been translated into."""
+    simplified_text = get_simplified_text(result_id)
+    if simplified_text is None:
+        return Response(
+            {'error': 'Result not found. Please process the document again.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    languages = ResultTranslation.objects.filter(
+        result__content_id=result_id
+    ).values_list('language', flat=True)
+    return Response({
+        'success': True,
+        'id': result_id,
+        'simplified_text': simplified_text,
+        'translations': {
+            language: request.build_absolute_uri(
+                reverse('result_translation', args=[result_id, language])
+            )
+            for language in languages
+        },
+    })
+
+@etag(_translation_etag)
+@api_view(['GET'])
+def get_result_translation_view(request, result_id, language):
+    """
+    Translation of a stored result. Translated on first request only,
+    so languages nobody asks for never cost an LLM call.
+    """
+    if language not in LANGUAGE_NAMES:
+        return Response(
+            {'error': f'Unsupported language: {language}',
+             'supported_languages': sorted(LANGUAGE_NAMES)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        translated_text, created = get_translation(result_id, language)
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        return Response(
+            {'error': f'Translation failed: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    if translated_text is None:
+        return Response(
+            {'error': 'Result not found. Please process the document again.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'success': True,
+        'id': result_id,
+        'language': language,
+        'language_name': LANGUAGE_NAMES[language],
+        'translated_text': translated_text,
+        'cached': not created,
+    })
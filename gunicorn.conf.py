@@ -0,0 +1,128 @@
+"""
+Gunicorn configuration for the LegalEase API.
+
+Loaded automatically by ``gunicorn`` from the project root. Every value can
+be overridden through environment variables, so Render and local runs share
+one file:
+
+    gunicorn -c gunicorn.conf.py
+"""
+
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() == 'true'
+
+
+# Worker classes: threads suit the I/O-bound LLM waits; gevent and uvicorn
+# need their packages installed (uvicorn serves the ASGI application). Under
+# gevent every request runs on the hub thread, so the request profiler's
+# per-thread stack samples do not isolate one request.
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'gevent': 'gevent',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+worker_type = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_type not in WORKER_CLASSES:
+    raise RuntimeError(
+        f"Unknown GUNICORN_WORKER_CLASS '{worker_type}'. "
+        f"Choose one of: {', '.join(WORKER_CLASSES)}"
+    )
+worker_class = WORKER_CLASSES[worker_type]
+
+if worker_type == 'uvicorn':
+    wsgi_app = 'legalease.asgi:application'
+else:
+    wsgi_app = 'legalease.wsgi:application'
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Worker count: 2 * CPUs + 1, capped so per-worker memory (uploads plus
+# extracted text) stays within the instance limit.
+workers = _env_int(
+    'WEB_CONCURRENCY',
+    min(multiprocessing.cpu_count() * 2 + 1, _env_int('GUNICORN_MAX_WORKERS', '4')),
+)
+threads = _env_int('GUNICORN_THREADS', '4') if worker_type == 'gthread' else 1
+worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', '100')
+
+# Load the application once in the master and fork workers from it
+preload_app = _env_bool('GUNICORN_PRELOAD', 'True')
+if preload_app:
+    # The WSGI module runs in the master; per-process startup hooks move to post_fork
+    os.environ['LEGALEASE_DEFER_STARTUP_HOOKS'] = '1'
+    # Import the heavy document/LLM libraries before forking so workers share them
+    os.environ.setdefault('PRELOAD_HEAVY_MODULES', 'True')
+
+# Recycle workers to bound leaks from PIL/PyPDF2. Jitter keeps workers from
+# restarting at the same moment.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', '500')
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', '50')
+max_worker_memory_mb = _env_int('GUNICORN_MAX_WORKER_MEMORY_MB', '400')
+
+# The worker timeout covers every stage one upload can run back to back:
+# extraction, the fast first pass and the large-model call it escalates to,
+# a batched translation and the single call it falls back to. The Groq
+# client retries each LLM call (timeouts included) LLM_MAX_RETRIES times.
+extraction_timeout = _env_int('EXTRACTION_TIMEOUT', '20')
+ai_simplify_timeout = _env_int('AI_SIMPLIFY_TIMEOUT', '30')
+ai_translate_timeout = _env_int('AI_TRANSLATE_TIMEOUT', '25')
+llm_attempts = 1 + _env_int('LLM_MAX_RETRIES', '2')
+simplify_calls = 2 if _env_bool('AI_FAST_FIRST_PASS', 'False') else 1
+translate_calls = 2 if _env_bool('TRANSLATION_BATCH_ENABLED', 'True') else 1
+timeout = (
+    extraction_timeout
+    + llm_attempts * (simplify_calls * ai_simplify_timeout + translate_calls * ai_translate_timeout)
+    + _env_int('GUNICORN_TIMEOUT_MARGIN', '30')
+)
+graceful_timeout = timeout
+keepalive = _env_int('GUNICORN_KEEPALIVE', '5')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _current_rss_mb():
+    """Resident set size of the current process in MB (0 if unknown)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from documents.services.cache_warmup import start_background_warmup
+        from documents.services.llm_client import start_llm_client_pool
+
+        start_background_warmup()
+        # Connections must be opened after the fork, never shared with the master
+        start_llm_client_pool()
+
+
+def post_request(worker, req, environ, resp):
+    if not max_worker_memory_mb:
+        return
+
+    rss_mb = _current_rss_mb()
+    if rss_mb > max_worker_memory_mb:
+        logger.warning(
+            f"Worker {worker.pid} RSS {rss_mb:.0f} MB exceeds "
+            f"{max_worker_memory_mb} MB; recycling after this request"
+        )
+        worker.alive = False
@@ -0,0 +1,33 @@
+"""
+ASGI config for legalease project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Used when gunicorn runs with the uvicorn worker class.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legalease.settings')
+
+application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_HEAVY_MODULES:
+    from documents.services.lazy_imports import preload  # noqa: E402
+
+    preload()
+
+# Warm the per-process cache with common templates (no-op unless enabled)
+# and open the LLM connection pool
+if not os.environ.get('LEGALEASE_DEFER_STARTUP_HOOKS'):
+    from documents.services.cache_warmup import start_background_warmup  # noqa: E402
+    from documents.services.llm_client import start_llm_client_pool  # noqa: E402
+
+    start_background_warmup()
+    start_llm_client_pool()
@@ -42,6 +42,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'documents.middleware.RequestMetricsMiddleware',
+    'documents.middleware.AdmissionControlMiddleware',
+    'documents.middleware.CompressionMiddleware',
+    'documents.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,6 +87,77 @@ DATABASES = {
     }
 }
 
+# WAL journaling lets metric writes proceed without blocking readers
+SQLITE_WAL_MODE = True
+
+# Request metrics: raw rows are rolled up by `manage.py rollup_metrics`
+RECORD_REQUEST_METRICS = os.getenv('RECORD_REQUEST_METRICS', 'True').lower() == 'true'
+METRICS_RETENTION = {
+    'raw_hours': int(os.getenv('METRICS_RAW_RETENTION_HOURS', '24')),
+    'minute_days': int(os.getenv('METRICS_MINUTE_RETENTION_DAYS', '7')),
+    'hour_days': int(os.getenv('METRICS_HOUR_RETENTION_DAYS', '365')),
+}
+# Rows are buffered per worker and bulk-inserted by size or interval (seconds)
+METRICS_FLUSH_SIZE = int(os.getenv('METRICS_FLUSH_SIZE', '100'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# URL names not recorded (load-balancer health polls would swamp the table)
+METRICS_EXCLUDED_ENDPOINTS = [
+    name.strip() for name in os.getenv('METRICS_EXCLUDED_ENDPOINTS', 'health_check').split(',')
+    if name.strip()
+]
+
+# Stored simplifications and translations summarize uploaded documents;
+# `manage.py purge_results` deletes them this many days after creation
+RESULT_RETENTION_DAYS = int(os.getenv('RESULT_RETENTION_DAYS', '30'))
+
+# On-demand request profiling (stack sampling, saved under PROFILING_DIR)
+PROFILING_PATHS = ['/api/process-document/']
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')  # enables the X-Profile-Token header
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', '50'))
+
+# Admission control (per worker process): document uploads beyond these
+# limits are rejected with 503 and Retry-After instead of queueing.
+# Keep ADMISSION_MAX_RSS_MB under GUNICORN_MAX_WORKER_MEMORY_MB.
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'True').lower() == 'true'
+ADMISSION_CONTROL_PATHS = ['/api/process-document/', '/api/preview-document/']
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', os.getenv('GUNICORN_THREADS', '4')))
+ADMISSION_MAX_COST_MB = int(os.getenv('ADMISSION_MAX_COST_MB', '150'))
+ADMISSION_MAX_RSS_MB = int(os.getenv('ADMISSION_MAX_RSS_MB', '350'))
+ADMISSION_MAX_RETRY_AFTER = 60
+
+# Sandboxed extraction: PDF/DOCX/OCR parsing runs in child processes with
+# CPU-time and address-space rlimits and a wall-clock timeout. Children are
+# replaced after a limit violation and recycled after a number of jobs.
+EXTRACTION_SANDBOX_ENABLED = os.getenv('EXTRACTION_SANDBOX_ENABLED', 'True').lower() == 'true'
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '2'))
+EXTRACTION_TIMEOUT = int(os.getenv('EXTRACTION_TIMEOUT', '20'))
+EXTRACTION_CPU_SECONDS = int(os.getenv('EXTRACTION_CPU_SECONDS', '15'))
+EXTRACTION_MEMORY_MB = int(os.getenv('EXTRACTION_MEMORY_MB', '768'))
+EXTRACTION_MAX_JOBS_PER_WORKER = int(os.getenv('EXTRACTION_MAX_JOBS_PER_WORKER', '50'))
+# forkserver avoids forking the threaded web worker itself
+EXTRACTION_START_METHOD = os.getenv('EXTRACTION_START_METHOD', 'forkserver')
+# PDF backends: 'auto' picks per document class from the preference lists
+# below (first installed wins; broken-looking output moves on to the next).
+# Set PDF_BACKEND to pypdfium2, pypdf, pypdf2 or pdfminer to try it first.
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+PDF_BACKEND_PREFERENCES = {
+    document_class: os.getenv(f'PDF_BACKENDS_{document_class.upper()}', default).split(',')
+    for document_class, default in (
+        ('standard', 'pypdfium2,pypdf,pypdf2,pdfminer'),
+        # Layout analysis keeps multi-column text in reading order
+        ('complex', 'pdfminer,pypdfium2,pypdf,pypdf2'),
+        ('long', 'pypdfium2,pypdf,pypdf2,pdfminer'),
+        ('scanned', 'pypdfium2,pypdf,pypdf2,pdfminer'),
+    )
+}
+PDF_LONG_DOCUMENT_PAGES = int(os.getenv('PDF_LONG_DOCUMENT_PAGES', '40'))
+PDF_COMPLEX_FONT_COUNT = int(os.getenv('PDF_COMPLEX_FONT_COUNT', '6'))
+# Re-run OCR with the detected language's Tesseract pack (if installed)
+OCR_SECOND_PASS = os.getenv('OCR_SECOND_PASS', 'True').lower() == 'true'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -159,6 +234,99 @@ FILE_UPLOAD_TEMP_DIR = None  # Use system temp
 # AI Service Configuration
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', 'your_groq_api_key_here')
 
+# LLM request timeouts in seconds (gunicorn.conf.py derives worker timeouts from these)
+AI_SIMPLIFY_TIMEOUT = int(os.getenv('AI_SIMPLIFY_TIMEOUT', '30'))
+AI_TRANSLATE_TIMEOUT = int(os.getenv('AI_TRANSLATE_TIMEOUT', '25'))
+# Local extractive summaries (served while the LLM is unavailable) are cached
+# briefly so the LLM is retried soon
+AI_FALLBACK_CACHE_TIMEOUT = int(os.getenv('AI_FALLBACK_CACHE_TIMEOUT', '60'))
+# Shared Groq HTTP pool: keep-alive connections are pre-warmed at worker start
+# and pinged every LLM_KEEPALIVE_INTERVAL seconds (0 disables) so they stay
+# open between requests. The interval must stay below the expiry.
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv('LLM_POOL_MAX_CONNECTIONS', '20'))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv('LLM_POOL_MAX_KEEPALIVE', '10'))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv('LLM_POOL_KEEPALIVE_EXPIRY', '90'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+# Groq client retries per call, timeouts included (also in gunicorn's timeout)
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_PREWARM_ON_STARTUP = os.getenv('LLM_PREWARM_ON_STARTUP', 'True').lower() == 'true'
+LLM_POOL_PREWARM_CONNECTIONS = int(os.getenv('LLM_POOL_PREWARM_CONNECTIONS', '2'))
+LLM_KEEPALIVE_INTERVAL = int(os.getenv('LLM_KEEPALIVE_INTERVAL', '45'))
+# Micro-batching: short translations to the same language arriving within
+# TRANSLATION_BATCH_WINDOW_MS share one delimited LLM call
+TRANSLATION_BATCH_ENABLED = os.getenv('TRANSLATION_BATCH_ENABLED', 'True').lower() == 'true'
+TRANSLATION_BATCH_WINDOW_MS = int(os.getenv('TRANSLATION_BATCH_WINDOW_MS', '5'))
+TRANSLATION_BATCH_MAX_SEGMENT_TOKENS = int(os.getenv('TRANSLATION_BATCH_MAX_SEGMENT_TOKENS', '300'))
+TRANSLATION_BATCH_MAX_SEGMENTS = int(os.getenv('TRANSLATION_BATCH_MAX_SEGMENTS', '8'))
+# Below AI_TRANSLATE_MAX_INPUT_TOKENS so a batch is never trimmed
+TRANSLATION_BATCH_MAX_TOKENS = int(os.getenv('TRANSLATION_BATCH_MAX_TOKENS', '1200'))
+
+# Legal terms are explained from the curated glossary instead of by the LLM
+GLOSSARY_ENABLED = os.getenv('GLOSSARY_ENABLED', 'True').lower() == 'true'
+
+# Model routing: short inputs go to the fast model, long ones to the large model
+AI_MODELS = {
+    'large': os.getenv('AI_LARGE_MODEL', 'llama-3.3-70b-versatile'),
+    'fast': os.getenv('AI_FAST_MODEL', 'llama-3.1-8b-instant'),
+}
+AI_ROUTING = {
+    'simplify': {'fast_max_input_tokens': int(os.getenv('AI_SIMPLIFY_FAST_MAX_TOKENS', '400'))},
+    'translate': {'fast_max_input_tokens': int(os.getenv('AI_TRANSLATE_FAST_MAX_TOKENS', '300'))},
+}
+# While the large model's median latency exceeds the target, the fast-model
+# cut-over is multiplied so medium inputs avoid the slow model
+AI_ROUTER_LATENCY_TARGET_MS = int(os.getenv('AI_ROUTER_LATENCY_TARGET_MS', '8000'))
+AI_ROUTER_DEGRADED_MULTIPLIER = 2
+# Try the fast model first for long simplifications; escalate if the draft is incomplete
+AI_FAST_FIRST_PASS = os.getenv('AI_FAST_FIRST_PASS', 'False').lower() == 'true'
+
+# Hedged requests: a call still running at its model's p90 latency gets one
+# duplicate (optionally to the other model tier) and the first answer wins.
+# Each call earns AI_HEDGE_BUDGET_RATE hedges, capping extra quota use.
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'False').lower() == 'true'
+AI_HEDGE_ALTERNATE_MODEL = os.getenv('AI_HEDGE_ALTERNATE_MODEL', 'False').lower() == 'true'
+AI_HEDGE_BUDGET_RATE = float(os.getenv('AI_HEDGE_BUDGET_RATE', '0.1'))
+AI_HEDGE_BUDGET_BURST = 5
+AI_HEDGE_DEFAULT_DELAY_MS = int(os.getenv('AI_HEDGE_DEFAULT_DELAY_MS', '8000'))
+AI_HEDGE_MIN_DELAY_MS = 500
+# Duplicates in flight per worker (losers count until they return)
+AI_HEDGE_MAX_WORKERS = int(os.getenv('AI_HEDGE_MAX_WORKERS', '8'))
+# Hedged calls in flight per worker; more wait for a pool thread
+AI_HEDGE_PRIMARY_WORKERS = int(os.getenv('AI_HEDGE_PRIMARY_WORKERS', '16'))
+
+# Near-duplicate reuse: a document whose SimHash similarity to an earlier
+# document is at least the threshold reuses its simplification, as is when
+# only whitespace differs, or with the differing names, dates and amounts
+# substituted when nothing else differs. The threshold only picks candidates
+# (the word diff decides), so it allows for a few changed names and amounts.
+# Entries are pruned by purge_results.
+NEAR_DUPLICATE_ENABLED = os.getenv('NEAR_DUPLICATE_ENABLED', 'True').lower() == 'true'
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.9'))
+NEAR_DUPLICATE_INDEX_PATH = os.getenv('NEAR_DUPLICATE_INDEX_PATH', str(BASE_DIR / 'similarity-v2.idx'))
+
+# Token budgets per LLM task (inputs are trimmed at sentence boundaries to fit)
+AI_TOKEN_BUDGETS = {
+    'simplify': {
+        'max_input_tokens': int(os.getenv('AI_SIMPLIFY_MAX_INPUT_TOKENS', '1200')),
+        'max_output_tokens': int(os.getenv('AI_SIMPLIFY_MAX_OUTPUT_TOKENS', '1500')),
+    },
+    'translate': {
+        'max_input_tokens': int(os.getenv('AI_TRANSLATE_MAX_INPUT_TOKENS', '1600')),
+        'max_output_tokens': int(os.getenv('AI_TRANSLATE_MAX_OUTPUT_TOKENS', '2000')),
+    },
+}
+
+# Import PDF/OCR/DOCX/LLM backends at WSGI load instead of on first use.
+# Combine with `gunicorn --preload` to share them copy-on-write across workers.
+PRELOAD_HEAVY_MODULES = os.getenv('PRELOAD_HEAVY_MODULES', 'False').lower() == 'true'
+
+# Response compression (Brotli when installed, gzip otherwise)
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+
+# Pagination of original_text fetched via /api/original-text/<id>/
+ORIGINAL_TEXT_PAGE_SIZE = 10000  # characters
+ORIGINAL_TEXT_MAX_PAGE_SIZE = 50000
+
 # Caching - Ultra-optimized
 CACHES = {
     'default': {
@@ -172,6 +340,14 @@ CACHES = {
     }
 }
 
+# Cache warmup for common legal templates
+CACHE_WARMUP_CORPUS_DIR = os.getenv('CACHE_WARMUP_CORPUS_DIR', '')
+CACHE_WARMUP_ON_STARTUP = os.getenv('CACHE_WARMUP_ON_STARTUP', 'False').lower() == 'true'
+CACHE_WARMUP_LANGUAGES = [
+    code.strip() for code in os.getenv('CACHE_WARMUP_LANGUAGES', 'en').split(',') if code.strip()
+]
+CACHE_WARMUP_WORKERS = int(os.getenv('CACHE_WARMUP_WORKERS', '4'))
+
 # Session optimization
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -183,7 +359,8 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
 # Performance optimizations
-USE_ETAGS = True
+# (USE_ETAGS was removed in Django 2.1; the API views set content-hash ETags
+# themselves and answer If-None-Match with 304.)
 PREPEND_WWW = False
 
 # Logging - Minimal for performance
@@ -6,6 +6,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 
+from documents.admin import profile_list_view, profile_download_view
+
 def api_root(request):
     """Root API endpoint with basic information."""
     return JsonResponse({
@@ -15,6 +17,7 @@ def api_root(request):
             'health': '/api/health/',
             'languages': '/api/languages/',
             'process_document': '/api/process-document/',
+            'stats': '/api/stats/',
         },
         'frontend': 'http://localhost:3000',
         'documentation': 'See README.md for API documentation'
@@ -22,6 +25,12 @@ def api_root(request):
 
 urlpatterns = [
     path('', api_root, name='api_root'),
+    path('admin/profiles/', admin.site.admin_view(profile_list_view), name='admin_profiles'),
+    path(
+        'admin/profiles/<str:filename>',
+        admin.site.admin_view(profile_download_view),
+        name='admin_profile_download'
+    ),
     path('admin/', admin.site.urls),
     path('api/', include('documents.urls')),
 ]
\ No newline at end of file
@@ -13,4 +13,22 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legalease.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_HEAVY_MODULES:
+    from documents.services.lazy_imports import preload  # noqa: E402
+
+    preload()
+
+# Warm the per-process cache with common templates (no-op unless enabled)
+# and open the LLM connection pool.
+# Under a preloading gunicorn master this module runs before the fork, so the
+# hook is deferred to gunicorn's post_fork instead (see gunicorn.conf.py).
+if not os.environ.get('LEGALEASE_DEFER_STARTUP_HOOKS'):
+    from documents.services.cache_warmup import start_background_warmup  # noqa: E402
+    from documents.services.llm_client import start_llm_client_pool  # noqa: E402
+
+    start_background_warmup()
+    start_llm_client_pool()
\ No newline at end of file